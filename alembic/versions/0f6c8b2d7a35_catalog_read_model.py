@@ -0,0 +1,66 @@
+"""catalog read model
+
+Revision ID: 0f6c8b2d7a35
+Revises: e3b6f0a91c57
+Create Date: 2026-10-17 17:58:12.650371
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0f6c8b2d7a35"
+down_revision = "e3b6f0a91c57"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "catalog_read_model",
+        sa.Column("product_id", sa.Uuid(), primary_key=True),
+        sa.Column("name", sa.String(50), nullable=False),
+        sa.Column("description", sa.String(255), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("variations", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    op.create_index(
+        "ix_catalog_read_model_created_at",
+        "catalog_read_model",
+        ["created_at", "product_id"],
+    )
+    # Fill it from the live products, same shape as catalog_row.
+    op.execute(
+        """
+        INSERT INTO catalog_read_model (
+            product_id, name, description, price, variations, created_at
+        )
+        SELECT
+            products.id,
+            products.name,
+            products.description,
+            products.price,
+            COALESCE(
+                (
+                    SELECT json_agg(json_build_object('id', variations.id,
+                        'name', variations.name, 'price', variations.price)
+                        ORDER BY variations.created_at, variations.id)
+                    FROM variations
+                    WHERE variations.product_id = products.id
+                        AND variations.is_deleted = 0
+                ),
+                '[]'::json
+            ),
+            products.created_at
+        FROM products
+        WHERE products.is_deleted = 0
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_catalog_read_model_created_at", table_name="catalog_read_model"
+    )
+    op.drop_table("catalog_read_model")
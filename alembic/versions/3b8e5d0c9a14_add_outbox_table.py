@@ -0,0 +1,42 @@
+"""add outbox table
+
+Revision ID: 3b8e5d0c9a14
+Revises: f91c4e78f21c
+Create Date: 2026-10-17 10:12:40.118274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "3b8e5d0c9a14"
+down_revision = "f91c4e78f21c"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "outbox",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("channel", sa.String(50), nullable=False),
+        sa.Column("event", sa.String(50), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(),
+            server_default=sa.text("CURRENT_TIMESTAMP"),
+        ),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index(
+        "ix_outbox_pending",
+        "outbox",
+        ["created_at"],
+        postgresql_where=sa.text("sent_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_pending", table_name="outbox")
+    op.drop_table("outbox")
@@ -0,0 +1,71 @@
+"""indexes for the hot query paths
+
+Revision ID: 5d9a3e17c6b2
+Revises: c41d7e2b9f03
+Create Date: 2026-10-17 14:05:52.418903
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "5d9a3e17c6b2"
+down_revision = "c41d7e2b9f03"
+branch_labels = None
+depends_on = None
+
+# name, table, columns, partial index predicate
+INDEXES = [
+    (
+        "ix_products_active_created_at",
+        "products",
+        ["created_at", "id"],
+        "is_deleted = 0",
+    ),
+    (
+        "ix_variations_active_product_id",
+        "variations",
+        ["product_id"],
+        "is_deleted = 0",
+    ),
+    ("ix_orders_created_at", "orders", ["created_at", "id"], None),
+    (
+        "ix_orders_user_id_created_at",
+        "orders",
+        ["user_id", "created_at", "id"],
+        None,
+    ),
+    (
+        "ix_orders_status_created_at",
+        "orders",
+        ["status", "created_at", "id"],
+        None,
+    ),
+    ("ix_order_items_order_id", "order_items", ["order_id"], None),
+]
+
+
+def upgrade():
+    # Built concurrently so writes to these tables aren't blocked, which
+    # can't happen inside the migration transaction.
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
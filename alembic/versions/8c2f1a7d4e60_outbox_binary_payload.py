@@ -0,0 +1,34 @@
+"""store outbox payloads as codec framed bytes
+
+Revision ID: 8c2f1a7d4e60
+Revises: 3b8e5d0c9a14
+Create Date: 2026-10-17 11:03:52.406119
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "8c2f1a7d4e60"
+down_revision = "3b8e5d0c9a14"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows are plain JSON, which the codecs still decode.
+    op.alter_column(
+        "outbox",
+        "payload",
+        type_=sa.LargeBinary(),
+        postgresql_using="convert_to(payload, 'UTF8')",
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "outbox",
+        "payload",
+        type_=sa.Text(),
+        postgresql_using="convert_from(payload, 'UTF8')",
+    )
@@ -0,0 +1,76 @@
+"""store primary and foreign keys as native uuid
+
+Revision ID: a7e4c2f85d19
+Revises: 5d9a3e17c6b2
+Create Date: 2026-10-17 15:22:08.904117
+
+Existing ids are random (v4) uuids kept as text, they are converted in
+place and stay as they are. New rows get time ordered (v7) ids from the
+application.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "a7e4c2f85d19"
+down_revision = "5d9a3e17c6b2"
+branch_labels = None
+depends_on = None
+
+KEYS = {
+    "users": ["id"],
+    "products": ["id"],
+    "variations": ["id", "product_id"],
+    "orders": ["id", "user_id"],
+    "order_items": ["id", "product_id", "variation_id", "order_id"],
+    "outbox": ["id"],
+}
+
+# table, column, referenced table
+FOREIGN_KEYS = [
+    ("variations", "product_id", "products"),
+    ("orders", "user_id", "users"),
+    ("order_items", "product_id", "products"),
+    ("order_items", "variation_id", "variations"),
+    ("order_items", "order_id", "orders"),
+]
+
+
+def drop_foreign_keys():
+    # Both sides of a foreign key have to change type together, so the
+    # constraints are dropped, whatever they were named, and recreated.
+    inspector = sa.inspect(op.get_bind())
+    for table, column, _ in FOREIGN_KEYS:
+        for fk in inspector.get_foreign_keys(table):
+            if fk["constrained_columns"] == [column]:
+                op.drop_constraint(fk["name"], table, type_="foreignkey")
+
+
+def create_foreign_keys():
+    for table, column, referred in FOREIGN_KEYS:
+        op.create_foreign_key(
+            f"{table}_{column}_fkey", table, referred, [column], ["id"]
+        )
+
+
+def alter_keys(type_, cast):
+    for table, columns in KEYS.items():
+        for column in columns:
+            op.alter_column(
+                table,
+                column,
+                type_=type_,
+                postgresql_using=f"{column}::{cast}",
+            )
+
+
+def upgrade():
+    drop_foreign_keys()
+    alter_keys(sa.Uuid(), "uuid")
+    create_foreign_keys()
+
+
+def downgrade() -> None:
+    drop_foreign_keys()
+    alter_keys(sa.String(36), "varchar(36)")
+    create_foreign_keys()
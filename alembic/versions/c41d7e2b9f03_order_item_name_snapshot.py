@@ -0,0 +1,44 @@
+"""snapshot product and variation names on order items
+
+Revision ID: c41d7e2b9f03
+Revises: 8c2f1a7d4e60
+Create Date: 2026-10-17 11:48:20.731552
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c41d7e2b9f03"
+down_revision = "8c2f1a7d4e60"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "order_items",
+        sa.Column("product_name", sa.String(50), nullable=True),
+    )
+    op.add_column(
+        "order_items",
+        sa.Column("variation_name", sa.String(50), nullable=True),
+    )
+    # Backfill existing lines with the current names.
+    op.execute(
+        """
+        UPDATE order_items SET product_name = products.name
+        FROM products WHERE products.id = order_items.product_id
+        """
+    )
+    op.execute(
+        """
+        UPDATE order_items SET variation_name = variations.name
+        FROM variations WHERE variations.id = order_items.variation_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("order_items", "variation_name")
+    op.drop_column("order_items", "product_name")
@@ -0,0 +1,31 @@
+"""add a version to products for ETags
+
+Revision ID: e3b6f0a91c57
+Revises: a7e4c2f85d19
+Create Date: 2026-10-17 16:40:31.277415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e3b6f0a91c57"
+down_revision = "a7e4c2f85d19"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "products",
+        sa.Column(
+            "version",
+            sa.Integer(),
+            nullable=False,
+            server_default=sa.text("1"),
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("products", "version")
@@ -0,0 +1,222 @@
+import abc
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+from api.adapters import redis_eventpublisher
+from api.utils.exceptions import CatalogNotInvalidated
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "catalog:version"
+INVALIDATION_CHANNEL = "catalog:invalidations"
+
+
+class AbstractCatalogCache(abc.ABC):
+    """Serialized catalog pages, dropped whenever products change."""
+
+    @abc.abstractmethod
+    async def get_or_load(
+        self, key: str, load: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def invalidate(self):
+        raise NotImplementedError
+
+    async def current_version(self) -> Optional[int]:
+        """Version of the catalog, None when it isn't tracked."""
+        return None
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class NullCatalogCache(AbstractCatalogCache):
+    """Never holds anything, every read goes to the database."""
+
+    async def get_or_load(self, key, load):
+        return await load()
+
+    async def invalidate(self):
+        pass
+
+
+class TieredCatalogCache(AbstractCatalogCache):
+    """Per worker LRU (L1) in front of a copy shared in Redis (L2).
+
+    Entries are keyed by a catalog version kept in Redis. Invalidating
+    bumps the version, so every older page in both tiers stops being
+    read, and announces it on a channel every worker listens to so they
+    drop their L1 straight away. L1 entries also expire after ``l1_ttl``
+    seconds, which bounds staleness if an announcement is missed; L2
+    entries expire after ``l2_ttl`` seconds. The version handed out for
+    ETags is the one held in process, checked against Redis at most
+    every ``l1_ttl`` seconds for the same reason.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        l1_size: int = 256,
+        l1_ttl: float = 5,
+        l2_ttl: int = 300,
+    ):
+        self.client = client or redis_eventpublisher.r
+        self.l1_size = l1_size
+        self.l1_ttl = l1_ttl
+        self.l2_ttl = l2_ttl
+        self.version = None
+        self._version_checked_at = 0.0
+        self._l1: OrderedDict = OrderedDict()
+        self._listener: asyncio.Task = None
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.errors = 0
+
+    async def get_or_load(self, key, load):
+        data = await self.get(key)
+        if data is not None:
+            return data
+        version = self.version
+        data = await load()
+        # Skip pages that may have been read before an invalidation.
+        if version == self.version:
+            await self.set(key, data)
+        return data
+
+    async def get(self, key) -> Optional[bytes]:
+        entry = self._l1.get(key)
+        if entry is not None:
+            expires_at, version, data = entry
+            if expires_at > time.monotonic() and version == self.version:
+                self._l1.move_to_end(key)
+                self.l1_hits += 1
+                return data
+            del self._l1[key]
+        try:
+            await self._read_version()
+            data = await self.client.get(self._l2_key(key))
+        except Exception:
+            logger.exception("Failed reading the catalog cache")
+            self.errors += 1
+            data = None
+        if data is None:
+            self.misses += 1
+            return None
+        self.l2_hits += 1
+        self._remember(key, data)
+        return data
+
+    async def set(self, key, data):
+        self._remember(key, data)
+        try:
+            await self.client.set(self._l2_key(key), data, ex=self.l2_ttl)
+        except Exception:
+            logger.exception("Failed writing the catalog cache")
+            self.errors += 1
+
+    async def invalidate(self):
+        self._l1.clear()
+        self.invalidations += 1
+        try:
+            await self._read_version()
+            self.version = await self.client.incr(VERSION_KEY)
+            await self.client.publish(INVALIDATION_CHANNEL, self.version)
+        except Exception as e:
+            # The write already committed but other workers keep serving
+            # the old pages, and the old ETags, until their TTLs run out.
+            # Stop handing out ETags here until Redis answers again.
+            logger.exception("Failed invalidating the catalog cache")
+            self.errors += 1
+            self.version = None
+            raise CatalogNotInvalidated() from e
+
+    async def current_version(self):
+        if (
+            self.version is not None
+            and time.monotonic() - self._version_checked_at < self.l1_ttl
+        ):
+            return self.version
+        try:
+            return await self._read_version()
+        except Exception:
+            logger.exception("Failed reading the catalog version")
+            self.errors += 1
+            self.version = None
+            return None
+
+    async def _read_version(self) -> int:
+        version = await self.client.get(VERSION_KEY)
+        if version is None:
+            # A new (or flushed) Redis starts counting from the clock, not
+            # 0, so versions clients already hold in ETags aren't reused.
+            await self.client.set(VERSION_KEY, time.time_ns(), nx=True)
+            version = await self.client.get(VERSION_KEY)
+        version = int(version)
+        self._version_checked_at = time.monotonic()
+        if version != self.version:
+            # Another worker invalidated and its announcement hasn't
+            # arrived yet; pages of the old version must not be served
+            # under the new one.
+            self._l1.clear()
+            self.version = version
+        return self.version
+
+    async def start(self):
+        self._listener = asyncio.create_task(self._listen())
+
+    async def close(self):
+        if self._listener is not None:
+            # redis-py can swallow a cancellation that lands while the
+            # pubsub connects, so cancel until the listener is gone.
+            while not self._listener.done():
+                self._listener.cancel()
+                await asyncio.wait([self._listener], timeout=0.1)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "l1_size": len(self._l1),
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "errors": self.errors,
+        }
+
+    def _l2_key(self, key: str) -> str:
+        return f"catalog:{self.version}:{key}"
+
+    def _remember(self, key, data):
+        self._l1[key] = (time.monotonic() + self.l1_ttl, self.version, data)
+        self._l1.move_to_end(key)
+        while len(self._l1) > self.l1_size:
+            self._l1.popitem(last=False)
+
+    async def _listen(self):
+        while True:
+            try:
+                async with self.client.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message["type"] != "message":
+                            continue
+                        self.version = int(message["data"])
+                        self._version_checked_at = time.monotonic()
+                        self._l1.clear()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Catalog invalidation listener failed")
+                await asyncio.sleep(1)
@@ -0,0 +1,137 @@
+"""Wire format for the messages we publish to Redis.
+
+A payload is a version byte followed by the encoded body::
+
+    0x01  JSON (orjson when installed, the stdlib json module otherwise)
+    0x02  msgpack (needs the optional msgpack package)
+
+Payloads starting with ``{`` have no version byte and are read as plain
+JSON, which is what was published before codecs were introduced.
+"""
+import abc
+import dataclasses
+import datetime
+import json
+from enum import Enum
+from typing import Dict, Type, Union
+from api import config
+from api.domain import events
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+JSON = 1
+MSGPACK = 2
+
+
+def _default(obj):
+    # Same rules orjson applies natively, fields starting with an
+    # underscore (e.g. _events) are left out.
+    if dataclasses.is_dataclass(obj):
+        return {
+            f.name: getattr(obj, f.name)
+            for f in dataclasses.fields(obj)
+            if not f.name.startswith("_")
+        }
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Type is not serializable: {type(obj)}")
+
+
+class Codec(abc.ABC):
+    version: int
+
+    @abc.abstractmethod
+    def encode(self, obj) -> bytes:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def decode(self, body: bytes):
+        raise NotImplementedError
+
+
+class JsonCodec(Codec):
+    version = JSON
+
+    def encode(self, obj) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default)
+        return json.dumps(obj, default=_default).encode()
+
+    def decode(self, body: bytes):
+        if orjson is not None:
+            return orjson.loads(body)
+        return json.loads(body)
+
+
+class MsgpackCodec(Codec):
+    version = MSGPACK
+
+    def encode(self, obj) -> bytes:
+        return msgpack.packb(obj, default=_default)
+
+    def decode(self, body: bytes):
+        return msgpack.unpackb(body)
+
+
+_codecs: Dict[int, Codec] = {}
+EVENT_TYPES: Dict[str, Type[events.Event]] = {}
+
+
+def register_codec(codec: Codec):
+    _codecs[codec.version] = codec
+
+
+def register_event(event_type: Type[events.Event]):
+    EVENT_TYPES[event_type.__name__] = event_type
+    return event_type
+
+
+register_codec(JsonCodec())
+if msgpack is not None:
+    register_codec(MsgpackCodec())
+for event_type in events.Event.__subclasses__():
+    register_event(event_type)
+
+
+def default_version() -> int:
+    return MSGPACK if config.get_event_codec() == "msgpack" else JSON
+
+
+def encode(event: str, data, version: int = None) -> bytes:
+    """Encode a message; ``data`` may be a dict or a dataclass."""
+    version = version or default_version()
+    codec = _codecs.get(version)
+    if codec is None:
+        raise ValueError(f"Codec {version} is not available")
+    return bytes([version]) + codec.encode({"event": event, "data": data})
+
+
+def decode(payload: Union[bytes, str]) -> dict:
+    if isinstance(payload, str):
+        payload = payload.encode()
+    if payload[:1] == b"{":
+        return _codecs[JSON].decode(payload)
+    codec = _codecs.get(payload[0])
+    if codec is None:
+        raise ValueError(f"Unknown codec version {payload[0]}")
+    return codec.decode(payload[1:])
+
+
+def encode_event(event: events.Event, version: int = None) -> bytes:
+    return encode(type(event).__name__, event, version)
+
+
+def decode_event(payload: Union[bytes, str]) -> events.Event:
+    """Rebuild a registered event. Field values are left as decoded."""
+    message = decode(payload)
+    return EVENT_TYPES[message["event"]](**message["data"])
@@ -0,0 +1,54 @@
+import time
+from collections import deque
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """The async queue pool, recording how long each checkout waited.
+
+    The wait covers queueing for a free connection and opening a new one.
+    Long or frequent waits mean the pool is too small for the load (or
+    connections are held too long); none at all with many idle
+    connections means it can shrink.
+    """
+
+    def __init__(self, *args, samples: int = 1000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._samples = deque(maxlen=samples)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self._samples.append(waited)
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def stats(self) -> dict:
+        recent = sorted(self._samples)
+        p99 = recent[int(0.99 * (len(recent) - 1))] if recent else 0.0
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": (
+                self.total_wait / self.checkouts * 1000
+                if self.checkouts
+                else 0.0
+            ),
+            "wait_p99_ms": p99 * 1000,
+            "wait_max_ms": self.max_wait * 1000,
+        }
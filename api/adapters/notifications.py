@@ -1,14 +1,22 @@
 import abc
+import asyncio
+import functools
+import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.header import Header
 from api import config
+from api.adapters.smtp_pool import SMTPPool
+from api.adapters.templates import TemplateRenderer, get_renderer
 from api.domain import events
-import aiosmtplib
 import boto3
-from jinja2 import Environment, FileSystemLoader
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 
+# destinations per SendBulkTemplatedEmail call
+SES_BULK_LIMIT = 50
+
 
 class AbstractNotifications(abc.ABC):
     @abc.abstractmethod
@@ -19,6 +27,18 @@ class AbstractNotifications(abc.ABC):
     async def render_template(self, template, **kwargs):
         raise NotImplementedError
 
+    async def publish_many(self, destinations, message):
+        """Publish one message to many destinations (fan-outs)."""
+        await asyncio.gather(
+            *(self.publish(address, message) for address in destinations)
+        )
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
 
 class AbstractPushNotifications(abc.ABC):
     @abc.abstractmethod
@@ -35,23 +55,44 @@ class iOSPushNotifications(AbstractPushNotifications):
 
 
 class EmailAWSNotifications(AbstractNotifications):
-    def __init__(self):
+    """Emails through Amazon SES.
+
+    boto3 is synchronous, so every call runs in a small thread pool, which
+    also bounds how many are in flight, and the client's connection pool
+    is sized to match so the threads reuse connections. Fan-outs to many
+    recipients go through SES bulk templated sends, or one email each if
+    the SES template hasn't been created.
+    """
+
+    def __init__(self, templates: TemplateRenderer = None, client=None):
         self.logger = logging.getLogger(__name__)
-        # set up Amazon SES client here
-        self.client = boto3.client("ses", region_name="us-west-1")
+        self.templates = templates or get_renderer()
+        settings = config.get_ses_settings()
+        self.source = settings["source"]
+        self.sale_template = settings["sale_template"]
+        self.client = client or boto3.client(
+            "ses",
+            region_name=settings["region"],
+            endpoint_url=settings["endpoint_url"],
+            config=BotoConfig(
+                max_pool_connections=settings["max_concurrency"]
+            ),
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings["max_concurrency"], thread_name_prefix="ses"
+        )
 
     async def send(self, destination, message):
         self.logger.info(f"Sending email to {destination}")
-        print(f"Sending email to {destination}")
         if isinstance(message, events.OrderStatusChanged):
             await self._send_order_changed(destination, message)
         if isinstance(message, events.OrderCreated):
             await self._send_order_created(destination, message)
+        if isinstance(message, events.OrderSale):
+            await self._send_order_sale(destination, message)
 
     async def render_template(self, template, **kwargs):
-        env = Environment(loader=FileSystemLoader("api/templates"))
-        template = env.get_template(template)
-        return template.render(**kwargs)
+        return await self.templates.render(template, **kwargs)
 
     async def _send_order_changed(
         self, destination, message: events.OrderStatusChanged
@@ -64,31 +105,19 @@ class EmailAWSNotifications(AbstractNotifications):
         html_template = await self.render_template(
             "order_status_changed.html", **template_vars
         )
+        await self._send_html(
+            destination,
+            f"Your order status is updated to {message.status}",
+            html_template,
+        )
 
-        try:
-            response = self.client.send_email(
-                Destination={
-                    "ToAddresses": ["saggatpwn@gmail.com"],
-                },
-                Message={
-                    "Body": {
-                        "Html": {
-                            "Charset": "UTF-8",
-                            "Data": html_template,
-                        },
-                    },
-                    "Subject": {
-                        "Charset": "UTF-8",
-                        "Data": f"Your order status is updated to {message.status}",
-                    },
-                },
-                Source="marcoiurman@gmail.com",
-            )
-        except ClientError as e:
-            self.logger.error(e.response["Error"]["Message"])
-        else:
-            self.logger.info(
-                f"Email sent! Message ID: {response['MessageId']}")
+    async def _send_order_sale(self, destination, message: events.OrderSale):
+        html = (
+            f"<p>Item {message.product_id} is on sale!, price is "
+            f"{message.sale_price} (was {message.price}), go to "
+            f'<a href="{message.url}">{message.url}</a> to buy it!</p>'
+        )
+        await self._send_html(destination, "This item is on sale!", html)
 
     async def _send_order_created(
         self, destination, message: events.OrderCreated
@@ -104,36 +133,121 @@ class EmailAWSNotifications(AbstractNotifications):
         html_template = await self.render_template(
             "order_created.html", **template_vars
         )
+        await self._send_html(
+            destination, "Your order has been created", html_template
+        )
 
-        try:
-            response = self.client.send_email(
-                Destination={
-                    "ToAddresses": [destination],
-                },
-                Message={
-                    "Body": {
-                        "Html": {"Charset": "UTF-8", "Data": html_template},
-                    },
-                    "Subject": {
-                        "Charset": "UTF-8",
-                        "Data": "Your order has been created",
-                    },
-                },
-                Source="marcoiurman@gmail.com",
+    async def _send_html(self, destination, subject, html):
+        response = await self._call(
+            "send_email",
+            Destination={"ToAddresses": [destination]},
+            Message={
+                "Body": {"Html": {"Charset": "UTF-8", "Data": html}},
+                "Subject": {"Charset": "UTF-8", "Data": subject},
+            },
+            Source=self.source,
+        )
+        if response is not None:
+            self.logger.info(
+                f"Email sent! Message ID: {response['MessageId']}"
             )
-        except ClientError as e:
-            self.logger.error(e.response["Error"]["Message"])
+
+    async def send_bulk_templated(
+        self, template: str, destinations: dict, default_data: dict = None
+    ) -> int:
+        """Send an SES template to many recipients, returns how many went.
+
+        ``destinations`` maps each address to its template data. SES takes
+        up to 50 destinations per call, the calls run concurrently. Raises
+        ClientError when the template doesn't exist.
+        """
+        addresses = list(destinations)
+        chunks = [
+            addresses[i : i + SES_BULK_LIMIT]
+            for i in range(0, len(addresses), SES_BULK_LIMIT)
+        ]
+        responses = await asyncio.gather(
+            *(
+                self._call(
+                    "send_bulk_templated_email",
+                    reraise=("TemplateDoesNotExist",),
+                    Source=self.source,
+                    Template=template,
+                    DefaultTemplateData=json.dumps(default_data or {}),
+                    Destinations=[
+                        {
+                            "Destination": {"ToAddresses": [address]},
+                            "ReplacementTemplateData": json.dumps(
+                                destinations[address] or {}
+                            ),
+                        }
+                        for address in chunk
+                    ],
+                )
+                for chunk in chunks
+            )
+        )
+        sent = 0
+        for response in responses:
+            for status in (response or {}).get("Status", []):
+                if status["Status"] == "Success":
+                    sent += 1
+                else:
+                    self.logger.error(
+                        "SES bulk send failed: %s", status.get("Error")
+                    )
+        return sent
 
     async def publish(self, destination, message):
         await self.send(destination, message)
 
+    async def publish_many(self, destinations, message):
+        if isinstance(message, events.OrderSale):
+            try:
+                await self.send_bulk_templated(
+                    self.sale_template,
+                    dict.fromkeys(destinations),
+                    default_data={
+                        "product_id": message.product_id,
+                        "url": message.url,
+                        "price": message.price,
+                        "sale_price": message.sale_price,
+                    },
+                )
+                return
+            except ClientError:
+                self.logger.warning(
+                    "SES template %s does not exist, sending one by one",
+                    self.sale_template,
+                )
+        await super().publish_many(destinations, message)
+
+    async def _call(self, operation: str, reraise=(), **kwargs):
+        loop = asyncio.get_running_loop()
+        call = functools.partial(getattr(self.client, operation), **kwargs)
+        try:
+            return await loop.run_in_executor(self._executor, call)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in reraise:
+                raise
+            self.logger.error(e.response["Error"]["Message"])
+            return None
+
+    async def close(self):
+        # let the sends already submitted finish before closing the client
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._executor.shutdown
+        )
+        self.client.close()
+
 
 class EmailLocalNotifications(AbstractNotifications):
-    def __init__(self):
+    def __init__(self, templates: TemplateRenderer = None):
         self.logger = logging.getLogger(__name__)
-        # set up local SMTP server for MailHog
-        self.client = aiosmtplib.SMTP(
-            hostname=config.get_mailhog_host(), port=1025
+        self.templates = templates or get_renderer()
+        # persistent sessions to the local SMTP server (MailHog)
+        self.smtp = SMTPPool(
+            config.get_mailhog_host(), 1025, **config.get_smtp_pool_settings()
         )
 
     async def send(self, destination, message):
@@ -146,22 +260,22 @@ class EmailLocalNotifications(AbstractNotifications):
             await self._send_order_sale(destination, message)
 
     async def render_template(self, template, **kwargs):
-        env = Environment(loader=FileSystemLoader("api/templates"))
-        template = env.get_template(template)
-        return template.render(**kwargs)
+        return await self.templates.render(template, **kwargs)
 
     async def _send_order_sale(self, destination, message: events.OrderSale):
         # send email with MailHog here, just text
         self.logger.info(f"Sending email to {destination}")
         print("Order Sale!")
+        await self.smtp.send(self._order_sale_email(destination, message))
+
+    def _order_sale_email(self, destination, message: events.OrderSale):
         body_msg = f"Item {message.product_id} is on sale!, price is \
                 {message.price}, go to {message.url} to buy it!"
         email_msg = MIMEText(body_msg, "plain", "utf-8")
         email_msg["Subject"] = Header("This item is on sale!")
         email_msg["From"] = "test@example.com"
         email_msg["To"] = destination
-        await self.client.connect()
-        await self.client.send_message(email_msg)
+        return email_msg
 
     async def _send_order_changed(
         self, destination, message: events.OrderStatusChanged
@@ -182,8 +296,7 @@ class EmailLocalNotifications(AbstractNotifications):
         )
         email_msg["From"] = "test@example.com"
         email_msg["To"] = destination
-        await self.client.connect()
-        await self.client.send_message(email_msg)
+        await self.smtp.send(email_msg)
 
     async def _send_order_created(
         self, destination, message: events.OrderCreated
@@ -204,8 +317,103 @@ class EmailLocalNotifications(AbstractNotifications):
         email_msg["Subject"] = Header("Your order has been created", "utf-8")
         email_msg["From"] = "test@example.com"
         email_msg["To"] = destination
-        await self.client.connect()
-        await self.client.send_message(email_msg)
+        await self.smtp.send(email_msg)
 
     async def publish(self, destination, message):
         await self.send(destination, message)
+
+    async def publish_many(self, destinations, message):
+        if isinstance(message, events.OrderSale):
+            await self.smtp.send_many(
+                self._order_sale_email(address, message)
+                for address in destinations
+            )
+            return
+        await super().publish_many(destinations, message)
+
+    async def close(self):
+        await self.smtp.close()
+
+    def stats(self) -> dict:
+        return {"smtp": self.smtp.stats()}
+
+
+class DebouncedNotifications(AbstractNotifications):
+    """Coalesces order status emails sent in quick succession.
+
+    The first OrderStatusChanged of an order starts a ``window`` second
+    timer; later ones for the same order only replace the pending message,
+    so a single email with the latest status goes out when it fires.
+    Other messages go straight through. ``close`` sends whatever is still
+    pending before closing the wrapped notifications.
+    """
+
+    def __init__(self, notifications: AbstractNotifications, window=3):
+        self.logger = logging.getLogger(__name__)
+        self.notifications = notifications
+        self.window = window
+        self._pending = {}  # order id -> (destination, latest message)
+        self._timers = {}
+        self._flush = asyncio.Event()
+        self.sent = 0
+        self.coalesced = 0
+
+    async def publish(self, destination, message):
+        if not isinstance(message, events.OrderStatusChanged):
+            await self.notifications.publish(destination, message)
+            return
+        order_id = message.order_id
+        if order_id in self._pending:
+            self.coalesced += 1
+        self._pending[order_id] = (destination, message)
+        if order_id not in self._timers:
+            self._timers[order_id] = asyncio.create_task(
+                self._publish_later(order_id)
+            )
+
+    async def publish_many(self, destinations, message):
+        # Fan-outs keep the wrapped adapter's bulk path (SES bulk sends,
+        # one SMTP session).
+        await self.notifications.publish_many(destinations, message)
+
+    async def render_template(self, template, **kwargs):
+        return await self.notifications.render_template(template, **kwargs)
+
+    def __getattr__(self, name):
+        # Anything else adapter specific (smtp, send_bulk_templated, ...)
+        if name == "notifications":
+            raise AttributeError(name)
+        return getattr(self.notifications, name)
+
+    async def flush(self):
+        """Send every pending message now."""
+        self._flush.set()
+        await asyncio.gather(*self._timers.values())
+        self._flush = asyncio.Event()
+
+    async def close(self):
+        await self.flush()
+        await self.notifications.close()
+
+    def stats(self) -> dict:
+        return {
+            **self.notifications.stats(),
+            "debounce": {
+                "pending": len(self._pending),
+                "sent": self.sent,
+                "coalesced": self.coalesced,
+            },
+        }
+
+    async def _publish_later(self, order_id):
+        try:
+            await asyncio.wait_for(self._flush.wait(), self.window)
+        except asyncio.TimeoutError:
+            pass
+        destination, message = self._pending.pop(order_id)
+        del self._timers[order_id]
+        try:
+            await self.notifications.publish(destination, message)
+            self.sent += 1
+        except Exception:
+            self.logger.exception(f"Failed notifying order {order_id}")
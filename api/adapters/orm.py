@@ -7,13 +7,17 @@ from sqlalchemy import (
     Float,
     ForeignKey,
     Enum,
+    Index,
+    JSON,
+    LargeBinary,
+    Uuid,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy import event
 from sqlalchemy.orm import registry
 from sqlalchemy import text
-import uuid
 from api.domain import models
+from api.utils.ids import uuid7
 from api.domain.enums import UserRole, OrderStatus, ConsumeLocation
 import logging
 
@@ -26,9 +30,7 @@ metadata = mapper_registry.metadata
 user = Table(
     "users",
     metadata,
-    Column(
-        "id", String(36), primary_key=True, default=lambda: str(uuid.uuid4())
-    ),
+    Column("id", Uuid(as_uuid=False), primary_key=True, default=uuid7),
     Column("email", String(120), unique=True, nullable=False),
     Column("password", String(255), nullable=False),
     Column("role", Enum(UserRole), default=UserRole.CUSTOMER),
@@ -40,39 +42,48 @@ user = Table(
 product = Table(
     "products",
     metadata,
-    Column(
-        "id", String(36), primary_key=True, default=lambda: str(uuid.uuid4())
-    ),
+    Column("id", Uuid(as_uuid=False), primary_key=True, default=uuid7),
     Column("name", String(50), unique=True, nullable=False),
     Column("description", String(255), nullable=False),
     Column("price", Float(), nullable=False),
     Column("is_deleted", Integer(), nullable=False, default=0),
+    # bumped by every change to the product or its variations (ETags)
+    Column("version", Integer(), nullable=False, server_default=text("1")),
     Column("created_at", DateTime, server_default=text("CURRENT_TIMESTAMP")),
     Column("updated_at", DateTime, server_default=text("CURRENT_TIMESTAMP")),
+    # Product listings and the catalog page live products in this order.
+    Index(
+        "ix_products_active_created_at",
+        "created_at",
+        "id",
+        postgresql_where=text("is_deleted = 0"),
+    ),
 )
 
 # variation
 variation = Table(
     "variations",
     metadata,
-    Column(
-        "id", String(36), primary_key=True, default=lambda: str(uuid.uuid4())
-    ),
+    Column("id", Uuid(as_uuid=False), primary_key=True, default=uuid7),
     Column("name", String(50), unique=False, nullable=False),
     Column("price", Float(), nullable=False),
     Column("is_deleted", Integer(), nullable=False, default=0),
-    Column("product_id", String(36), ForeignKey("products.id")),
+    Column("product_id", Uuid(as_uuid=False), ForeignKey("products.id")),
     Column("created_at", DateTime, server_default=text("CURRENT_TIMESTAMP")),
     Column("updated_at", DateTime, server_default=text("CURRENT_TIMESTAMP")),
+    # Active variations of a page of products.
+    Index(
+        "ix_variations_active_product_id",
+        "product_id",
+        postgresql_where=text("is_deleted = 0"),
+    ),
 )
 
 # order
 order = Table(
     "orders",
     metadata,
-    Column(
-        "id", String(36), primary_key=True, default=lambda: str(uuid.uuid4())
-    ),
+    Column("id", Uuid(as_uuid=False), primary_key=True, default=uuid7),
     Column("status", Enum(OrderStatus), default=OrderStatus.WAITING),
     Column(
         "consume_location",
@@ -80,26 +91,65 @@ order = Table(
         default=ConsumeLocation.IN_HOUSE,
     ),
     Column("total_cost", Float(), nullable=False),
-    Column("user_id", String(36), ForeignKey("users.id")),
+    Column("user_id", Uuid(as_uuid=False), ForeignKey("users.id")),
     Column("is_deleted", Integer(), nullable=False, default=0),
     Column("created_at", DateTime, server_default=text("CURRENT_TIMESTAMP")),
     Column("updated_at", DateTime, server_default=text("CURRENT_TIMESTAMP")),
+    # Order listings page on (created_at, id), optionally for one
+    # customer (/orders/me) or one status (manager filters).
+    Index("ix_orders_created_at", "created_at", "id"),
+    Index("ix_orders_user_id_created_at", "user_id", "created_at", "id"),
+    Index("ix_orders_status_created_at", "status", "created_at", "id"),
 )
 
 # order item
 order_item = Table(
     "order_items",
     metadata,
-    Column(
-        "id", String(36), primary_key=True, default=lambda: str(uuid.uuid4())
-    ),
+    Column("id", Uuid(as_uuid=False), primary_key=True, default=uuid7),
     Column("quantity", Integer, nullable=False),
     Column("unit_price", Float(), nullable=False),
-    Column("product_id", String(36), ForeignKey("products.id")),
-    Column("variation_id", String(36), ForeignKey("variations.id")),
-    Column("order_id", String(36), ForeignKey("orders.id")),
+    Column("product_name", String(50), nullable=True),
+    Column("variation_name", String(50), nullable=True),
+    Column("product_id", Uuid(as_uuid=False), ForeignKey("products.id")),
+    Column("variation_id", Uuid(as_uuid=False), ForeignKey("variations.id")),
+    Column("order_id", Uuid(as_uuid=False), ForeignKey("orders.id")),
     Column("created_at", DateTime, server_default=text("CURRENT_TIMESTAMP")),
     Column("updated_at", DateTime, server_default=text("CURRENT_TIMESTAMP")),
+    Index("ix_order_items_order_id", "order_id"),
+)
+
+# catalog read model, one row per live product with its active variations
+# already nested. Written by the product and variation handlers in the
+# same transaction as the change, read by the catalog view.
+catalog_read_model = Table(
+    "catalog_read_model",
+    metadata,
+    Column("product_id", Uuid(as_uuid=False), primary_key=True),
+    Column("name", String(50), nullable=False),
+    Column("description", String(255), nullable=False),
+    Column("price", Float(), nullable=False),
+    Column("variations", JSON, nullable=False),
+    Column("created_at", DateTime),
+    Index("ix_catalog_read_model_created_at", "created_at", "product_id"),
+)
+
+# outbox, domain messages waiting to be relayed to redis. Written in the
+# same transaction as the change that produced them.
+outbox = Table(
+    "outbox",
+    metadata,
+    Column("id", Uuid(as_uuid=False), primary_key=True, default=uuid7),
+    Column("channel", String(50), nullable=False),
+    Column("event", String(50), nullable=False),
+    Column("payload", LargeBinary, nullable=False),
+    Column("created_at", DateTime, server_default=text("CURRENT_TIMESTAMP")),
+    Column("sent_at", DateTime, nullable=True),
+    Index(
+        "ix_outbox_pending",
+        "created_at",
+        postgresql_where=text("sent_at IS NULL"),
+    ),
 )
 
 
@@ -1,18 +1,8 @@
-import json
 import redis.asyncio as redis
 import logging
-from enum import Enum
 from api import config
-import datetime
-
-
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (datetime.date, datetime.datetime)):
-            return obj.isoformat()
-        if isinstance(obj, Enum):
-            return obj.value
-        return super(DateTimeEncoder, self).default(obj)
+from api.adapters import codecs
+from typing import List, Tuple
 
 
 logger = logging.getLogger(__name__)
@@ -20,9 +10,36 @@ logger = logging.getLogger(__name__)
 r = redis.Redis(**config.get_redis_host_and_port())
 
 
-async def publish(channel: str, event: str, data: dict):
-    logger.info(f"Publishing {event} to {channel}")
-    await r.publish(
-        channel, json.dumps({"event": event, "data": data}, cls=DateTimeEncoder)
-    )
-    logger.info(f"Published {event} to {channel}")
+def encode(event: str, data) -> bytes:
+    return codecs.encode(event, data)
+
+
+def _send(client, channel: str, payload: bytes):
+    # With the streams transport each channel is a stream, trimmed to
+    # roughly maxlen entries so it doesn't grow forever.
+    if config.get_event_transport() == "streams":
+        return client.xadd(
+            channel,
+            {"payload": payload},
+            maxlen=config.get_stream_settings()["maxlen"],
+            approximate=True,
+        )
+    return client.publish(channel, payload)
+
+
+async def publish(channel: str, event: str, data):
+    logger.debug(f"Publishing {event} to {channel}")
+    await _send(r, channel, encode(event, data))
+
+
+async def publish_many(messages: List[Tuple[str, bytes]], client=None):
+    """Publish already encoded (channel, payload) pairs in one pipeline."""
+    async with (client or r).pipeline(transaction=False) as pipe:
+        for channel, payload in messages:
+            _send(pipe, channel, payload)
+        await pipe.execute()
+    logger.debug(f"Published {len(messages)} messages")
+
+
+async def close():
+    await r.aclose()
@@ -1,11 +1,16 @@
 import abc
+from api.adapters import orm, redis_eventpublisher
 from api.domain import models
+from sqlalchemy import literal, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.future import select
-from sqlalchemy.orm import joinedload, contains_eager
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from dataclasses import asdict
 from sqlalchemy.ext.asyncio import AsyncSession
 from api.domain.events import Event, OrderCreated
-from typing import Set, Optional, List
+from api.utils import pagination
+from typing import Iterable, Set, Optional, List
 
 
 class AbstractUserRepository(abc.ABC):
@@ -60,12 +65,37 @@ class AbstractProductRepository(abc.ABC):
         await self._add(product)
         self.seen.add(product)
 
-    async def get(self, id: str) -> Optional[models.Product]:
-        product = await self._get(id)
+    async def get(
+        self, id: str, for_update: bool = False
+    ) -> Optional[models.Product]:
+        """The product, ``for_update`` locks its row until commit.
+
+        Handlers that change a product and its catalog row lock it, so
+        concurrent changes to one product are applied one at a time.
+        """
+        product = await self._get(id, for_update)
         if product:
             self.seen.add(product)
         return product
 
+    async def get_many(self, ids: Iterable[str]) -> List[models.Product]:
+        """Fetch several products in one go, missing ids are skipped."""
+        products = await self._get_many(list(ids))
+        self.seen.update(products)
+        return products
+
+    async def get_version(self, id: str) -> Optional[int]:
+        """Only the product's version, None when it doesn't exist."""
+        return await self._get_version(id)
+
+    async def bump_version(self, product: models.Product):
+        """Increment the product's version (ETags) in the database.
+
+        Done in SQL rather than on the loaded product, so concurrent
+        changes can't both write the same version.
+        """
+        await self._bump_version(product)
+
     async def delete(self, product: models.Product):
         await self._delete(product)
         self.seen.remove(product)
@@ -74,9 +104,9 @@ class AbstractProductRepository(abc.ABC):
         await self._update(product)
 
     async def get_all(
-        self, page=1, page_size=10, filters=None
+        self, page=1, page_size=10, filters=None, cursor=None
     ) -> Optional[List[models.Product]]:
-        products = await self._get_all(page, page_size, filters)
+        products = await self._get_all(page, page_size, filters, cursor)
         if products:
             return products
         return []
@@ -90,7 +120,21 @@ class AbstractProductRepository(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    async def _get(self, id: str) -> Optional[models.Product]:
+    async def _get(
+        self, id: str, for_update: bool = False
+    ) -> Optional[models.Product]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def _get_many(self, ids: List[str]) -> List[models.Product]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def _get_version(self, id: str) -> Optional[int]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def _bump_version(self, product: models.Product):
         raise NotImplementedError
 
     @abc.abstractmethod
@@ -99,7 +143,7 @@ class AbstractProductRepository(abc.ABC):
 
     @abc.abstractmethod
     async def _get_all(
-        self, page: int, page_size=10, filters=None
+        self, page: int, page_size=10, filters=None, cursor=None
     ) -> Optional[List[models.Product]]:
         raise NotImplementedError
 
@@ -118,6 +162,12 @@ class AbstractVariationRepository(abc.ABC):
             self.seen.add(variation)
         return variation
 
+    async def get_many(self, ids: Iterable[str]) -> List[models.Variation]:
+        """Fetch several variations in one go, missing ids are skipped."""
+        variations = await self._get_many(list(ids))
+        self.seen.update(variations)
+        return variations
+
     async def update(self, variation: models.Variation):
         await self._update(variation)
 
@@ -133,6 +183,10 @@ class AbstractVariationRepository(abc.ABC):
     async def _get(self, id: str) -> Optional[models.Variation]:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    async def _get_many(self, ids: List[str]) -> List[models.Variation]:
+        raise NotImplementedError
+
     @abc.abstractmethod
     async def _delete(self, variation: models.Variation):
         raise NotImplementedError
@@ -153,6 +207,9 @@ class AbstractOrderRepository(abc.ABC):
         order_event = asdict(order)
         order_event.pop("_events")
         order_event.pop("is_deleted")
+        order_event["order_items"] = [
+            item.event_data() for item in order.order_items
+        ]
         order.append_event(OrderCreated(**order_event))
         self.seen.add(order)
 
@@ -163,9 +220,9 @@ class AbstractOrderRepository(abc.ABC):
         return order
 
     async def get_all(
-        self, page=1, page_size=10, filters=None
+        self, page=1, page_size=10, filters=None, cursor=None
     ) -> Optional[List[models.Order]]:
-        orders = await self._get_all(page, page_size, filters)
+        orders = await self._get_all(page, page_size, filters, cursor)
         if orders:
             for order in orders:
                 self.seen.add(order)
@@ -189,7 +246,7 @@ class AbstractOrderRepository(abc.ABC):
 
     @abc.abstractmethod
     async def _get_all(
-        self, page: int, page_size=10, filters=None
+        self, page: int, page_size=10, filters=None, cursor=None
     ) -> Optional[List[models.Product]]:
         raise NotImplementedError
 
@@ -240,6 +297,127 @@ class AbstractOrderItemRepository(abc.ABC):
         raise NotImplementedError
 
 
+class AbstractOutboxRepository(abc.ABC):
+    async def add(self, channel: str, event: str, data):
+        await self._add(
+            channel, event, redis_eventpublisher.encode(event, data)
+        )
+
+    @abc.abstractmethod
+    async def _add(self, channel: str, event: str, payload: bytes):
+        raise NotImplementedError
+
+
+class AbstractCatalogRepository(abc.ABC):
+    async def refresh(self, product: models.Product):
+        """Bring the product's catalog row in line with the product."""
+        if product.is_deleted:
+            await self._remove(product.id)
+        else:
+            await self._save(catalog_row(product))
+
+    async def rebuild(self) -> int:
+        """Recreate every row from the products, returns how many."""
+        return await self._rebuild()
+
+    @abc.abstractmethod
+    async def _save(self, row: dict):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def _remove(self, product_id: str):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def _rebuild(self) -> int:
+        raise NotImplementedError
+
+
+def catalog_row(product, variations=None) -> dict:
+    if variations is None:
+        variations = product.get_active_variations()
+    # keyed by id, a product may list the same variation twice
+    nested = {
+        variation.id: {
+            "id": variation.id,
+            "name": variation.name,
+            "price": variation.price,
+        }
+        for variation in variations
+    }
+    return {
+        "product_id": product.id,
+        "name": product.name,
+        "description": product.description,
+        "price": product.price,
+        "variations": list(nested.values()),
+        "created_at": product.created_at,
+    }
+
+
+async def rebuild_catalog_read_model(connection, batch_size=500) -> int:
+    """Refill the catalog read model from products and variations.
+
+    ``connection`` can be a session or a connection. Products are read in
+    batches of ``batch_size`` with their active variations.
+    """
+    product, variation = orm.product, orm.variation
+    await connection.execute(orm.catalog_read_model.delete())
+    count, last_id = 0, None
+    while True:
+        query = (
+            select(product)
+            .where(product.c.is_deleted == 0)
+            .order_by(product.c.id)
+            .limit(batch_size)
+        )
+        if last_id is not None:
+            query = query.where(product.c.id > last_id)
+        products = (await connection.execute(query)).all()
+        if not products:
+            return count
+        variations = {row.id: [] for row in products}
+        result = await connection.execute(
+            select(variation)
+            .where(
+                variation.c.product_id.in_(list(variations)),
+                variation.c.is_deleted == 0,
+            )
+            .order_by(variation.c.created_at, variation.c.id)
+        )
+        for row in result:
+            variations[row.product_id].append(row)
+        await connection.execute(
+            orm.catalog_read_model.insert(),
+            [catalog_row(row, variations[row.id]) for row in products],
+        )
+        count += len(products)
+        last_id = products[-1].id
+
+
+def paginate(query, entity, page: int, page_size: int, cursor: str = None):
+    """Order by (created_at, id) and cut one page out of ``query``.
+
+    With a cursor the page starts right after the row it points to, so
+    any page costs the same as the first one. Without it we fall back to
+    OFFSET paging.
+    """
+    query = query.order_by(entity.created_at, entity.id)
+    if cursor:
+        created_at, id = pagination.decode_cursor(cursor)
+        # Bound with the column types, a tuple doesn't infer them.
+        query = query.filter(
+            tuple_(entity.created_at, entity.id)
+            > tuple_(
+                literal(created_at, entity.created_at.type),
+                literal(id, entity.id.type),
+            )
+        )
+    else:
+        query = query.offset((page - 1) * page_size)
+    return query.limit(page_size)
+
+
 class SqlAlchemyUserRepository(AbstractUserRepository):
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -275,40 +453,77 @@ class SqlAlchemyProductRepository(AbstractProductRepository):
     async def _add(self, product):
         self.session.add(product)
 
-    async def _get(self, id):
+    async def _get(self, id, for_update=False):
         query = (
             select(models.Product)
             .filter(models.Product.id == id, models.Product.is_deleted == 0)
             .options(joinedload(models.Product.variations))
         )
+        if for_update:
+            # only the product row, the variations are outer joined
+            query = query.with_for_update(of=orm.product)
         result = await self.session.execute(query)
         product = result.scalars().first()
 
         if product is not None:
             return product
 
+    async def _get_many(self, ids):
+        # Variations aren't needed for bulk lookups, so they are not
+        # loaded; touching them raises instead of lazy loading.
+        if not ids:
+            return []
+        result = await self.session.execute(
+            select(models.Product)
+            .filter(models.Product.id.in_(ids), models.Product.is_deleted == 0)
+            .options(raiseload(models.Product.variations))
+        )
+        return result.scalars().all()
+
+    async def _get_version(self, id):
+        result = await self.session.execute(
+            select(orm.product.c.version).filter(
+                orm.product.c.id == id, orm.product.c.is_deleted == 0
+            )
+        )
+        return result.scalar()
+
+    async def _bump_version(self, product):
+        result = await self.session.execute(
+            update(orm.product)
+            .where(orm.product.c.id == product.id)
+            .values(version=orm.product.c.version + 1)
+            .returning(orm.product.c.version)
+        )
+        # Already written, don't let the flush write it again.
+        set_committed_value(product, "version", result.scalar_one())
+
     async def _delete(self, product):
         product.is_deleted = 1
         await self.session.merge(product)
 
-    async def _get_all(self, page, page_size=10, filters=None):
+    async def _get_all(self, page, page_size=10, filters=None, cursor=None):
+        # The page is cut from product rows alone and the active variations
+        # are loaded by a second IN query, so LIMIT counts products (not
+        # joined rows) and products without variations are kept.
         query = (
             select(models.Product)
-            .outerjoin(models.Variation, models.Product.variations)
-            .options(contains_eager(models.Product.variations))
-            .order_by(models.Product.id)
-            .filter(
-                models.Product.is_deleted == 0, models.Variation.is_deleted == 0
+            .filter(models.Product.is_deleted == 0)
+            .options(
+                selectinload(
+                    models.Product.variations.and_(
+                        models.Variation.is_deleted == 0
+                    )
+                )
             )
-            .offset((page - 1) * page_size)
-            .limit(page_size)
         )
+        query = paginate(query, models.Product, page, page_size, cursor)
         if filters:
             for key, value in filters.items():
                 query = query.filter(getattr(models.Product, key) == value)
 
         result = await self.session.execute(query)
-        return result.scalars().unique().all()
+        return result.scalars().all()
 
     async def _update(self, product):
         await self.session.merge(product)
@@ -328,6 +543,16 @@ class SqlAlchemyVariationRepository(AbstractVariationRepository):
         )
         return result.scalars().first()
 
+    async def _get_many(self, ids):
+        if not ids:
+            return []
+        result = await self.session.execute(
+            select(models.Variation).filter(
+                models.Variation.id.in_(ids), models.Variation.is_deleted == 0
+            )
+        )
+        return result.scalars().all()
+
     async def _get_all(self, page, page_size=10):
         stmt = (
             select(models.Variation)
@@ -364,21 +589,18 @@ class SqlAlchemyOrderRepository(AbstractOrderRepository):
 
         return result.scalars().first()
 
-    async def _get_all(self, page, page_size=10, filters=None):
-        query = (
-            select(models.Order)
-            .options(joinedload(models.Order.order_items))
-            .order_by(models.Order.id)
-            .offset((page - 1) * page_size)
-            .limit(page_size)
+    async def _get_all(self, page, page_size=10, filters=None, cursor=None):
+        query = select(models.Order).options(
+            selectinload(models.Order.order_items)
         )
+        query = paginate(query, models.Order, page, page_size, cursor)
         if filters:
             for key, value in filters.items():
                 if value:
                     query = query.filter(getattr(models.Order, key) == value)
 
         result = await self.session.execute(query)
-        return result.scalars().unique().all()
+        return result.scalars().all()
 
     async def _delete(self, order):
         order.is_deleted = 1
@@ -417,3 +639,47 @@ class SqlAlchemyOrderItemRepository(AbstractOrderItemRepository):
 
     async def _update(self, order_item):
         await self.session.merge(order_item)
+
+
+class SqlAlchemyOutboxRepository(AbstractOutboxRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _add(self, channel, event, payload):
+        await self.session.execute(
+            orm.outbox.insert().values(
+                channel=channel, event=event, payload=payload
+            )
+        )
+
+
+class SqlAlchemyCatalogRepository(AbstractCatalogRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def _save(self, row):
+        # An upsert, a delete then insert lets two writers both insert.
+        table = orm.catalog_read_model
+        dialect = self.session.get_bind().dialect.name
+        insert = {"postgresql": postgresql, "sqlite": sqlite}[dialect].insert
+        stmt = insert(table).values(row)
+        await self.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.product_id],
+                set_={
+                    name: stmt.excluded[name]
+                    for name in row
+                    if name != "product_id"
+                },
+            )
+        )
+
+    async def _remove(self, product_id):
+        await self.session.execute(
+            orm.catalog_read_model.delete().where(
+                orm.catalog_read_model.c.product_id == product_id
+            )
+        )
+
+    async def _rebuild(self):
+        return await rebuild_catalog_read_model(self.session)
@@ -0,0 +1,61 @@
+import time
+from collections import OrderedDict
+from typing import Optional
+from api.adapters import redis_eventpublisher
+
+
+class TokenRevocations:
+    """Per user "tokens issued before this are revoked" timestamps.
+
+    The timestamps live in Redis, expiring with the longest token
+    lifetime. Lookups are cached in process for ``ttl`` seconds, so a
+    revocation takes up to that long to reach other workers.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        ttl: float = 30,
+        token_lifetime: int = 1800,
+        max_entries: int = 10000,
+    ):
+        self.client = client or redis_eventpublisher.r
+        self.ttl = ttl
+        self.token_lifetime = token_lifetime
+        self.max_entries = max_entries
+        self._cache: OrderedDict = OrderedDict()
+        # set by the auth dependency while Redis can't be reached
+        self.unavailable = False
+
+    async def is_revoked(self, user_id: str, issued_at: int) -> bool:
+        # Token iat is in whole seconds, so is the revocation. A token
+        # issued in the same second as the revocation stays valid, so
+        # logging back in right after logging out works.
+        revoked_at = await self.revoked_at(user_id)
+        return revoked_at is not None and issued_at < revoked_at
+
+    async def revoked_at(self, user_id: str) -> Optional[int]:
+        entry = self._cache.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        value = await self.client.get(self._key(user_id))
+        revoked_at = int(float(value)) if value is not None else None
+        self._remember(user_id, revoked_at)
+        return revoked_at
+
+    async def revoke(self, user_id: str):
+        """Revoke every token issued to the user until now."""
+        revoked_at = int(time.time())
+        await self.client.set(
+            self._key(user_id), revoked_at, ex=self.token_lifetime
+        )
+        self._remember(user_id, revoked_at)
+
+    def _key(self, user_id: str) -> str:
+        return f"auth:revoked:{user_id}"
+
+    def _remember(self, user_id, revoked_at):
+        self._cache[user_id] = (time.monotonic() + self.ttl, revoked_at)
+        self._cache.move_to_end(user_id)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from email.message import Message
+from typing import Iterable, List
+import aiosmtplib
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPPool:
+    """Up to ``size`` persistent SMTP sessions shared by concurrent sends.
+
+    Each session carries one message at a time. Sessions are opened
+    lazily and kept open between messages. One that sat idle for more
+    than ``keepalive`` seconds is checked with a NOOP before it is reused,
+    and one that fails is dropped and replaced by a fresh connection.
+    Sessions idle for more than ``idle_timeout`` are closed.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        size: int = 4,
+        keepalive: float = 30,
+        idle_timeout: float = 300,
+        timeout: float = 10,
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.size = size
+        self.keepalive = keepalive
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._idle: List = []  # (last used, client), most recent last
+        self._slots = asyncio.Semaphore(size)
+        self.connects = 0
+        self.sent = 0
+        self.failures = 0
+
+    async def send(self, message: Message):
+        await self.send_many([message])
+
+    async def send_many(self, messages: Iterable[Message]) -> int:
+        """Deliver ``messages`` over one session, returns how many went.
+
+        A message the server refuses is logged and skipped; if the
+        connection drops the message is retried once on a new one.
+        """
+        sent = 0
+        async with self.connection() as session:
+            for message in messages:
+                try:
+                    await session.send(message)
+                except (
+                    aiosmtplib.SMTPResponseException,
+                    aiosmtplib.SMTPRecipientsRefused,
+                ) as e:
+                    logger.error("SMTP refused message: %s", e)
+                    self.failures += 1
+                else:
+                    sent += 1
+        return sent
+
+    @asynccontextmanager
+    async def connection(self):
+        async with self._slots:
+            client = await self._checkout()
+            session = _Session(self, client)
+            try:
+                yield session
+            finally:
+                client = session.client
+                if client is not None and client.is_connected:
+                    self._idle.append((time.monotonic(), client))
+                elif client is not None:
+                    client.close()
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        await asyncio.gather(
+            *(self._quit(client) for _, client in idle),
+            return_exceptions=True,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "idle": len(self._idle),
+            "connects": self.connects,
+            "sent": self.sent,
+            "failures": self.failures,
+        }
+
+    async def _checkout(self) -> aiosmtplib.SMTP:
+        while self._idle:
+            last_used, client = self._idle.pop()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout or not client.is_connected:
+                await self._quit(client)
+                continue
+            if idle_for > self.keepalive:
+                try:
+                    await client.noop()
+                except (aiosmtplib.SMTPException, OSError):
+                    client.close()
+                    continue
+            return client
+        return await self._connect()
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname, port=self.port, timeout=self.timeout
+        )
+        await client.connect()
+        self.connects += 1
+        return client
+
+    async def _quit(self, client: aiosmtplib.SMTP):
+        if not client.is_connected:
+            return
+        try:
+            await client.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            client.close()
+
+
+class _Session:
+    """A checked out connection, replaced if it drops mid send."""
+
+    def __init__(self, pool: SMTPPool, client: aiosmtplib.SMTP):
+        self.pool = pool
+        self.client = client
+
+    async def send(self, message: Message):
+        if self.client is None:
+            self.client = await self.pool._connect()
+        try:
+            await self.client.send_message(message)
+        except (aiosmtplib.SMTPServerDisconnected, OSError):
+            logger.warning("SMTP connection lost, reconnecting")
+            self.client.close()
+            self.client = None
+            self.client = await self.pool._connect()
+            await self.client.send_message(message)
+        self.pool.sent += 1
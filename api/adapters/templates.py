@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+from pathlib import Path
+import jinja2
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from api import config
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+
+class TemplateRenderer:
+    """One Jinja environment for the whole process.
+
+    Templates are compiled once, at ``precompile`` or on first use, and
+    kept in the environment's cache. The compiled bytecode is also written
+    to ``bytecode_cache_dir`` so other workers and restarts skip the
+    compile. With ``auto_reload`` (development) templates edited on disk
+    are picked up on the next render.
+
+    Renders with more than ``offload_items`` items in their list arguments
+    (orders with many lines) run in a thread, smaller ones on the loop.
+    """
+
+    def __init__(
+        self,
+        directory=TEMPLATES_DIR,
+        auto_reload: bool = False,
+        bytecode_cache_dir: str = None,
+        offload_items: int = 50,
+    ):
+        self.offload_items = offload_items
+        self.env = Environment(
+            loader=FileSystemLoader(str(directory)),
+            auto_reload=auto_reload,
+        )
+        if bytecode_cache_dir is not None:
+            self.env.bytecode_cache = FileSystemBytecodeCache(
+                bytecode_cache_path(bytecode_cache_dir, self.env)
+            )
+
+    def precompile(self):
+        for name in self.env.list_templates():
+            self.env.get_template(name)
+        logger.info("Compiled %s templates", len(self.env.list_templates()))
+
+    async def render(self, template: str, **kwargs) -> str:
+        # Jinja's async mode is slower here and the templates await
+        # nothing, so the environment renders synchronously.
+        compiled = self.env.get_template(template)
+        items = sum(
+            len(value)
+            for value in kwargs.values()
+            if isinstance(value, (list, tuple))
+        )
+        if items > self.offload_items:
+            return await asyncio.to_thread(compiled.render, **kwargs)
+        return compiled.render(**kwargs)
+
+
+def bytecode_cache_path(directory: str, env: Environment) -> str:
+    """A subdirectory of ``directory`` for this Jinja version and config.
+
+    Jinja's cache keys only cover the template name and source, so
+    bytecode compiled by another version, or with other environment
+    options (async mode, extensions), must not share a directory.
+    """
+    options = repr(
+        (
+            jinja2.__version__,
+            env.is_async,
+            sorted(env.extensions),
+            env.optimized,
+            env.newline_sequence,
+            env.keep_trailing_newline,
+            env.trim_blocks,
+            env.lstrip_blocks,
+        )
+    )
+    digest = hashlib.blake2b(options.encode(), digest_size=8).hexdigest()
+    path = os.path.join(directory, f"jinja-{digest}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@functools.lru_cache(maxsize=None)
+def get_renderer() -> TemplateRenderer:
+    """The process wide renderer, built from the config on first use."""
+    renderer = TemplateRenderer(**config.get_template_settings())
+    renderer.precompile()
+    return renderer
@@ -1,14 +1,25 @@
+import functools
 import inspect
 from typing import Awaitable, Callable
 import os
+from api import config
 from api.adapters import orm, redis_eventpublisher
+from api.adapters.catalog_cache import (
+    AbstractCatalogCache,
+    NullCatalogCache,
+    TieredCatalogCache,
+)
 from api.adapters.notifications import (
     AbstractNotifications,
+    DebouncedNotifications,
     EmailLocalNotifications,
     EmailAWSNotifications,
 )
+from api.adapters.revocations import TokenRevocations
 from api.domain import events
 from api.service_layer import handlers, messagebus, unit_of_work
+from api.service_layer.event_worker import BackgroundEventWorker
+from api.utils.hashoor import ACCESS_TOKEN_EXPIRE_MINUTES, PasswordHasher
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,34 +32,41 @@ def bootstrap(
     publish: Callable[
         [str, events.Event, dict], Awaitable
     ] = redis_eventpublisher.publish,
+    uow_factory: Callable[[], unit_of_work.AbstractUnitOfWork] = None,
+    max_concurrency: int = None,
+    catalog_cache: AbstractCatalogCache = None,
+    passwords: PasswordHasher = None,
 ) -> messagebus.MessageBus:
     if notifications is None:
-        environment = os.getenv("NOTIFICATIONS_ENV", "dev")
-        if environment == "production":
-            notifications = EmailAWSNotifications()
-        else:
-            notifications = EmailLocalNotifications()
+        notifications = build_notifications()
+    if catalog_cache is None:
+        catalog_cache = NullCatalogCache()
+    if passwords is None:
+        passwords = build_password_hasher()
+    # A fixed uow is shared by every call (handy for tests), otherwise
+    # each call to the bus gets its own unit of work from the factory.
+    if uow is not None:
+        uow_factory = lambda: uow  # noqa: E731
     # Here we could switch configs. i.e pymongo
-    if not uow:
+    if not uow_factory:
         if os.getenv("UOW") == "sqlalchemy":
             logger.info("Starting ORM")
-            uow = unit_of_work.SqlAlchemyUnitOfWork()
-            logger.info("Using UOW: %s", uow.__class__)
-            print("Using UOW: %s", uow.__class__)
+            uow_factory = unit_of_work.SqlAlchemyUnitOfWork
+            logger.info("Using UOW: %s", uow_factory)
             if start_orm and orm.has_started_mappers() is False:
                 orm.start_mappers()
         else:  # We are doing the same, as it's an example.
             logger.info("Starting ORM")
-            uow = unit_of_work.SqlAlchemyUnitOfWork()
-            logger.info("Using UOW: %s", uow.__class__)
-            print("Using UOW: %s", uow.__class__)
+            uow_factory = unit_of_work.SqlAlchemyUnitOfWork
+            logger.info("Using UOW: %s", uow_factory)
             if start_orm and orm.has_started_mappers() is False:
                 orm.start_mappers()
 
     dependencies = {
-        "uow": uow,
         "notifications": notifications,
         "publish": publish,
+        "catalog_cache": catalog_cache,
+        "passwords": passwords,
     }
 
     injected_event_handlers = {
@@ -63,18 +81,137 @@ def bootstrap(
         for command_type, handler in handlers.COMMAND_HANDLERS.items()
     }
 
+    if max_concurrency is None:
+        max_concurrency = config.get_event_handler_concurrency()
+
     return messagebus.MessageBus(
-        uow=uow,
+        uow_factory=uow_factory,
         event_handlers=injected_event_handlers,
         command_handlers=injected_command_handlers,
+        max_concurrency=max_concurrency,
+        ordered_events=handlers.ORDERED_EVENTS,
     )
 
 
+def build_notifications() -> AbstractNotifications:
+    environment = os.getenv("NOTIFICATIONS_ENV", "dev")
+    if environment == "production":
+        notifications = EmailAWSNotifications()
+    else:
+        notifications = EmailLocalNotifications()
+    window = config.get_notification_debounce_window()
+    if window > 0:
+        notifications = DebouncedNotifications(notifications, window)
+    return notifications
+
+
+def build_password_hasher() -> PasswordHasher:
+    return PasswordHasher(**config.get_password_hasher_settings())
+
+
+def build_catalog_cache() -> AbstractCatalogCache:
+    settings = config.get_catalog_cache_settings()
+    if not settings.pop("enabled"):
+        return NullCatalogCache()
+    return TieredCatalogCache(**settings)
+
+
+class Resources:
+    """Process wide resources, built once by the app lifespan.
+
+    Owns the engine, the notification adapters, the catalog cache, the
+    password hasher, the token revocations and the Redis client used by
+    the publisher, and the single message bus shared by all requests.
+    Unless disabled, events raised by commands are handled by a
+    background worker so responses don't wait for notifications.
+    """
+
+    def __init__(
+        self,
+        notifications: AbstractNotifications = None,
+        publish: Callable[
+            [str, events.Event, dict], Awaitable
+        ] = redis_eventpublisher.publish,
+        background_events: bool = None,
+    ):
+        if orm.has_started_mappers() is False:
+            orm.start_mappers()
+        self.engine = unit_of_work.create_engine()
+        self.session_factory = unit_of_work.create_session_factory(
+            self.engine
+        )
+        self.notifications = notifications or build_notifications()
+        self.publish = publish
+        self.catalog_cache = build_catalog_cache()
+        self.passwords = build_password_hasher()
+        self.revocations = TokenRevocations(
+            ttl=config.get_revocation_cache_ttl(),
+            token_lifetime=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        )
+        self._bus = bootstrap(
+            uow_factory=self.uow_factory,
+            notifications=self.notifications,
+            start_orm=False,
+            publish=self.publish,
+            catalog_cache=self.catalog_cache,
+            passwords=self.passwords,
+        )
+        if background_events is None:
+            background_events = config.get_background_events()
+        self.event_worker = None
+        if background_events:
+            self.event_worker = BackgroundEventWorker(
+                self._bus,
+                maxsize=config.get_event_queue_size(),
+                workers=config.get_event_workers(),
+            )
+            self._bus.event_dispatcher = self.event_worker.submit
+
+    def uow_factory(self) -> unit_of_work.SqlAlchemyUnitOfWork:
+        return unit_of_work.SqlAlchemyUnitOfWork(self.session_factory)
+
+    def bus(self) -> messagebus.MessageBus:
+        return self._bus
+
+    async def start(self):
+        await self.catalog_cache.start()
+        if self.event_worker is not None:
+            self.event_worker.start()
+
+    def stats(self) -> dict:
+        stats = {
+            "catalog_cache": self.catalog_cache.stats(),
+            "passwords": self.passwords.stats(),
+            "notifications": self.notifications.stats(),
+            "database": self.engine.pool.stats(),
+        }
+        if self.event_worker is not None:
+            stats["events"] = self.event_worker.stats()
+        return stats
+
+    async def close(self):
+        logger.info("Releasing application resources")
+        if self.event_worker is not None:
+            await self.event_worker.stop(config.get_event_drain_timeout())
+        await self.notifications.close()
+        await self.catalog_cache.close()
+        self.passwords.close()
+        await redis_eventpublisher.close()
+        await self.engine.dispose()
+
+
+@functools.lru_cache(maxsize=None)
+def handler_params(handler) -> frozenset:
+    return frozenset(inspect.signature(handler).parameters)
+
+
 def inject_dependencies(handler, dependencies):
-    params = inspect.signature(handler).parameters
+    params = handler_params(handler)
     deps = {
         name: dependency
         for name, dependency in dependencies.items()
         if name in params
     }
-    return lambda message: handler(message, **deps)
+    if "uow" in params:
+        return lambda message, uow: handler(message, uow=uow, **deps)
+    return lambda message, uow: handler(message, **deps)
@@ -38,3 +38,218 @@ def get_repo_orm():
 
 def get_mailhog_host():
     return os.environ.get("MAILHOG_HOST", "localhost")
+
+
+def get_event_handler_concurrency():
+    return int(os.environ.get("EVENT_HANDLER_CONCURRENCY", 1))
+
+
+def get_background_events():
+    return os.environ.get("BACKGROUND_EVENTS", "true").lower() == "true"
+
+
+def get_event_queue_size():
+    return int(os.environ.get("EVENT_QUEUE_SIZE", 1000))
+
+
+def get_event_workers():
+    return int(os.environ.get("EVENT_WORKERS", 2))
+
+
+def get_event_drain_timeout():
+    return float(os.environ.get("EVENT_DRAIN_TIMEOUT", 10))
+
+
+def get_outbox_batch_size():
+    return int(os.environ.get("OUTBOX_BATCH_SIZE", 100))
+
+
+def get_outbox_poll_interval():
+    return float(os.environ.get("OUTBOX_POLL_INTERVAL", 0.5))
+
+
+def get_outbox_retention():
+    # seconds a relayed row is kept before it is purged
+    return float(os.environ.get("OUTBOX_RETENTION", 86400))
+
+
+def get_outbox_purge_interval():
+    return float(os.environ.get("OUTBOX_PURGE_INTERVAL", 60))
+
+
+def get_event_transport():
+    # "pubsub" or "streams"
+    return os.environ.get("EVENT_TRANSPORT", "pubsub")
+
+
+def get_stream_settings():
+    return {
+        "maxlen": int(os.environ.get("EVENT_STREAM_MAXLEN", 100000)),
+        "group": os.environ.get("EVENT_CONSUMER_GROUP", "notifications"),
+        "claim_idle_ms": int(os.environ.get("EVENT_CLAIM_IDLE_MS", 60000)),
+        "max_deliveries": int(os.environ.get("EVENT_MAX_DELIVERIES", 5)),
+    }
+
+
+def get_event_codec():
+    # "json" or "msgpack"
+    return os.environ.get("EVENT_CODEC", "json")
+
+
+def get_consumer_settings():
+    return {
+        "workers": int(os.environ.get("EVENT_CONSUMER_WORKERS", 8)),
+        "queue_size": int(os.environ.get("EVENT_CONSUMER_QUEUE_SIZE", 100)),
+        "drain_timeout": float(
+            os.environ.get("EVENT_CONSUMER_DRAIN_TIMEOUT", 30)
+        ),
+    }
+
+
+def get_catalog_cache_settings():
+    return {
+        "enabled": os.environ.get("CATALOG_CACHE", "true").lower() == "true",
+        # per worker LRU in front of the shared redis copy
+        "l1_size": int(os.environ.get("CATALOG_CACHE_L1_SIZE", 256)),
+        "l1_ttl": float(os.environ.get("CATALOG_CACHE_L1_TTL", 5)),
+        "l2_ttl": int(os.environ.get("CATALOG_CACHE_L2_TTL", 300)),
+    }
+
+
+def get_auth_mode():
+    # "database" looks the user up on every request, "claims" trusts the
+    # signed token and only checks it wasn't revoked (in Redis)
+    return os.environ.get("AUTH_MODE", "database")
+
+
+def get_revocation_cache_ttl():
+    return float(os.environ.get("AUTH_REVOCATION_CACHE_TTL", 30))
+
+
+def get_password_hasher_settings():
+    # bcrypt runs in this many threads per worker, with at most
+    # max_pending more calls waiting before logins get a 503
+    return {
+        "workers": int(os.environ.get("PASSWORD_HASH_WORKERS", 2)),
+        "max_pending": int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 64)),
+    }
+
+
+def get_template_settings():
+    # TEMPLATES_BYTECODE_CACHE is a directory, private to the app, for
+    # compiled templates; unset or "off" keeps them in memory only
+    bytecode_cache = os.environ.get("TEMPLATES_BYTECODE_CACHE", "off")
+    if bytecode_cache in ("", "off"):
+        bytecode_cache = None
+    return {
+        "auto_reload": (
+            os.environ.get("TEMPLATES_AUTO_RELOAD", "false").lower() == "true"
+        ),
+        "bytecode_cache_dir": bytecode_cache,
+        # renders with more list items than this run off the event loop
+        "offload_items": int(os.environ.get("TEMPLATES_OFFLOAD_ITEMS", 50)),
+    }
+
+
+def get_smtp_pool_settings():
+    return {
+        "size": int(os.environ.get("SMTP_POOL_SIZE", 4)),
+        # idle sessions are NOOP checked after keepalive seconds and closed
+        # after idle_timeout
+        "keepalive": float(os.environ.get("SMTP_KEEPALIVE", 30)),
+        "idle_timeout": float(os.environ.get("SMTP_IDLE_TIMEOUT", 300)),
+    }
+
+
+def get_ses_settings():
+    return {
+        "region": os.environ.get("AWS_REGION", "us-west-1"),
+        # e.g. a local stub (moto, localstack) in tests
+        "endpoint_url": os.environ.get("SES_ENDPOINT_URL") or None,
+        # concurrent SES calls, and pooled connections, per worker
+        "max_concurrency": int(os.environ.get("SES_MAX_CONCURRENCY", 10)),
+        "source": os.environ.get("SES_SOURCE", "marcoiurman@gmail.com"),
+        # SES template used for sale announcements to many customers
+        "sale_template": os.environ.get("SES_SALE_TEMPLATE", "order_sale"),
+    }
+
+
+def get_notification_debounce_window():
+    # seconds status emails of one order are held so rapid changes go out
+    # as one email with the latest status. Off (0) by default, each one is
+    # sent straight away.
+    return float(os.environ.get("NOTIFICATION_DEBOUNCE_WINDOW", 0))
+
+
+# Engine settings per DB_PROFILE. pool_size/max_overflow of None are
+# derived from DB_MAX_CONNECTIONS and the number of uvicorn workers.
+ENGINE_PROFILES = {
+    "dev": {
+        "echo": False,
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_cache_size": 100,
+    },
+    "prod": {
+        "echo": False,
+        "pool_size": None,
+        "max_overflow": None,
+        "pool_timeout": 10,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+        "statement_cache_size": 500,
+    },
+    # long steady runs, skip the pre-ping round trip on every checkout
+    "benchmark": {
+        "echo": False,
+        "pool_size": None,
+        "max_overflow": None,
+        "pool_timeout": 30,
+        "pool_recycle": -1,
+        "pool_pre_ping": False,
+        "statement_cache_size": 1000,
+    },
+}
+
+
+def get_web_workers():
+    # uvicorn reads its --workers default from WEB_CONCURRENCY
+    return int(os.environ.get("WEB_CONCURRENCY", 1))
+
+
+def get_engine_settings():
+    """Engine settings of the DB_PROFILE, with DB_* overrides."""
+    profile = os.environ.get("DB_PROFILE") or "dev"
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(
+            f"Unknown DB_PROFILE {profile!r},"
+            f" use one of {', '.join(ENGINE_PROFILES)}"
+        )
+    settings = dict(ENGINE_PROFILES[profile])
+    if settings["pool_size"] is None:
+        # Split the connections Postgres allows us between the workers:
+        # half kept open, the other half as overflow for bursts.
+        total = int(os.environ.get("DB_MAX_CONNECTIONS", 80))
+        per_worker = max(total // get_web_workers(), 2)
+        settings["pool_size"] = per_worker // 2
+        settings["max_overflow"] = per_worker - per_worker // 2
+    overrides = {
+        "pool_size": ("DB_POOL_SIZE", int),
+        "max_overflow": ("DB_MAX_OVERFLOW", int),
+        "pool_timeout": ("DB_POOL_TIMEOUT", float),
+        "pool_recycle": ("DB_POOL_RECYCLE", int),
+        "statement_cache_size": ("DB_STATEMENT_CACHE_SIZE", int),
+    }
+    for name, (variable, type_) in overrides.items():
+        if variable in os.environ:
+            settings[name] = type_(os.environ[variable])
+    if "DB_POOL_PRE_PING" in os.environ:
+        settings["pool_pre_ping"] = (
+            os.environ["DB_POOL_PRE_PING"].lower() == "true"
+        )
+    if "DB_ECHO" in os.environ:
+        settings["echo"] = os.environ["DB_ECHO"].lower() == "true"
+    return settings
@@ -3,11 +3,18 @@ from api.adapters.orm import create_tables, drop_tables
 from api.config import get_sync_postgres_uri
 from api.utils.hashoor import hash_password
 from sqlalchemy import select
-from api.adapters.orm import user, product, variation, order, order_item
+from api.adapters import repository
+from api.adapters.orm import (
+    catalog_read_model,
+    user,
+    product,
+    variation,
+    order,
+    order_item,
+)
 from api.domain.enums import UserRole, OrderStatus, ConsumeLocation
-from sqlalchemy import text
 import random
-import uuid
+from api.utils.ids import uuid7
 from sqlalchemy import create_engine
 import time
 
@@ -35,7 +42,7 @@ def create_initial_data(engine):
     trans = conn.begin()
     try:
         # Create a manager
-        manager_id = str(uuid.uuid4())
+        manager_id = uuid7()
         conn.execute(
             user.insert(),
             {
@@ -47,7 +54,7 @@ def create_initial_data(engine):
         )
 
         # Create a customer
-        customer_id = str(uuid.uuid4())
+        customer_id = uuid7()
         conn.execute(
             user.insert(),
             {
@@ -83,7 +90,7 @@ def create_initial_data(engine):
         # Create each product and variations
         product_ids = []
         for p in product_catalog:
-            product_id = str(uuid.uuid4())
+            product_id = uuid7()
             conn.execute(
                 product.insert(),
                 {
@@ -97,7 +104,7 @@ def create_initial_data(engine):
                 conn.execute(
                     variation.insert(),
                     {
-                        "id": str(uuid.uuid4()),
+                        "id": uuid7(),
                         "name": v,
                         "price": round(random.uniform(10.0, 100.0), 2),
                         "product_id": product_id,
@@ -112,7 +119,7 @@ def create_initial_data(engine):
                 select(variation).where(variation.c.product_id == product_id)
             ).fetchone()
             if variation_exists is not None:
-                order_id = str(uuid.uuid4())
+                order_id = uuid7()
                 order_ids.append(order_id)
                 conn.execute(
                     order.insert(),
@@ -127,7 +134,7 @@ def create_initial_data(engine):
                 conn.execute(
                     order_item.insert(),
                     {
-                        "id": str(uuid.uuid4()),
+                        "id": uuid7(),
                         "quantity": 1,
                         "unit_price": variation_exists.price,
                         "product_id": product_id,
@@ -135,6 +142,7 @@ def create_initial_data(engine):
                         "order_id": order_id,
                     },
                 )
+        fill_catalog_read_model(conn)
         trans.commit()
     except Exception as e:
         print(e)
@@ -143,8 +151,25 @@ def create_initial_data(engine):
         conn.close()
 
 
+def fill_catalog_read_model(conn):
+    # Seed data is small, the app side rebuild does this in batches.
+    variations = conn.execute(
+        select(variation).where(variation.c.is_deleted == 0)
+    ).all()
+    rows = [
+        repository.catalog_row(
+            p, [v for v in variations if v.product_id == p.id]
+        )
+        for p in conn.execute(
+            select(product).where(product.c.is_deleted == 0)
+        )
+    ]
+    if rows:
+        conn.execute(catalog_read_model.insert(), rows)
+
+
 async def create_initial_data_async(conn):
-    manager_id = str(uuid.uuid4())
+    manager_id = uuid7()
     await conn.execute(
         user.insert(),
         {
@@ -156,7 +181,7 @@ async def create_initial_data_async(conn):
     )
 
     # Create a customer
-    customer_id = str(uuid.uuid4())
+    customer_id = uuid7()
     await conn.execute(
         user.insert(),
         {
@@ -184,7 +209,7 @@ async def create_initial_data_async(conn):
     # Create each product and variations
     product_ids = []
     for p in product_catalog:
-        product_id = str(uuid.uuid4())
+        product_id = uuid7()
         await conn.execute(
             product.insert(),
             {
@@ -198,7 +223,7 @@ async def create_initial_data_async(conn):
             await conn.execute(
                 variation.insert(),
                 {
-                    "id": str(uuid.uuid4()),
+                    "id": uuid7(),
                     "name": v,
                     "price": round(random.uniform(10.0, 100.0), 2),
                     "product_id": product_id,
@@ -214,7 +239,7 @@ async def create_initial_data_async(conn):
         )
         variation_exists = result.fetchone()
         if variation_exists is not None:
-            order_id = str(uuid.uuid4())
+            order_id = uuid7()
             order_ids.append(order_id)
             await conn.execute(
                 order.insert(),
@@ -229,7 +254,7 @@ async def create_initial_data_async(conn):
             await conn.execute(
                 order_item.insert(),
                 {
-                    "id": str(uuid.uuid4()),
+                    "id": uuid7(),
                     "quantity": 1,
                     "unit_price": variation_exists.price,
                     "product_id": product_id,
@@ -238,19 +263,17 @@ async def create_initial_data_async(conn):
                 },
             )
 
+    await repository.rebuild_catalog_read_model(conn)
+
     # Save results to test folder as json
     db_dict = {}
 
-    for table_name in [
-        "users",
-        "products",
-        "variations",
-        "orders",
-        "order_items",
-    ]:
-        result = await conn.execute(text(f"SELECT * FROM {table_name}"))
+    # Selecting through the tables (not raw SQL) returns ids as strings
+    # whatever the backend stores them as.
+    for table in [user, product, variation, order, order_item]:
+        result = await conn.execute(table.select())
         rows = result.fetchall()
-        db_dict[table_name] = [dict(row._mapping) for row in rows]
+        db_dict[table.name] = [dict(row._mapping) for row in rows]
     import json
 
     with open("tests/e2e/db_dict.json", "w") as f:
@@ -18,6 +18,8 @@ class CustomizeProduct(Command):
 @dataclass
 class GetAllProducts(Command):
     page: int
+    page_size: int = 10
+    cursor: str | None = None
 
 
 @dataclass
@@ -49,6 +51,7 @@ class GetOrders(Command):
     page: int
     filters: dict
     page_size: int = 10
+    cursor: str | None = None
 
 
 @dataclass
@@ -56,6 +59,7 @@ class GetOrdersForCustomer(Command):
     page: int
     user_id: str
     page_size: int = 10
+    cursor: str | None = None
 
 
 @dataclass
@@ -71,6 +75,11 @@ class GetProduct(Command):
     id: str
 
 
+@dataclass
+class GetProductVersion(Command):
+    id: str
+
+
 @dataclass
 class UpdateProduct(Command):
     id: str
@@ -131,9 +140,15 @@ class AuthenticateUser(Command):
 
 
 # Catalog
+@dataclass
+class RebuildCatalog(Command):
+    pass
+
+
 @dataclass
 class GetCatalog(Command):
     page: int
+    cursor: str | None = None
 
 
 # POC
@@ -1,8 +1,8 @@
-import uuid
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import List, Optional
 from api.domain.enums import UserRole, ConsumeLocation, OrderStatus
+from api.utils.ids import uuid7
 from . import events
 
 
@@ -22,7 +22,7 @@ class User:
 
     def __post_init__(self):
         if not self.id:
-            object.__setattr__(self, "id", str(uuid.uuid4()))
+            object.__setattr__(self, "id", uuid7())
 
     def __eq__(self, other):
         if not isinstance(other, User):
@@ -54,7 +54,7 @@ class Variation:
 
     def __post_init__(self):
         if not self.id:
-            object.__setattr__(self, "id", str(uuid.uuid4()))
+            object.__setattr__(self, "id", uuid7())
 
     def __hash__(self):
         return hash(self.id)
@@ -68,13 +68,14 @@ class Product:
     variations: List[Variation] = field(default_factory=list)
     id: str | None = None
     is_deleted: int = 0
+    version: int = 1
     _events: List[events.Event] = field(default_factory=list)
     created_at: datetime = datetime.utcnow()
     updated_at: datetime = datetime.utcnow()
 
     def __post_init__(self):
         if not self.id:
-            object.__setattr__(self, "id", str(uuid.uuid4()))
+            object.__setattr__(self, "id", uuid7())
 
     def __hash__(self):
         return hash(self.id)
@@ -115,13 +116,33 @@ class OrderItem:
     variation_id: str
     order_id: str
     unit_price: float
+    # Names as they were when the order was placed.
+    product_name: str | None = None
+    variation_name: str | None = None
     id: str | None = None
     created_at: datetime = datetime.utcnow()
     updated_at: datetime = datetime.utcnow()
 
     def __post_init__(self):
         if not self.id:
-            object.__setattr__(self, "id", str(uuid.uuid4()))
+            object.__setattr__(self, "id", uuid7())
+
+    @property
+    def display_name(self) -> str:
+        if self.variation_name:
+            return f"{self.product_name} with {self.variation_name}"
+        return self.product_name or ""
+
+    def event_data(self) -> dict:
+        """The item as carried by order events, ready for the emails."""
+        return {
+            "id": self.id,
+            "product_id": self.product_id,
+            "variation_id": self.variation_id,
+            "quantity": self.quantity,
+            "unit_price": self.unit_price,
+            "display_name": self.display_name,
+        }
 
 
 @dataclass
@@ -139,7 +160,7 @@ class Order:
 
     def __post_init__(self):
         if not self.id:
-            object.__setattr__(self, "id", str(uuid.uuid4()))
+            object.__setattr__(self, "id", uuid7())
 
     def __eq__(self, other):
         if not isinstance(other, Order):
@@ -199,7 +220,7 @@ class Order:
             events.OrderStatusChanged(
                 order_id=self.id,
                 user_id=self.user_id,
-                order_items=items,
+                order_items=[item.event_data() for item in items],
                 total_cost=self.total_cost,
                 consume_location=self.consume_location,
                 status=status,
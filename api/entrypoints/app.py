@@ -1,15 +1,29 @@
-from fastapi import FastAPI, HTTPException, Depends, Query
+from fastapi import (
+    FastAPI,
+    HTTPException,
+    Depends,
+    Header,
+    Query,
+    Request,
+    Response,
+)
+from typing import Optional
+from uuid import UUID
 from api.entrypoints import schemas
 from api.domain import commands
-from api.bootstrap import bootstrap
+from api.adapters.catalog_cache import AbstractCatalogCache
+from api.bootstrap import Resources
 from api.service_layer import messagebus
 from api.entrypoints.auth_router import (
     auth_router,
+    get_bus,
     get_current_manager,
     get_current_customer,
 )
+from contextlib import asynccontextmanager
 from dataclasses import asdict
 from api import views
+from api.utils import etags, pagination
 import logging
 import uvicorn
 from fastapi import APIRouter
@@ -30,14 +44,22 @@ tags_metadata = [
 ]
 
 
-def get_bus() -> messagebus.MessageBus:
-    return bootstrap()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.resources = Resources()
+    await app.state.resources.start()
+    yield
+    await app.state.resources.close()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 router = APIRouter()
 
 
+def get_catalog_cache(request: Request) -> AbstractCatalogCache:
+    return request.app.state.resources.catalog_cache
+
+
 @router.post(
     "/orders", response_model=schemas.OrderResponseBase, tags=["Customers"]
 )
@@ -60,18 +82,22 @@ async def get_order_for_managers(
     bus: messagebus.MessageBus = Depends(get_bus),
     page: int = Query(1, gt=0),
     page_size: int = Query(10, gt=0),
+    cursor: Optional[str] = None,
     current_manager=Depends(get_current_manager),
     filters: dict = Depends(schemas.OrderFilters),
 ):
     if filters:
         filters = filters.dict()
-    cmd = commands.GetOrders(page=page, page_size=page_size, filters=filters)
+    cmd = commands.GetOrders(
+        page=page, page_size=page_size, filters=filters, cursor=cursor
+    )
     result = await bus.handle(cmd)
     if result:
         return schemas.GetOrdersResponse(
             orders=[schemas.DetailedOrderResponse(
                 **asdict(order)) for order in result],
             page=page,
+            next_cursor=pagination.next_cursor(result, page_size),
         )
     return schemas.GetOrdersResponse(orders=[], page=page)
 
@@ -82,12 +108,12 @@ async def get_order_for_managers(
     tags=["Manager"],
 )
 async def update_order_status(
-    order_id: str,
+    order_id: UUID,
     status_update: schemas.OrderStatusUpdate,
     bus: messagebus.MessageBus = Depends(get_bus),
     current_manager=Depends(get_current_manager),
 ):
-    cmd = commands.UpdateOrderStatus(id=order_id, **status_update.dict())
+    cmd = commands.UpdateOrderStatus(id=str(order_id), **status_update.dict())
     result = await bus.handle(cmd)
     return result
 
@@ -100,15 +126,21 @@ async def update_order_status(
 async def get_order_for_customer(
     bus: messagebus.MessageBus = Depends(get_bus),
     page: int = Query(1, gt=0),
+    cursor: Optional[str] = None,
     current_customer=Depends(get_current_customer),
 ):
-    cmd = commands.GetOrdersForCustomer(page=page, user_id=current_customer.id)
+    cmd = commands.GetOrdersForCustomer(
+        page=page, user_id=current_customer.id, cursor=cursor
+    )
     result = await bus.handle(cmd)
     # Create schema
     if result:
+        next_cursor = pagination.next_cursor(result, cmd.page_size)
         result = [schemas.OrderResponseBase(
             **asdict(order)) for order in result]
-        return schemas.GetCustomerOrdersResponse(page=page, orders=result)
+        return schemas.GetCustomerOrdersResponse(
+            page=page, orders=result, next_cursor=next_cursor
+        )
     else:
         return schemas.GetCustomerOrdersResponse(page=page, orders=[])
 
@@ -119,11 +151,11 @@ async def get_order_for_customer(
     tags=["Manager"],
 )
 async def get_order(
-    order_id: str,
+    order_id: UUID,
     bus: messagebus.MessageBus = Depends(get_bus),
     current_manager=Depends(get_current_manager),
 ):
-    cmd = commands.GetOrder(id=order_id)
+    cmd = commands.GetOrder(id=str(order_id))
     result = await bus.handle(cmd)
     return result
 
@@ -133,11 +165,11 @@ async def get_order(
     tags=["Customers"],
 )
 async def cancel_customer_order(
-    order_id: str,
+    order_id: UUID,
     bus: messagebus.MessageBus = Depends(get_bus),
     current_customer=Depends(get_current_customer),
 ):
-    cmd = commands.CancelOrder(order_id=order_id, user_id=current_customer.id)
+    cmd = commands.CancelOrder(order_id=str(order_id), user_id=current_customer.id)
     result_response = await bus.handle(cmd)
     if result_response is not None:
         result, response = result_response
@@ -165,10 +197,25 @@ async def create_product(
     tags=["Manager"],
 )
 async def get_product(
-    product_id: str, bus: messagebus.MessageBus = Depends(get_bus)
+    product_id: UUID,
+    response: Response,
+    bus: messagebus.MessageBus = Depends(get_bus),
+    if_none_match: Optional[str] = Header(None),
 ):  # available to all
+    product_id = str(product_id)
+    # Revalidation only needs the product's version, not the product.
+    if if_none_match:
+        version = await bus.handle(
+            commands.GetProductVersion(id=product_id)
+        )
+        etag = etags.make_etag("product", product_id, version)
+        if etags.matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
     cmd = commands.GetProduct(id=product_id)
     result = await bus.handle(cmd)
+    response.headers["ETag"] = etags.make_etag(
+        "product", product_id, result.version
+    )
     return result
 
 
@@ -178,12 +225,12 @@ async def get_product(
     tags=["Manager"],
 )
 async def update_product(
-    product_id: str,
+    product_id: UUID,
     product_update: schemas.ProductUpdate,
     bus: messagebus.MessageBus = Depends(get_bus),
     current_manager=Depends(get_current_manager),
 ):
-    cmd = commands.UpdateProduct(id=product_id, **product_update.dict())
+    cmd = commands.UpdateProduct(id=str(product_id), **product_update.dict())
     result = await bus.handle(cmd)
     return result
 
@@ -194,11 +241,11 @@ async def update_product(
     tags=["Manager"],
 )
 async def delete_product(
-    product_id: str,
+    product_id: UUID,
     bus: messagebus.MessageBus = Depends(get_bus),
     current_manager=Depends(get_current_manager),
 ):
-    cmd = commands.DeleteProduct(id=product_id)
+    cmd = commands.DeleteProduct(id=str(product_id))
     result = await bus.handle(cmd)
     return result
 
@@ -209,12 +256,14 @@ async def delete_product(
     tags=["Manager"],
 )
 async def create_variation(
-    product_id: str,
+    product_id: UUID,
     variation: schemas.CreateVariation,
     bus: messagebus.MessageBus = Depends(get_bus),
     current_manager=Depends(get_current_manager),
 ):
-    cmd = commands.CreateVariation(product_id=product_id, **variation.dict())
+    cmd = commands.CreateVariation(
+        product_id=str(product_id), **variation.dict()
+    )
     result = await bus.handle(cmd)
     return result
 
@@ -225,13 +274,13 @@ async def create_variation(
     tags=["Manager"],
 )
 async def delete_variation(
-    product_id: str,
-    variation_id: str,
+    product_id: UUID,
+    variation_id: UUID,
     bus: messagebus.MessageBus = Depends(get_bus),
     current_manager=Depends(get_current_manager),
 ):
     cmd = commands.DeleteVariation(
-        product_id=product_id, variation_id=variation_id)
+        product_id=str(product_id), variation_id=str(variation_id))
     result = await bus.handle(cmd)
     return result
 
@@ -241,14 +290,16 @@ async def delete_variation(
     tags=["Manager"],
 )
 async def update_variation(
-    product_id: str,
-    variation_id: str,
+    product_id: UUID,
+    variation_id: UUID,
     variation_update: schemas.VariationUpdate,
     bus: messagebus.MessageBus = Depends(get_bus),
     current_manager=Depends(get_current_manager),
 ):
     cmd = commands.UpdateVariation(
-        product_id=product_id, variation_id=variation_id, **variation_update.dict()
+        product_id=str(product_id),
+        variation_id=str(variation_id),
+        **variation_update.dict(),
     )
     result = await bus.handle(cmd)
     return result
@@ -259,13 +310,20 @@ async def update_variation(
 )
 async def get_products(
     page: int = Query(1, gt=0),
+    page_size: int = Query(10, gt=0),
+    cursor: Optional[str] = None,
     bus: messagebus.MessageBus = Depends(get_bus),
     current_manager=Depends(get_current_manager),
 ):
-    cmd = commands.GetAllProducts(page=page)
+    cmd = commands.GetAllProducts(
+        page=page, page_size=page_size, cursor=cursor
+    )
     result = await bus.handle(cmd)
+    next_cursor = pagination.next_cursor(result, cmd.page_size)
     result = [asdict(product) for product in result]
-    return schemas.GetProductsResponse(page=page, products=result)
+    return schemas.GetProductsResponse(
+        page=page, products=result, next_cursor=next_cursor
+    )
 
 
 @router.get(
@@ -273,10 +331,48 @@ async def get_products(
 )
 async def get_catalog(
     page: int = Query(1, gt=0),
+    # bounded, every size is cached separately
+    page_size: int = Query(10, gt=0, le=100),
+    cursor: Optional[str] = None,
     bus: messagebus.MessageBus = Depends(get_bus),
+    catalog_cache: AbstractCatalogCache = Depends(get_catalog_cache),
+    if_none_match: Optional[str] = Header(None),
 ):
-    result = await views.catalog(page=page, uow=bus.uow)
-    return schemas.GetCatalogResponse(page=page, products=result)
+    # The ETag is read before the page, so a change in between can only
+    # make it look older than the page, never newer. The version comes
+    # from the worker, L1 hits don't go to Redis.
+    headers = {}
+    version = await catalog_cache.current_version()
+    if version is not None:
+        headers["ETag"] = etags.make_etag(
+            "catalog", version, page, page_size, cursor
+        )
+        if etags.matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+    async def load() -> bytes:
+        result = await views.catalog(
+            page=page,
+            page_size=page_size,
+            cursor=cursor,
+            uow=bus.uow_factory(),
+        )
+        next_cursor = pagination.next_cursor(
+            result, page_size, key=lambda row: (row["created_at"], row["id"])
+        )
+        response = schemas.GetCatalogResponse(
+            page=page, products=result, next_cursor=next_cursor
+        )
+        return response.json().encode()
+
+    # Pages are cached already serialized, a hit skips the query and
+    # the response model.
+    data = await catalog_cache.get_or_load(
+        f"{page}:{page_size}:{cursor}", load
+    )
+    return Response(
+        content=data, media_type="application/json", headers=headers
+    )
 
 
 @router.post(
@@ -305,6 +401,13 @@ app.include_router(auth_router)
 app.include_router(router)
 
 
+@app.get("/stats", tags=["Health"])
+async def stats(
+    request: Request, current_manager=Depends(get_current_manager)
+):
+    return request.app.state.resources.stats()
+
+
 @app.get("/ping", tags=["Health"])
 async def root():
     return "pong"
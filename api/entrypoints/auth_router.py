@@ -1,22 +1,40 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, Request, status, Depends
+from dataclasses import dataclass
 from typing import Annotated
+from api import config
+from api.adapters.revocations import TokenRevocations
 from api.entrypoints import schemas
 from api.domain.enums import UserRole
-from api.bootstrap import bootstrap
 from api.service_layer.messagebus import MessageBus
 from api.domain import commands
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from api.utils.hashoor import create_access_token
 from api.utils.hashoor import ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM
-from datetime import timedelta
+from datetime import datetime, timedelta
 from jose import JWTError, jwt
+import logging
+
+logger = logging.getLogger(__name__)
 
 auth_router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def get_bus() -> MessageBus:
-    return bootstrap()
+@dataclass(frozen=True)
+class Principal:
+    """The caller as described by a verified token."""
+
+    id: str
+    email: str
+    role: UserRole
+
+
+def get_bus(request: Request) -> MessageBus:
+    return request.app.state.resources.bus()
+
+
+def get_revocations(request: Request) -> TokenRevocations:
+    return request.app.state.resources.revocations
 
 
 @auth_router.post("/token", response_model=schemas.Token, tags=["Auth"])
@@ -35,7 +53,12 @@ async def login_for_access_token(
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email, "role": user.role.value},
+        data={
+            "sub": user.email,
+            "uid": user.id,
+            "role": user.role.value,
+            "iat": datetime.utcnow(),
+        },
         expires_delta=access_token_expires,
     )
     return {"access_token": access_token, "token_type": "bearer"}
@@ -45,6 +68,7 @@ async def login_for_access_token(
 async def get_current_user(
     token: Annotated[str, Depends(oauth2_scheme)],
     bus: MessageBus = Depends(get_bus),
+    revocations: TokenRevocations = Depends(get_revocations),
 ):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -62,6 +86,15 @@ async def get_current_user(
         raise credentials_exception
     if token_email is None:
         raise credentials_exception
+    if config.get_auth_mode() == "claims":
+        revoked = await is_revoked(payload, revocations)
+        if revoked:
+            raise credentials_exception
+        if revoked is False:
+            # Signed by us and not revoked, the claims are enough.
+            return Principal(
+                id=payload["uid"], email=email, role=UserRole(payload["role"])
+            )
     cmd = commands.GetUserByEmail(email=token_email)
     user = await bus.handle(cmd)
     if user is None:
@@ -69,11 +102,29 @@ async def get_current_user(
     return user
 
 
-async def get_current_manager(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    bus: MessageBus = Depends(get_bus),
-):
-    user = await get_current_user(token, bus)
+async def is_revoked(payload: dict, revocations: TokenRevocations):
+    """Whether the token was revoked, None when it can't be told.
+
+    Tokens issued before the claims were added, or a Redis outage, give
+    None and the caller falls back to looking the user up. An outage is
+    logged when it starts and when it ends, not on every request.
+    """
+    if not {"uid", "role", "iat"} <= payload.keys():
+        return None
+    try:
+        revoked = await revocations.is_revoked(payload["uid"], payload["iat"])
+    except Exception:
+        if not revocations.unavailable:
+            logger.exception("Revocation check failed, using the database")
+        revocations.unavailable = True
+        return None
+    if revocations.unavailable:
+        logger.info("Revocation checks are available again")
+        revocations.unavailable = False
+    return revoked
+
+
+async def get_current_manager(user=Depends(get_current_user)):
     if user.role.value != UserRole.MANAGER.value:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -82,11 +133,7 @@ async def get_current_manager(
     return user
 
 
-async def get_current_customer(
-    token: Annotated[str, Depends(oauth2_scheme)],
-    bus: MessageBus = Depends(get_bus),
-):
-    user = await get_current_user(token, bus)
+async def get_current_customer(user=Depends(get_current_user)):
     if user.role.value != UserRole.CUSTOMER.value:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -98,3 +145,19 @@ async def get_current_customer(
 @auth_router.get("/users/me/", response_model=schemas.User, tags=["General"])
 async def read_users_me(current_user=Depends(get_current_user)):
     return current_user
+
+
+@auth_router.post(
+    "/logout", response_model=schemas.SuccessResponse, tags=["Auth"]
+)
+async def logout(
+    current_user=Depends(get_current_user),
+    revocations: TokenRevocations = Depends(get_revocations),
+):
+    """Revoke every token issued to the caller so far.
+
+    Revocations are checked in the claims auth mode; the database mode
+    doesn't read them, its tokens stay valid until they expire.
+    """
+    await revocations.revoke(current_user.id)
+    return {"message": "Logged out"}
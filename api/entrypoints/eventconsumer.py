@@ -1,39 +1,292 @@
 import asyncio
-import json
+import functools
 import logging
+import os
+import signal
+import socket
+import time
+import zlib
+from typing import Awaitable, Callable, List
 import redis.asyncio as redis
+from redis.exceptions import ResponseError
 from api import bootstrap, config
 from api.domain import events, commands
+from api.adapters import codecs
 from api.adapters.notifications import EmailLocalNotifications
 
 logger = logging.getLogger(__name__)
 
 r = redis.Redis(**config.get_redis_host_and_port())
 
+CHANNELS = ["products"]
+
 
 async def main():
-    logger.info("Redis pubsub starting")
     bus = bootstrap.bootstrap(notifications=EmailLocalNotifications())
-    pubsub = r.pubsub(ignore_subscribe_messages=True)
-    await pubsub.subscribe("products")
+    settings = config.get_consumer_settings()
+    pool = KeyedWorkerPool(settings["workers"], settings["queue_size"])
+    pool.start()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopping.set)
 
-    async for m in pubsub.listen():
-        await pong(m, bus)
+    if config.get_event_transport() == "streams":
+        consumer = StreamConsumer(r, CHANNELS, bus, pool=pool)
+        reporter = asyncio.create_task(report_stats(consumer.stats))
+        await consumer.run(stopping)
+    else:
+        reporter = asyncio.create_task(report_stats(pool.stats))
+        await consume_pubsub(bus, pool, stopping)
 
+    logger.info("Stopping, draining %s messages", pool.backlog())
+    await pool.drain(settings["drain_timeout"])
+    reporter.cancel()
+    await r.aclose()
 
-async def pong(m, bus):
-    logger.info("handling %s", m)
+
+async def consume_pubsub(bus, pool, stopping: asyncio.Event):
+    logger.info("Redis pubsub starting")
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(*CHANNELS)
+    while not stopping.is_set():
+        m = await pubsub.get_message(timeout=1)
+        if m is None:
+            continue
+        try:
+            event = codecs.decode(m["data"])
+        except Exception as e:
+            logger.error(e)
+            continue
+        job = functools.partial(pong, event, bus)
+        await pool.submit(partition_key(event), job)
+    await pubsub.aclose()
+
+
+async def pong(event, bus):
+    logger.info("handling %s", event["event"])
     try:
-        event = json.loads(m["data"])
-        if event["event"] == "ProductDiscount":
-            print("Sending notification..")
-            cmd = commands.NotifyOrderSale()
-            result = await bus.handle(cmd)
-            print(result)
+        await handle_message(event, bus)
     except Exception as e:
         logger.error(e)
         pass
 
 
+async def handle_message(event, bus):
+    if event["event"] == "ProductDiscount":
+        print("Sending notification..")
+        cmd = commands.NotifyOrderSale()
+        result = await bus.handle(cmd)
+        print(result)
+
+
+def partition_key(event: dict) -> str:
+    # Messages about the same order (or product) must be handled in order.
+    data = event.get("data")
+    if isinstance(data, dict):
+        return str(data.get("order_id") or data.get("id") or event["event"])
+    return event["event"]
+
+
+async def report_stats(stats: Callable[[], dict], interval=30):
+    while True:
+        await asyncio.sleep(interval)
+        logger.info("Consumer stats: %s", stats())
+
+
+class KeyedWorkerPool:
+    """Runs up to ``workers`` jobs at once while keeping per key order.
+
+    Every key is hashed to one worker, which runs its jobs one at a time,
+    so jobs sharing a key never overlap or reorder. Each worker queue
+    holds at most ``queue_size`` jobs, ``submit`` waits when it is full.
+    """
+
+    def __init__(self, workers: int = 8, queue_size: int = 100):
+        self.queues: List[asyncio.Queue] = [
+            asyncio.Queue(maxsize=queue_size) for _ in range(workers)
+        ]
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.started_at = time.monotonic()
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._tasks = [
+            asyncio.create_task(self._work(queue)) for queue in self.queues
+        ]
+
+    async def submit(self, key: str, job: Callable[[], Awaitable]):
+        queue = self.queues[zlib.crc32(key.encode()) % len(self.queues)]
+        self.received += 1
+        await queue.put(job)
+
+    def backlog(self) -> int:
+        return sum(queue.qsize() for queue in self.queues) + self.in_flight
+
+    async def drain(self, timeout: float = 30):
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self.queues)),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.error("Drain timed out with %s messages", self.backlog())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+            "backlog": self.backlog(),
+            "throughput": self.processed / elapsed if elapsed else 0,
+        }
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            job = await queue.get()
+            self.in_flight += 1
+            try:
+                await job()
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Failed running %s", job)
+            finally:
+                self.in_flight -= 1
+                queue.task_done()
+
+
+class StreamConsumer:
+    """Consumes Redis streams through a consumer group.
+
+    Every process joins the same group under its own consumer name, so
+    messages are spread across processes and kept until acknowledged.
+    Messages left pending by a crashed or stuck consumer are claimed back
+    after ``claim_idle_ms``, and dropped after ``max_deliveries`` tries.
+    Handling runs on a KeyedWorkerPool.
+    """
+
+    def __init__(
+        self, client, streams, bus, name=None, batch_size=10, pool=None
+    ):
+        settings = config.get_stream_settings()
+        self.client = client
+        self.streams = streams
+        self.bus = bus
+        self.group = settings["group"]
+        self.claim_idle_ms = settings["claim_idle_ms"]
+        self.max_deliveries = settings["max_deliveries"]
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.pool = pool
+        self.lag_ms = 0
+        self._queued = set()
+
+    async def run(self, stopping: asyncio.Event):
+        logger.info("Redis streams consumer %s starting", self.name)
+        await self.create_groups()
+        while not stopping.is_set():
+            for stream in self.streams:
+                await self.reclaim(stream)
+            await self.read()
+
+    async def create_groups(self):
+        for stream in self.streams:
+            try:
+                await self.client.xgroup_create(
+                    stream, self.group, id="0", mkstream=True
+                )
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    async def read(self, block_ms=1000):
+        response = await self.client.xreadgroup(
+            self.group,
+            self.name,
+            {stream: ">" for stream in self.streams},
+            count=self.batch_size,
+            block=block_ms,
+        )
+        for stream, messages in response or []:
+            for message_id, fields in messages:
+                await self.dispatch(stream, message_id, fields)
+
+    async def reclaim(self, stream):
+        pending = await self.client.xpending_range(
+            stream,
+            self.group,
+            min="-",
+            max="+",
+            count=self.batch_size,
+            idle=self.claim_idle_ms,
+        )
+        retry = []
+        for entry in pending:
+            if entry["message_id"] in self._queued:
+                # Still waiting for a worker in this process.
+                continue
+            if entry["times_delivered"] >= self.max_deliveries:
+                logger.error(
+                    "Dropping %s from %s after %s deliveries",
+                    entry["message_id"],
+                    stream,
+                    entry["times_delivered"],
+                )
+                await self.client.xack(
+                    stream, self.group, entry["message_id"]
+                )
+            else:
+                retry.append(entry["message_id"])
+        if not retry:
+            return
+        claimed = await self.client.xclaim(
+            stream, self.group, self.name, self.claim_idle_ms, retry
+        )
+        for message_id, fields in claimed:
+            await self.dispatch(stream, message_id, fields)
+
+    def stats(self) -> dict:
+        stats = self.pool.stats() if self.pool is not None else {}
+        stats["lag_ms"] = self.lag_ms
+        return stats
+
+    async def dispatch(self, stream, message_id, fields):
+        try:
+            event = codecs.decode(fields[b"payload"])
+        except Exception:
+            # Retrying won't make it readable.
+            logger.exception("Dropping undecodable %s", message_id)
+            await self.client.xack(stream, self.group, message_id)
+            return
+        job = functools.partial(self.process, stream, message_id, event)
+        if self.pool is None:
+            await job()
+            return
+        self._queued.add(message_id)
+        await self.pool.submit(partition_key(event), job)
+
+    async def process(self, stream, message_id, event):
+        logger.info("handling %s from %s", message_id, stream)
+        self._queued.discard(message_id)
+        try:
+            await handle_message(event, self.bus)
+        except Exception:
+            # Left pending, it will be claimed back and retried.
+            logger.exception("Failed handling %s", message_id)
+            return
+        await self.client.xack(stream, self.group, message_id)
+        sent_ms = int(message_id.split(b"-")[0])
+        self.lag_ms = max(time.time() * 1000 - sent_ms, 0)
+
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import signal
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, select, update
+from api import config
+from api.adapters import redis_eventpublisher
+from api.adapters.orm import outbox
+from api.service_layer import unit_of_work
+
+logger = logging.getLogger(__name__)
+
+
+async def relay_batch(session_factory, batch_size: int) -> int:
+    """Publish one batch of pending outbox rows and mark them sent.
+
+    Rows are claimed with SKIP LOCKED so several relays can run side by
+    side. If publishing fails the transaction rolls back and the rows are
+    picked up again on the next pass.
+    """
+    async with session_factory() as session, session.begin():
+        result = await session.execute(
+            select(outbox.c.id, outbox.c.channel, outbox.c.payload)
+            .where(outbox.c.sent_at.is_(None))
+            .order_by(outbox.c.created_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.all()
+        if not rows:
+            return 0
+        await redis_eventpublisher.publish_many(
+            [(row.channel, row.payload) for row in rows]
+        )
+        await session.execute(
+            update(outbox)
+            .where(outbox.c.id.in_([row.id for row in rows]))
+            .values(sent_at=func.now())
+        )
+    return len(rows)
+
+
+async def purge_sent(session_factory, retention: float) -> int:
+    """Delete the rows relayed more than ``retention`` seconds ago."""
+    cutoff = datetime.utcnow() - timedelta(seconds=retention)
+    async with session_factory() as session, session.begin():
+        result = await session.execute(
+            delete(outbox).where(outbox.c.sent_at < cutoff)
+        )
+    return result.rowcount
+
+
+class OutboxRelay:
+    """Relays the outbox to Redis in pipelined batches.
+
+    Rows committed between two polls are coalesced into one batch of up
+    to ``batch_size`` messages, published in a single pipeline. A full
+    batch is followed by the next one straight away, otherwise the relay
+    waits ``poll_interval``. After ``stop`` the rows still pending are
+    flushed before ``run`` returns.
+
+    Sent rows are kept for ``retention`` seconds and purged every
+    ``purge_interval`` seconds, so the table only holds recent history.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        batch_size=100,
+        poll_interval=0.5,
+        retention=86400,
+        purge_interval=60,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self.flushes = 0
+        self.published = 0
+        self.failed = 0
+        self.max_batch_size = 0
+        self.purged = 0
+        self._last_purge = None
+        self._stopping = asyncio.Event()
+
+    async def flush(self) -> int:
+        try:
+            relayed = await relay_batch(self.session_factory, self.batch_size)
+        except Exception:
+            self.failed += 1
+            raise
+        if relayed:
+            self.flushes += 1
+            self.published += relayed
+            self.max_batch_size = max(self.max_batch_size, relayed)
+        return relayed
+
+    async def purge(self) -> int:
+        purged = await purge_sent(self.session_factory, self.retention)
+        self.purged += purged
+        return purged
+
+    async def run(self):
+        while not self._stopping.is_set():
+            relayed = await self._flush_logged()
+            await self._purge_due()
+            if relayed < self.batch_size:
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        while await self._flush_logged() == self.batch_size:
+            pass
+
+    def stop(self):
+        self._stopping.set()
+
+    def stats(self) -> dict:
+        return {
+            "flushes": self.flushes,
+            "published": self.published,
+            "failed_flushes": self.failed,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": (
+                self.published / self.flushes if self.flushes else 0
+            ),
+            "purged": self.purged,
+        }
+
+    async def _flush_logged(self) -> int:
+        try:
+            return await self.flush()
+        except Exception:
+            logger.exception("Failed relaying the outbox")
+            return 0
+
+    async def _purge_due(self):
+        now = asyncio.get_running_loop().time()
+        if (
+            self._last_purge is not None
+            and now - self._last_purge < self.purge_interval
+        ):
+            return
+        self._last_purge = now
+        try:
+            await self.purge()
+        except Exception:
+            logger.exception("Failed purging the outbox")
+
+
+async def report_stats(relay: OutboxRelay, interval=30):
+    while True:
+        await asyncio.sleep(interval)
+        logger.info("Relay stats: %s", relay.stats())
+
+
+async def main():
+    logger.info("Outbox relay starting")
+    relay = OutboxRelay(
+        unit_of_work.get_default_session_factory(),
+        batch_size=config.get_outbox_batch_size(),
+        poll_interval=config.get_outbox_poll_interval(),
+        retention=config.get_outbox_retention(),
+        purge_interval=config.get_outbox_purge_interval(),
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, relay.stop)
+    reporter = asyncio.create_task(report_stats(relay))
+    await relay.run()
+    reporter.cancel()
+    logger.info("Outbox relay stopped: %s", relay.stats())
+    await redis_eventpublisher.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
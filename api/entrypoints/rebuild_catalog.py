@@ -0,0 +1,17 @@
+import asyncio
+import logging
+from api import bootstrap
+from api.domain import commands
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    """Recreate the catalog read model from the products tables."""
+    bus = bootstrap.bootstrap(catalog_cache=bootstrap.build_catalog_cache())
+    count = await bus.handle(commands.RebuildCatalog())
+    logger.info("Catalog read model rebuilt with %s products", count)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
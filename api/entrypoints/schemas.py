@@ -57,6 +57,8 @@ class OrderItemBase(BaseModel):
 
 class OrderItem(OrderItemBase):
     unit_price: float
+    product_name: Optional[str] = None
+    variation_name: Optional[str] = None
 
 
 class CustomerOrderItem(OrderItemBase):
@@ -115,9 +117,9 @@ class User(IDModel):
 
 
 class OrderFilters(BaseModel):
-    status: Optional[OrderStatus]
-    consume_location: Optional[ConsumeLocation]
-    user_id: Optional[str]
+    status: Optional[OrderStatus] = None
+    consume_location: Optional[ConsumeLocation] = None
+    user_id: Optional[str] = None
 
 
 class OrderResponseBase(BaseModel):
@@ -136,16 +138,19 @@ class DetailedOrderResponse(OrderResponseBase):
 class GetOrdersResponse(BaseModel):
     orders: List[DetailedOrderResponse]
     page: int = 1
+    next_cursor: Optional[str] = None
 
 
 class GetCustomerOrdersResponse(BaseModel):
     orders: List[OrderResponseBase]
     page: int = 1
+    next_cursor: Optional[str] = None
 
 
 class GetProductsResponse(BaseModel):
     products: List[Product]
     page: int = 1
+    next_cursor: Optional[str] = None
 
 
 class DeleteProductResponse(IDModel):
@@ -163,6 +168,7 @@ class CatalogItem(Product):
 class GetCatalogResponse(BaseModel):
     page: int = 1
     products: List[CatalogItem]
+    next_cursor: Optional[str] = None
 
 
 class ResponseData(BaseModel):
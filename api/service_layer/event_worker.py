@@ -0,0 +1,80 @@
+import asyncio
+import logging
+from typing import List
+from api.domain import events
+from api.service_layer import messagebus
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundEventWorker:
+    """Handles events off the request path.
+
+    Events are put on a bounded queue drained by ``workers`` tasks, each
+    one handing the event back to the bus with a fresh unit of work.
+    ``submit`` waits while the queue is full, which slows producers down
+    instead of letting the backlog grow without limit.
+    """
+
+    def __init__(
+        self,
+        bus: messagebus.MessageBus,
+        maxsize: int = 1000,
+        workers: int = 2,
+    ):
+        self.bus = bus
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.workers = workers
+        self.processed = 0
+        self.failed = 0
+        self._tasks: List[asyncio.Task] = []
+
+    def start(self):
+        logger.info("Starting %s event workers", self.workers)
+        self._tasks = [
+            asyncio.create_task(self._work(), name=f"event-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def submit(self, event: events.Event):
+        await self.queue.put(event)
+
+    async def stop(self, timeout: float = 10):
+        logger.info("Draining %s pending events", self.queue.qsize())
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error(
+                "Event queue not drained after %ss, dropping %s events",
+                timeout,
+                self.queue.qsize(),
+            )
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_maxsize": self.queue.maxsize,
+            "workers": len(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+        }
+
+    async def _work(self):
+        while True:
+            event = await self.queue.get()
+            try:
+                await self.bus.handle(event)
+                self.processed += 1
+            except messagebus.EventHandlerFailed as e:
+                # the bus has logged each failing handler
+                self.failed += 1
+                logger.error(str(e))
+            except Exception:
+                self.failed += 1
+                logger.exception(f"Exception handling event {event}")
+            finally:
+                self.queue.task_done()
@@ -1,11 +1,11 @@
 from dataclasses import asdict
 from typing import Tuple
 from api.domain import events, models, commands, enums
-from api.utils.hashoor import hash_password, verify_password
+from api.utils.hashoor import PasswordHasher
 from api.adapters import notifications
-from api.adapters import redis_eventpublisher
+from api.adapters.catalog_cache import AbstractCatalogCache
 from api.service_layer import unit_of_work
-import uuid
+from api.utils.ids import uuid7
 from api.utils.exceptions import (
     OrderNotFound,
     ProductNotFound,
@@ -27,9 +27,26 @@ async def create_order_handler(
     async with uow:
         order_items = []
         total_cost = 0
-        order_id = str(uuid.uuid4())
+        order_id = uuid7()
+        # Resolve every product and variation up front, one query each.
+        products = {
+            p.id: p
+            for p in await uow.products.get_many(
+                {item["product_id"] for item in cmd.order_items}
+            )
+        }
+        variations = {
+            v.id: v
+            for v in await uow.variations.get_many(
+                {
+                    item["variation_id"]
+                    for item in cmd.order_items
+                    if item.get("variation_id") is not None
+                }
+            )
+        }
         for item in cmd.order_items:
-            product = await uow.products.get(item["product_id"])
+            product = products.get(item["product_id"])
             if product is None:
                 raise ProductNotFound(item["product_id"])
 
@@ -37,7 +54,7 @@ async def create_order_handler(
             unit_price = product.price
 
             if "variation_id" in item and item["variation_id"] is not None:
-                variation = await uow.variations.get(item["variation_id"])
+                variation = variations.get(item["variation_id"])
                 if variation is None:
                     raise VariationNotFound(item["variation_id"])
                 unit_price += variation.price
@@ -50,6 +67,8 @@ async def create_order_handler(
                     variation_id=item.get("variation_id", None),
                     unit_price=unit_price,
                     order_id=order_id,
+                    product_name=product.name,
+                    variation_name=variation.name if variation else None,
                 )
             )
 
@@ -68,7 +87,9 @@ async def get_orders_handler(
     cmd: commands.GetOrders, uow: unit_of_work.AbstractUnitOfWork
 ):
     async with uow:
-        orders = await uow.orders.get_all(cmd.page, cmd.page_size, cmd.filters)
+        orders = await uow.orders.get_all(
+            cmd.page, cmd.page_size, cmd.filters, cmd.cursor
+        )
         return orders
 
 
@@ -80,24 +101,14 @@ async def update_order_status_handler(
         if order is None:
             raise OrderNotFound(cmd.id)
         try:
-            order_items = []
-            for i in order.order_items:
-                product = await uow.products.get(i.product_id)
-                variation = await uow.variations.get(i.variation_id)
-                order_items.append(
-                    {
-                        "name": product.name + " with " + variation.name,
-                        "quantity": i.quantity,
-                        "price": i.unit_price,
-                    }
-                )
+            # Order items carry their own name snapshot, no lookups needed.
             order.change_status(cmd.status, order.order_items)
         except ValueError as e:
             raise InvalidOrderUpdate(order_id=cmd.id, e=e)
-        await uow.commit()
-        await redis_eventpublisher.publish(
-            channel="orders", event="OrderStatusUpdated", data=asdict(order)
+        await uow.outbox.add(
+            channel="orders", event="OrderStatusUpdated", data=order
         )
+        await uow.commit()
         return order
 
 
@@ -116,7 +127,8 @@ async def handle_order_change_event(
     notifications: notifications.AbstractNotifications,
     uow: unit_of_work.AbstractUnitOfWork,
 ):
-    user = await uow.users.get(event.user_id)
+    async with uow:
+        user = await uow.users.get(event.user_id)
     if user is not None:
         await notifications.publish(user.email, event)
 
@@ -135,7 +147,8 @@ async def handle_order_created_event(
     uow: unit_of_work.AbstractUnitOfWork,
     notifications: notifications.AbstractNotifications,
 ):
-    user = await uow.users.get(event.user_id)
+    async with uow:
+        user = await uow.users.get(event.user_id)
     if user is not None:
         await notifications.publish(user.email, event)
 
@@ -155,16 +168,12 @@ async def cancel_order_handler(
         if order.status == enums.OrderStatus.DELIVERED:
             return (False, "Order already delivered")
         order.change_status(enums.OrderStatus.CANCELLED, order.order_items)
-        await uow.commit()
-        order_data = asdict(order)
-        # Enums to string for event
-        order_data["consume_location"] = order_data["consume_location"].value
-        order_data["status"] = order_data["status"].value
-        await redis_eventpublisher.publish(
+        await uow.outbox.add(
             channel="orders",
             event="OrderCancelled",
-            data=order_data,
+            data=order,
         )
+        await uow.commit()
         return (True, "Order cancelled successfully")
 
 
@@ -180,7 +189,9 @@ async def show_product_handler(
 
 
 async def create_product_handler(
-    cmd: commands.CreateProduct, uow: unit_of_work.AbstractUnitOfWork
+    cmd: commands.CreateProduct,
+    uow: unit_of_work.AbstractUnitOfWork,
+    catalog_cache: AbstractCatalogCache,
 ):
     async with uow:
         # create Product instance without variations
@@ -196,16 +207,20 @@ async def create_product_handler(
             product.variations.append(var)
 
         await uow.products.add(product)
+        await uow.catalog.refresh(product)
         await uow.commit()
+        await catalog_cache.invalidate()
 
         return product
 
 
 async def update_product_handler(
-    cmd: commands.UpdateProduct, uow: unit_of_work.AbstractUnitOfWork
+    cmd: commands.UpdateProduct,
+    uow: unit_of_work.AbstractUnitOfWork,
+    catalog_cache: AbstractCatalogCache,
 ):
     async with uow:
-        product = await uow.products.get(cmd.id)
+        product = await uow.products.get(cmd.id, for_update=True)
         if product is None:
             raise ProductNotFound(cmd.id)
 
@@ -214,11 +229,13 @@ async def update_product_handler(
             await product_variations(cmd, product, uow)
 
         update_product_attributes(cmd, product)
+        await uow.products.bump_version(product)
 
         await uow.products.update(product)
+        await uow.catalog.refresh(product)
         # If price difers 50% send notification that is cheap
         if product.price * 2 < original_price:
-            await redis_eventpublisher.publish(
+            await uow.outbox.add(
                 channel="products",
                 event="ProductDiscount",
                 data={
@@ -226,6 +243,7 @@ async def update_product_handler(
                 },
             )
         await uow.commit()
+        await catalog_cache.invalidate()
         return product
 
 
@@ -251,14 +269,18 @@ def update_product_attributes(cmd, product):
 
 
 async def delete_product_handler(
-    cmd: commands.DeleteProduct, uow: unit_of_work.AbstractUnitOfWork
+    cmd: commands.DeleteProduct,
+    uow: unit_of_work.AbstractUnitOfWork,
+    catalog_cache: AbstractCatalogCache,
 ):
     async with uow:
-        product = await uow.products.get(cmd.id)
+        product = await uow.products.get(cmd.id, for_update=True)
         if product is None:
             raise ProductNotFound(cmd.id)
         await uow.products.delete(product)
+        await uow.catalog.refresh(product)
         await uow.commit()
+        await catalog_cache.invalidate()
         return product
 
 
@@ -272,11 +294,23 @@ async def get_product_handler(
         return product
 
 
+async def get_product_version_handler(
+    cmd: commands.GetProductVersion, uow: unit_of_work.AbstractUnitOfWork
+):
+    async with uow:
+        version = await uow.products.get_version(cmd.id)
+        if version is None:
+            raise ProductNotFound(cmd.id)
+        return version
+
+
 async def get_all_products_handler(
     cmd: commands.GetAllProducts, uow: unit_of_work.AbstractUnitOfWork
 ):
     async with uow:
-        products = await uow.products.get_all(cmd.page)
+        products = await uow.products.get_all(
+            cmd.page, cmd.page_size, cursor=cmd.cursor
+        )
         if products is None:
             return []
         return products
@@ -287,16 +321,31 @@ async def get_orders_for_customer_handler(
 ):
     async with uow:
         orders = await uow.orders.get_all(
-            cmd.page, filters={"user_id": cmd.user_id}
+            cmd.page,
+            cmd.page_size,
+            filters={"user_id": cmd.user_id},
+            cursor=cmd.cursor,
         )
         return orders
 
 
+async def rebuild_catalog_handler(
+    cmd: commands.RebuildCatalog,
+    uow: unit_of_work.AbstractUnitOfWork,
+    catalog_cache: AbstractCatalogCache,
+):
+    async with uow:
+        count = await uow.catalog.rebuild()
+        await uow.commit()
+    await catalog_cache.invalidate()
+    return count
+
+
 async def get_catalog_handler(
     cmd: commands.GetCatalog, uow: unit_of_work.AbstractUnitOfWork
 ):
     async with uow:
-        products = await uow.products.get_all(cmd.page)
+        products = await uow.products.get_all(cmd.page, cursor=cmd.cursor)
         if products is None:
             return []
         return products
@@ -304,11 +353,15 @@ async def get_catalog_handler(
 
 # Variations
 async def create_variation_handler(
-    cmd: commands.CreateVariation, uow: unit_of_work.AbstractUnitOfWork
+    cmd: commands.CreateVariation,
+    uow: unit_of_work.AbstractUnitOfWork,
+    catalog_cache: AbstractCatalogCache,
 ):
     async with uow:
         variation = models.Variation(**asdict(cmd))
-        product = await uow.products.get(cmd.product_id)
+        product = await uow.products.get(
+            cmd.product_id, for_update=True
+        )
         if product is None:
             raise ProductNotFound(cmd.product_id)
         for v in product.variations:
@@ -320,29 +373,43 @@ async def create_variation_handler(
                     ),
                 )
         product.add_variation(variation=variation)
+        await uow.products.bump_version(product)
         await uow.products.update(product)
+        await uow.catalog.refresh(product)
         await uow.commit()
+        await catalog_cache.invalidate()
         return variation
 
 
 async def delete_variation_handler(
-    cmd: commands.DeleteVariation, uow: unit_of_work.AbstractUnitOfWork
+    cmd: commands.DeleteVariation,
+    uow: unit_of_work.AbstractUnitOfWork,
+    catalog_cache: AbstractCatalogCache,
 ):
     async with uow:
-        product = await uow.products.get(cmd.product_id)
+        product = await uow.products.get(
+            cmd.product_id, for_update=True
+        )
         if product is None:
             raise ProductNotFound(cmd.product_id)
         product.remove_variation(id=cmd.variation_id)
+        await uow.products.bump_version(product)
         await uow.products.update(product)
+        await uow.catalog.refresh(product)
         await uow.commit()
+        await catalog_cache.invalidate()
         return product
 
 
 async def update_variation_handler(
-    cmd: commands.UpdateVariation, uow: unit_of_work.AbstractUnitOfWork
+    cmd: commands.UpdateVariation,
+    uow: unit_of_work.AbstractUnitOfWork,
+    catalog_cache: AbstractCatalogCache,
 ):
     async with uow:
-        product = await uow.products.get(cmd.product_id)
+        product = await uow.products.get(
+            cmd.product_id, for_update=True
+        )
         if product is None:
             raise ProductNotFound(cmd.product_id)
         variation = product.get_variation_by_id(cmd.variation_id)
@@ -361,8 +428,12 @@ async def update_variation_handler(
             product.add_variation(variation=variation)
         except ValueError as e:
             raise InvalidProductUpdate(order_id=cmd.id, e=e)
+        await uow.products.bump_version(product)
         await uow.variations.update(variation)
+        await uow.products.update(product)
+        await uow.catalog.refresh(product)
         await uow.commit()
+        await catalog_cache.invalidate()
         return variation
 
 
@@ -370,12 +441,14 @@ async def update_variation_handler(
 
 
 async def create_user_handler(
-    cmd: commands.CreateUser, uow: unit_of_work.AbstractUnitOfWork
+    cmd: commands.CreateUser,
+    uow: unit_of_work.AbstractUnitOfWork,
+    passwords: PasswordHasher,
 ):
     async with uow:
         cmd_dict = asdict(cmd)
         cmd_dict["role"] = cmd_dict["role"].value.upper()
-        cmd_dict["password"] = hash_password(cmd_dict["password"])
+        cmd_dict["password"] = await passwords.hash(cmd_dict["password"])
         user = models.User(**cmd_dict)
         await uow.users.add(user)
         await uow.commit()
@@ -383,13 +456,15 @@ async def create_user_handler(
 
 
 async def authenticate_user_handler(
-    cmd: commands.AuthenticateUser, uow: unit_of_work.AbstractUnitOfWork
+    cmd: commands.AuthenticateUser,
+    uow: unit_of_work.AbstractUnitOfWork,
+    passwords: PasswordHasher,
 ):
     async with uow:
         user = await uow.users.get_by_email(cmd.email)
         if user is None:
             raise UserNotFound(cmd.email)
-        if not verify_password(cmd.password, user.password):
+        if not await passwords.verify(cmd.password, user.password):
             raise InvalidPassword
         return user
 
@@ -423,7 +498,9 @@ async def notify_order_sale_handler(
     notifications: notifications.AbstractNotifications,
 ):
     async with uow:
-        await notifications.publish("test@example.com", events.OrderSale())
+        await notifications.publish_many(
+            ["test@example.com"], events.OrderSale()
+        )
         return "OK"
 
 
@@ -435,6 +512,10 @@ EVENT_HANDLERS = {
     events.OrderCreated: [handle_order_created_event],
 }
 
+# Events whose handlers must run one after another, even when the bus
+# is configured to dispatch event handlers concurrently.
+ORDERED_EVENTS = set()
+
 COMMAND_HANDLERS = {
     commands.HealthCheck: healthcheck_handler,
     commands.CreateOrder: create_order_handler,
@@ -443,6 +524,7 @@ COMMAND_HANDLERS = {
     commands.GetOrdersForCustomer: get_orders_for_customer_handler,
     commands.GetOrders: get_orders_handler,
     commands.GetProduct: get_product_handler,
+    commands.GetProductVersion: get_product_version_handler,
     commands.GetAllProducts: get_all_products_handler,
     commands.UpdateProduct: update_product_handler,
     commands.CreateVariation: create_variation_handler,
@@ -453,6 +535,7 @@ COMMAND_HANDLERS = {
     commands.DeleteProduct: delete_product_handler,
     commands.AuthenticateUser: authenticate_user_handler,
     commands.GetCatalog: get_catalog_handler,
+    commands.RebuildCatalog: rebuild_catalog_handler,
     commands.GetOrder: get_order_handler,
     commands.CreateOrder: create_order_handler,
     commands.UpdateOrderStatus: update_order_status_handler,
@@ -1,7 +1,9 @@
 from __future__ import annotations
+import asyncio
 import logging
+from collections import deque
 from typing import TYPE_CHECKING, List, Union, Type, Dict, Callable
-from typing import Any, Awaitable
+from typing import Any, Awaitable, Deque, Iterable, Optional
 from api.domain import commands, events
 
 if TYPE_CHECKING:
@@ -10,57 +12,148 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 Message = Union[commands.Command, events.Event]
+# Injected handlers receive the message and the unit of work of the
+# invocation they belong to.
+Handler = Callable[[Any, "unit_of_work.AbstractUnitOfWork"], Awaitable]
+
+
+class EventHandlerFailed(Exception):
+    """Handlers failed while the bus was handling an event it was given.
+
+    The other handlers still ran, ``errors`` holds what the failing ones
+    raised.
+    """
+
+    def __init__(self, event: events.Event, errors: List[Exception]):
+        super().__init__(f"{len(errors)} handler(s) failed for {event}")
+        self.event = event
+        self.errors = errors
 
 
 class MessageBus:
+    """Dispatches messages to their handlers.
+
+    The bus holds no per-message state: every call to ``handle`` gets its
+    own queue and its own unit of work from ``uow_factory``, so a single
+    bus can be shared by concurrent requests.
+
+    With ``max_concurrency`` above 1 the handlers of one event run
+    concurrently, each with its own unit of work, and at most
+    ``max_concurrency`` handlers run at once across the whole bus. Event
+    types listed in ``ordered_events`` keep running their handlers one
+    after another.
+
+    When an ``event_dispatcher`` is set, the events raised by a command
+    are handed to it (e.g. a background worker) instead of being handled
+    before ``handle`` returns.
+
+    A failing event handler doesn't stop the others. When ``handle`` is
+    given an event it raises ``EventHandlerFailed`` once they are done,
+    so the caller can count or retry it; failures of the events raised
+    by a command are only logged, the command itself succeeded.
+    """
+
     def __init__(
         self,
-        uow: unit_of_work.AbstractUnitOfWork,
-        event_handlers: Dict[
-            Type[events.Event], List[Callable[[Any], Awaitable]]
-        ],
-        command_handlers: Dict[
-            Type[commands.Command], Callable[[Any], Awaitable]
-        ],
+        uow_factory: Callable[[], unit_of_work.AbstractUnitOfWork],
+        event_handlers: Dict[Type[events.Event], List[Handler]],
+        command_handlers: Dict[Type[commands.Command], Handler],
+        max_concurrency: int = 1,
+        ordered_events: Iterable[Type[events.Event]] = (),
+        event_dispatcher: Callable[[events.Event], Awaitable] = None,
     ):
-        self.uow = uow
+        self.uow_factory = uow_factory
         self.event_handlers = event_handlers
         self.command_handlers = command_handlers
+        self.max_concurrency = max_concurrency
+        self.ordered_events = frozenset(ordered_events)
+        self.event_dispatcher = event_dispatcher
+        self._semaphore = asyncio.Semaphore(max(max_concurrency, 1))
 
     async def handle(self, message: Message):
-        self.command_queue = [message]
-        self.event_queue = []
+        uow = self.uow_factory()
+        queue: Deque[Message] = deque([message])
         result = None
-        while self.command_queue:
-            message = self.command_queue.pop(0)
+        errors: List[Exception] = []
+        first = message
+        while queue:
+            message = queue.popleft()
             if isinstance(message, commands.Command):
-                result = await self.handle_command(message)
-            else:
-                raise Exception(f"{message} was not an Event or Command")
-        while self.event_queue:
-            message = self.event_queue.pop(0)
-            if isinstance(message, events.Event):
-                await self.handle_event(message)
+                result = await self.handle_command(message, uow, queue)
+            elif isinstance(message, events.Event):
+                errors += await self.handle_event(message, uow, queue)
             else:
                 raise Exception(f"{message} was not an Event or Command")
+        if errors and isinstance(first, events.Event):
+            raise EventHandlerFailed(first, errors)
         return result
 
-    async def handle_event(self, event: events.Event):
-        for handler in self.event_handlers[type(event)]:
-            try:
-                logger.debug(f"Handling event {event} with handler {handler}")
-                await handler(event)
-                self.event_queue.extend(self.uow.collect_new_events())
-            except Exception:
-                logger.exception(f"Exception handling event {event}")
-                continue
-
-    async def handle_command(self, command: commands.Command):
+    async def handle_event(
+        self,
+        event: events.Event,
+        uow: unit_of_work.AbstractUnitOfWork,
+        queue: Deque[Message],
+    ) -> List[Exception]:
+        """Run the event's handlers, returns what the failing ones raised."""
+        handlers = self.event_handlers[type(event)]
+        if (
+            self.max_concurrency <= 1
+            or len(handlers) < 2
+            or type(event) in self.ordered_events
+        ):
+            results = [
+                await self._run_event_handler(handler, event, uow, queue)
+                for handler in handlers
+            ]
+            return [error for error in results if error is not None]
+
+        # A session can't be shared between tasks, so every concurrent
+        # handler works on its own unit of work.
+        results = await asyncio.gather(
+            *(
+                self._run_event_handler(
+                    handler, event, self.uow_factory(), queue
+                )
+                for handler in handlers
+            )
+        )
+        return [error for error in results if error is not None]
+
+    async def _run_event_handler(
+        self,
+        handler: Handler,
+        event: events.Event,
+        uow: unit_of_work.AbstractUnitOfWork,
+        queue: Deque[Message],
+    ) -> Optional[Exception]:
+        try:
+            logger.debug(f"Handling event {event} with handler {handler}")
+            if self.max_concurrency > 1:
+                async with self._semaphore:
+                    await handler(event, uow)
+            else:
+                await handler(event, uow)
+            queue.extend(uow.collect_new_events())
+        except Exception as e:
+            logger.exception(f"Exception handling event {event}")
+            return e
+        return None
+
+    async def handle_command(
+        self,
+        command: commands.Command,
+        uow: unit_of_work.AbstractUnitOfWork,
+        queue: Deque[Message],
+    ):
         logger.debug(f"Handling command {command}")
         try:
             handler = self.command_handlers[type(command)]
-            result = await handler(command)
-            self.event_queue.extend(self.uow.collect_new_events())
+            result = await handler(command, uow)
+            if self.event_dispatcher is None:
+                queue.extend(uow.collect_new_events())
+            else:
+                for event in uow.collect_new_events():
+                    await self.event_dispatcher(event)
             return result
         except Exception:
             logger.exception(f"Exception handling command {command}")
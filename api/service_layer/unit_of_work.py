@@ -1,8 +1,10 @@
 import abc
+import functools
 import api.config as config
 import logging
 import asyncio
 from api.adapters import repository
+from api.adapters.db_pool import TimedQueuePool
 from sqlalchemy.exc import DatabaseError
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
@@ -18,6 +20,8 @@ class AbstractUnitOfWork(abc.ABC):
     variations: repository.AbstractVariationRepository
     orders: repository.AbstractOrderRepository
     order_items: repository.AbstractOrderItemRepository
+    outbox: repository.AbstractOutboxRepository
+    catalog: repository.AbstractCatalogRepository
 
     async def __aenter__(self):
         return self
@@ -30,8 +34,11 @@ class AbstractUnitOfWork(abc.ABC):
         await self._commit()
 
     def collect_new_events(self):
-        repos = [self.users, self.orders, self.products]
-        for repo in repos:
+        # A unit of work that was never entered (a handler that didn't
+        # touch the database) has no repositories and nothing to collect.
+        names = ("users", "orders", "products")
+        repos = [getattr(self, name, None) for name in names]
+        for repo in filter(None, repos):
             for obj in repo.seen:
                 while obj._events:
                     yield obj._events.pop(0)
@@ -53,25 +60,38 @@ class AbstractUnitOfWork(abc.ABC):
         raise NotImplementedError
 
 
-def create_engine():
+def create_engine(**overrides):
+    """The async engine, configured by the DB_PROFILE settings."""
+    settings = {**config.get_engine_settings(), **overrides}
+    statement_cache_size = settings.pop("statement_cache_size")
     return create_async_engine(
         config.get_postgres_uri(),
         future=True,
-        echo=True,
+        poolclass=TimedQueuePool,
+        # asyncpg prepared statements kept per connection
+        connect_args={"prepared_statement_cache_size": statement_cache_size},
+        **settings,
     )
 
 
-DEFAULT_SESSION_FACTORY = async_sessionmaker(
-    create_engine(),
-    expire_on_commit=False,
-    class_=AsyncSession,
-    future=True,
-)
+def create_session_factory(engine):
+    return async_sessionmaker(
+        engine,
+        expire_on_commit=False,
+        class_=AsyncSession,
+        future=True,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_default_session_factory():
+    """Session factory on an engine created on first use, not at import."""
+    return create_session_factory(create_engine())
 
 
 class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
-    def __init__(self, session_factory=DEFAULT_SESSION_FACTORY):
-        self.session_factory = session_factory
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory or get_default_session_factory()
 
     async def __aenter__(self):
         self.session: AsyncSession = self.session_factory()
@@ -83,6 +103,8 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
         self.order_items = repository.SqlAlchemyOrderItemRepository(
             self.session
         )
+        self.outbox = repository.SqlAlchemyOutboxRepository(self.session)
+        self.catalog = repository.SqlAlchemyCatalogRepository(self.session)
         return self
 
     async def health_check(self):
@@ -85,6 +85,29 @@ class EntityAlreadyExists(HTTPException):
         super().__init__(status_code=400, detail=f"Entity already exists")
 
 
+class InvalidCursor(HTTPException):
+    def __init__(self, cursor: str):
+        super().__init__(status_code=400, detail=f"Invalid cursor {cursor}")
+
+
+class ServiceBusy(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Service busy, try again",
+            headers={"Retry-After": "1"},
+        )
+
+
+class CatalogNotInvalidated(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Change saved, but the catalog cache could not be "
+            "invalidated",
+        )
+
+
 class EntityDoesNotExist(Exception):
     def __init__(self, entity_id: str):
         super().__init__(f"Entity {entity_id} does not exist")
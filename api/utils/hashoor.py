@@ -1,6 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from jose import jwt
 from datetime import timedelta, datetime
+from api.utils.exceptions import ServiceBusy
+import asyncio
 import os
 
 SECRET_KEY = os.environ.get("SECRET_KEY", "secret")
@@ -32,3 +35,55 @@ def create_access_token(data: dict, expires_delta: timedelta):
 
 def hash_password(password: str):
     return pwd_context.hash(password)
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords off the event loop.
+
+    bcrypt takes tens of milliseconds per call and releases the GIL while
+    it works, so calls run in a small thread pool instead of blocking
+    every other request on the worker. At most ``workers`` calls run at
+    once and ``max_pending`` more may wait; past that ServiceBusy is
+    raised straight away rather than letting a login storm queue up.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 64):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="passwords"
+        )
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(
+            verify_password, plain_password, hashed_password
+        )
+
+    async def _run(self, fn, *args):
+        if self.pending >= self.workers + self.max_pending:
+            self.rejected += 1
+            raise ServiceBusy()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
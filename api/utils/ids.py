@@ -0,0 +1,25 @@
+import os
+import time
+import uuid
+
+
+def uuid7() -> str:
+    """A time ordered UUID (version 7) as a string.
+
+    The first 48 bits are the unix time in milliseconds and the next 12
+    the fraction of that millisecond, so new ids sort after older ones and
+    inserts land on the right edge of the primary key index. The rest is
+    random.
+    """
+    nanoseconds = time.time_ns()
+    milliseconds, fraction = divmod(nanoseconds, 1_000_000)
+    sub_ms = fraction * 4096 // 1_000_000
+    rand = int.from_bytes(os.urandom(8), "big") & ((1 << 62) - 1)
+    value = (
+        (milliseconds & ((1 << 48) - 1)) << 80
+        | 0x7 << 76
+        | sub_ms << 64
+        | 0x2 << 62
+        | rand
+    )
+    return str(uuid.UUID(int=value))
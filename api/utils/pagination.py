@@ -0,0 +1,32 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Optional, Sequence, Tuple
+from api.utils.exceptions import InvalidCursor
+
+
+def encode_cursor(created_at: datetime, id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), str(id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        created_at, id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(created_at), id
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+def next_cursor(
+    items: Sequence[Any],
+    page_size: int,
+    key: Callable[[Any], Tuple[datetime, str]] = lambda item: (
+        item.created_at,
+        item.id,
+    ),
+) -> Optional[str]:
+    """Cursor for the page after ``items``, None on the last page."""
+    if len(items) < page_size:
+        return None
+    return encode_cursor(*key(items[-1]))
@@ -1,36 +1,53 @@
 from api.service_layer import unit_of_work
-from sqlalchemy.sql import text
+from api.utils import pagination
+from sqlalchemy import JSON, DateTime, Uuid
+from sqlalchemy.sql import bindparam, text
 
 
 async def catalog(
-    uow: unit_of_work.SqlAlchemyUnitOfWork, page: int = 1, page_size: int = 10
+    uow: unit_of_work.SqlAlchemyUnitOfWork,
+    page: int = 1,
+    page_size: int = 10,
+    cursor: str = None,
 ):
-    async with uow:
-        results = await uow.session.execute(
-            text(
-                """
-                SELECT 
-                products.id, 
-                products.name, 
-                products.price, 
-                products.description, 
-                json_agg(json_build_object('id', variations.id, 'name', \
-                        variations.name, 'price', variations.price)) FILTER (WHERE variations.is_deleted = 0) as variations
-                FROM 
-                    products 
-                LEFT JOIN 
-                    variations 
-                ON 
-                    products.id = variations.product_id AND variations.is_deleted = 0
-                WHERE 
-                    products.is_deleted = 0
-                GROUP BY 
-                    products.id
-                LIMIT :page_size 
-                OFFSET (:page - 1) * :page_size                
-                """
-            ),
-            {"page_size": page_size, "page": page},
+    params = {"page_size": page_size, "page": page}
+    # Keyset paging when given a cursor, page numbers otherwise.
+    if cursor:
+        created_at, id = pagination.decode_cursor(cursor)
+        params.update(cursor_created_at=created_at, cursor_id=id)
+        after_cursor = """
+        WHERE (created_at, product_id) > (:cursor_created_at, :cursor_id)"""
+        window = "LIMIT :page_size"
+    else:
+        after_cursor = ""
+        window = "LIMIT :page_size OFFSET (:page - 1) * :page_size"
+    # Rows are kept up to date by the product and variation handlers, so
+    # a page is one range scan of the created_at index.
+    query = text(
+        """
+        SELECT
+            product_id AS id,
+            name,
+            price,
+            description,
+            created_at,
+            variations
+        FROM
+            catalog_read_model{after_cursor}
+        ORDER BY
+            created_at, product_id
+        {window}
+        """.format(after_cursor=after_cursor, window=window)
+    )
+    if cursor:
+        query = query.bindparams(
+            bindparam("cursor_created_at", type_=DateTime),
+            bindparam("cursor_id", type_=Uuid(as_uuid=False)),
         )
+    query = query.columns(
+        id=Uuid(as_uuid=False), created_at=DateTime, variations=JSON
+    )
+    async with uow:
+        results = await uow.session.execute(query, params)
 
     return results.mappings().all()
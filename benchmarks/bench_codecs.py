@@ -0,0 +1,90 @@
+"""Encode/decode throughput of the event codecs.
+
+Compares the old asdict + json.dumps(cls=DateTimeEncoder) path with the
+codecs used by the publisher, for an order with many items.
+
+    PYTHONPATH=. python benchmarks/bench_codecs.py --items 50
+"""
+import argparse
+import datetime
+import json
+import timeit
+from dataclasses import asdict
+from enum import Enum
+from api.adapters import codecs
+from api.domain import models
+from api.domain.enums import ConsumeLocation, OrderStatus
+
+
+class DateTimeEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, (datetime.date, datetime.datetime)):
+            return obj.isoformat()
+        if isinstance(obj, Enum):
+            return obj.value
+        return super().default(obj)
+
+
+def build_order(items: int) -> models.Order:
+    order = models.Order(
+        consume_location=ConsumeLocation.IN_HOUSE,
+        total_cost=10.0 * items,
+        user_id="user",
+        status=OrderStatus.PREPARATION,
+        order_items=[],
+        created_at=datetime.datetime.utcnow(),
+        updated_at=datetime.datetime.utcnow(),
+    )
+    order.order_items = [
+        models.OrderItem(
+            quantity=1,
+            product_id=f"product-{i}",
+            variation_id=f"variation-{i}",
+            order_id=order.id,
+            unit_price=10.0,
+        )
+        for i in range(items)
+    ]
+    return order
+
+
+def report(name, number, encode, decode):
+    encode_time = timeit.timeit(encode, number=number)
+    payload = encode()
+    decode_time = timeit.timeit(lambda: decode(payload), number=number)
+    print(
+        f"{name:<10} {number / encode_time:>12,.0f} enc/s"
+        f" {number / decode_time:>12,.0f} dec/s {len(payload):>8} bytes"
+    )
+
+
+def main(items: int, number: int):
+    order = build_order(items)
+    print(f"Order with {items} items, {number} iterations")
+    report(
+        "legacy",
+        number,
+        lambda: json.dumps(
+            {"event": "OrderStatusUpdated", "data": asdict(order)},
+            cls=DateTimeEncoder,
+        ),
+        json.loads,
+    )
+    versions = [("json", codecs.JSON)]
+    if codecs.msgpack is not None:
+        versions.append(("msgpack", codecs.MSGPACK))
+    for name, version in versions:
+        report(
+            name,
+            number,
+            lambda: codecs.encode("OrderStatusUpdated", order, version),
+            codecs.decode,
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--number", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.items, args.number)
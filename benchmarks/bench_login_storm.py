@@ -0,0 +1,79 @@
+"""Login throughput and latency of other requests during a login storm.
+
+Runs many concurrent bcrypt verifications, either inline on the event
+loop (the old handlers) or through the PasswordHasher pool, while a
+probe keeps sending a trivial request and records how long each one
+waits for the loop.
+
+    PYTHONPATH=. python benchmarks/bench_login_storm.py --logins 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from api.utils.exceptions import ServiceBusy
+from api.utils.hashoor import PasswordHasher, hash_password, verify_password
+
+
+async def probe(latencies: list, stop: asyncio.Event, interval=0.005):
+    # Stands in for an unrelated endpoint that needs one turn of the loop
+    # every ``interval``; its latency is how late that turn comes.
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        latencies.append(time.perf_counter() - start - interval)
+
+
+async def storm(name, verify, logins: int, concurrency: int):
+    hashed = hash_password("secret")
+    latencies, stop = [], asyncio.Event()
+    probing = asyncio.create_task(probe(latencies, stop))
+    slots = asyncio.Semaphore(concurrency)
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        async with slots:
+            try:
+                await verify("secret", hashed)
+            except ServiceBusy:
+                rejected += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probing
+    latencies.sort()
+    p99 = latencies[int(0.99 * (len(latencies) - 1))]
+    print(
+        f"{name:<8} {(logins - rejected) / elapsed:>7.1f} logins/s"
+        f" {rejected:>4} rejected"
+        f"  other requests p50 {statistics.median(latencies) * 1000:>7.2f}ms"
+        f" p99 {p99 * 1000:>7.2f}ms"
+        f" max {max(latencies) * 1000:>7.2f}ms"
+    )
+
+
+async def main(logins: int, concurrency: int, workers: int, max_pending: int):
+    print(f"{logins} logins, {concurrency} at a time")
+
+    async def inline(password, hashed):
+        return verify_password(password, hashed)
+
+    await storm("inline", inline, logins, concurrency)
+    passwords = PasswordHasher(workers=workers, max_pending=max_pending)
+    await storm(f"pool({workers})", passwords.verify, logins, concurrency)
+    passwords.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=64)
+    args = parser.parse_args()
+    asyncio.run(
+        main(args.logins, args.concurrency, args.workers, args.max_pending)
+    )
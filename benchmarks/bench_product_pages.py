@@ -0,0 +1,96 @@
+"""Paged product loading with many variations per product.
+
+Compares the old joined query (outerjoin + contains_eager + LIMIT) with
+the repository's id page + selectin load, on an in-memory SQLite db.
+
+    PYTHONPATH=. python benchmarks/bench_product_pages.py --variations 50
+"""
+import argparse
+import asyncio
+import time
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import contains_eager, sessionmaker
+from api.adapters import orm, repository
+from api.domain import models
+
+
+async def seed(session_factory, products: int, variations: int):
+    async with session_factory() as session:
+        for i in range(products):
+            product = models.Product(
+                name=f"product {i}", description="", price=1.0
+            )
+            product.variations = [
+                models.Variation(
+                    name=f"variation {j}", price=1.0, product_id=product.id
+                )
+                for j in range(variations)
+            ]
+            session.add(product)
+        await session.commit()
+
+
+async def joined_page(session, page, page_size):
+    result = await session.execute(
+        select(models.Product)
+        .outerjoin(models.Variation, models.Product.variations)
+        .options(contains_eager(models.Product.variations))
+        .filter(
+            models.Product.is_deleted == 0, models.Variation.is_deleted == 0
+        )
+        .order_by(models.Product.id)
+        .offset((page - 1) * page_size)
+        .limit(page_size)
+    )
+    return result.scalars().unique().all()
+
+
+async def repository_page(session, page, page_size):
+    return await repository.SqlAlchemyProductRepository(session).get_all(
+        page, page_size
+    )
+
+
+async def report(name, session_factory, load, pages, page_size):
+    loaded = 0
+    start = time.perf_counter()
+    for page in range(1, pages + 1):
+        async with session_factory() as session:
+            loaded += len(await load(session, page, page_size))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<10} {pages / elapsed:>8,.1f} pages/s"
+        f" {loaded / elapsed:>10,.1f} products/s"
+        f" {loaded / pages:>6.1f} products/page (wanted {page_size})"
+    )
+
+
+async def main(products: int, variations: int, page_size: int):
+    orm.start_mappers()
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(orm.metadata.create_all)
+    session_factory = sessionmaker(
+        bind=engine, class_=AsyncSession, expire_on_commit=False
+    )
+    await seed(session_factory, products, variations)
+    pages = products // page_size
+    print(
+        f"{products} products x {variations} variations,"
+        f" {pages} pages of {page_size}"
+    )
+    await report("joined", session_factory, joined_page, pages, page_size)
+    await report(
+        "selectin", session_factory, repository_page, pages, page_size
+    )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--variations", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.products, args.variations, args.page_size))
@@ -0,0 +1,110 @@
+"""Send throughput of pooled SMTP sessions against a connection each.
+
+Runs a local SMTP sink whose greeting is delayed by ``--latency`` to
+stand in for the TCP + banner round trips of a real server, then sends
+the same messages with a new connection per message (the old adapter)
+and through the SMTPPool.
+
+    PYTHONPATH=. python benchmarks/bench_smtp_pool.py --messages 200
+"""
+import argparse
+import asyncio
+import time
+from email.mime.text import MIMEText
+import aiosmtplib
+from api.adapters.smtp_pool import SMTPPool
+
+
+class Sink:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.connections = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        await asyncio.sleep(self.latency)
+        writer.write(b"220 sink\r\n")
+        try:
+            while line := await reader.readline():
+                command = line.decode().strip().upper()
+                if command.startswith("DATA"):
+                    writer.write(b"354 go ahead\r\n")
+                    while await reader.readline() != b".\r\n":
+                        pass
+                    writer.write(b"250 queued\r\n")
+                elif command.startswith("QUIT"):
+                    writer.write(b"221 bye\r\n")
+                    break
+                else:
+                    writer.write(b"250 ok\r\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def message(n: int):
+    msg = MIMEText(f"message {n}", "plain", "utf-8")
+    msg["Subject"] = f"message {n}"
+    msg["From"] = "bench@example.com"
+    msg["To"] = "customer@example.com"
+    return msg
+
+
+async def connection_per_message(sink: Sink, messages: int):
+    for n in range(messages):
+        client = aiosmtplib.SMTP(hostname="127.0.0.1", port=sink.port)
+        await client.connect()
+        await client.send_message(message(n))
+        await client.quit()
+
+
+async def pooled(sink: Sink, messages: int, size: int):
+    pool = SMTPPool("127.0.0.1", sink.port, size=size)
+    await asyncio.gather(*(pool.send(message(n)) for n in range(messages)))
+    await pool.close()
+
+
+async def run(name, send, sink: Sink, messages: int):
+    connections = sink.connections
+    start = time.perf_counter()
+    await send()
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<12} {messages / elapsed:>9.1f} msg/s"
+        f" {sink.connections - connections:>6} connections"
+    )
+
+
+async def main(messages: int, size: int, latency: float):
+    sink = Sink(latency)
+    await sink.start()
+    print(f"{messages} messages, {latency * 1000:.0f}ms greeting")
+    await run(
+        "per message",
+        lambda: connection_per_message(sink, messages),
+        sink,
+        messages,
+    )
+    await run(
+        f"pool({size})", lambda: pooled(sink, messages, size), sink, messages
+    )
+    await sink.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100)
+    parser.add_argument("--size", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.messages, args.size, args.latency))
@@ -0,0 +1,80 @@
+"""Rendering the order emails for large orders.
+
+Compares a new Jinja environment per email (the old render_template)
+with the shared TemplateRenderer, and with a shared environment using
+Jinja's async mode.
+
+    PYTHONPATH=. python benchmarks/bench_templates.py --items 200
+"""
+import argparse
+import asyncio
+import time
+from jinja2 import Environment, FileSystemLoader
+from api.adapters.templates import TEMPLATES_DIR, TemplateRenderer
+
+
+def order(items: int) -> dict:
+    return {
+        "status": "WAITING",
+        "total_cost": 10.0 * items,
+        "consume_location": "IN_HOUSE",
+        "created_at": None,
+        "updated_at": None,
+        "order_items": [
+            {
+                "display_name": f"Product {i} (Large)",
+                "product_id": f"product-{i}",
+                "variation_id": f"variation-{i}",
+                "quantity": 1 + i % 3,
+                "unit_price": 10.0,
+            }
+            for i in range(items)
+        ],
+    }
+
+
+async def report(name, render, emails: int, context: dict):
+    size = 0
+    start = time.perf_counter()
+    for i in range(emails):
+        template = (
+            "order_created.html" if i % 2 else "order_status_changed.html"
+        )
+        size += len(await render(template, **context))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<12} {emails / elapsed:>9,.1f} emails/s"
+        f" {size / elapsed / 2**20:>8,.1f} MiB/s"
+    )
+
+
+async def per_email_environment(template, **context):
+    env = Environment(loader=FileSystemLoader(str(TEMPLATES_DIR)))
+    return env.get_template(template).render(**context)
+
+
+async def main(emails: int, items: int):
+    context = order(items)
+    print(f"{emails} emails, {items} items per order")
+    await report("per email", per_email_environment, emails, context)
+
+    renderer = TemplateRenderer()
+    renderer.precompile()
+    await report("shared", renderer.render, emails, context)
+
+    async_env = Environment(
+        loader=FileSystemLoader(str(TEMPLATES_DIR)), enable_async=True
+    )
+
+    async def shared_async(template, **context):
+        return await async_env.get_template(template).render_async(**context)
+
+    await report("shared async", shared_async, emails, context)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--emails", type=int, default=500)
+    parser.add_argument("--items", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.emails, args.items))
@@ -67,6 +67,14 @@ resource "aws_iam_role_policy_attachment" "ses_role_policy_attachment" {
   policy_arn = "arn:aws:iam::aws:policy/AmazonSESFullAccess"
 }
 
+// Template for sale announcements, sent in bulk (SES_SALE_TEMPLATE)
+resource "aws_ses_template" "order_sale" {
+  name    = "order_sale"
+  subject = "This item is on sale!"
+  html    = "<p>Item {{product_id}} is on sale!, price is {{sale_price}} (was {{price}}), go to <a href=\"{{url}}\">{{url}}</a> to buy it!</p>"
+  text    = "Item {{product_id}} is on sale!, price is {{sale_price}} (was {{price}}), go to {{url}} to buy it!"
+}
+
 resource "aws_db_instance" "postgres" {
   identifier           = "my-postgres"
   engine               = "postgres"
@@ -22,16 +22,18 @@ def event_loop():
     loop.close()
 
 
+# tests/e2e/db_dict.json is a snapshot written when the initial data is
+# created, so these depend on the fixtures that create it.
 @pytest_asyncio.fixture
-async def db_state_dict_sqlite():
-    file = open("tests/e2e/db_dict.json", "r")
-    return json.load(file)
+async def db_state_dict_sqlite(create_db):
+    with open("tests/e2e/db_dict.json", "r") as file:
+        return json.load(file)
 
 
 @pytest_asyncio.fixture
-async def db_state_dict_postgres():
-    file = open("tests/e2e/db_dict.json", "r")
-    return json.load(file)
+async def db_state_dict_postgres(postgres_create):
+    with open("tests/e2e/db_dict.json", "r") as file:
+        return json.load(file)
 
 
 def dictionary_representation(row):
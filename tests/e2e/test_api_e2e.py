@@ -3,9 +3,9 @@ from api.domain import enums
 import api.bootstrap as bootstrap
 import logging
 import uuid
-from httpx import AsyncClient
+from asgi_lifespan import LifespanManager
+from httpx import ASGITransport, AsyncClient
 from api.entrypoints import app
-import json
 from api.service_layer import unit_of_work
 from api.adapters.notifications import EmailLocalNotifications
 import asyncio
@@ -42,9 +42,15 @@ def message_bus(postgres_session_factory):
 
 @pytest_asyncio.fixture(scope="function")
 async def client(message_bus):
-    async with AsyncClient(app=app.app, base_url="http://test") as client:
-        app.app.dependency_overrides[app.get_bus] = message_bus
-        yield client
+    # The lifespan builds the resources (revocations, catalog cache) the
+    # dependencies read from app.state.
+    async with LifespanManager(app.app):
+        async with AsyncClient(
+            transport=ASGITransport(app=app.app), base_url="http://test"
+        ) as client:
+            app.app.dependency_overrides[app.get_bus] = message_bus
+            yield client
+        app.app.dependency_overrides.clear()
 
 
 @pytest_asyncio.fixture
@@ -96,7 +102,7 @@ async def test_create_order(
     }
     response = await client.post(
         "/orders",
-        content=json.dumps(order_data),
+        json=order_data,
         headers={"Authorization": f"Bearer {get_customer_auth_token}"},
     )
 
@@ -127,7 +133,7 @@ async def test_create_order(
 #     }
 #     response = await client.post(
 #         "/orders",
-#         content=json.dumps(order_data),
+#         json=order_data,
 #         headers={"Authorization": f"Bearer {get_customer_auth_token}"},
 #     )
 
@@ -168,7 +174,7 @@ async def test_create_order(
 #     }
 #     response = await client.post(
 #         "/orders",
-#         content=json.dumps(order_data),
+#         json=order_data,
 #         headers={"Authorization": f"Bearer {get_customer_auth_token}"},
 #     )
 
@@ -229,6 +235,11 @@ async def test_customer_cant_access_resources(
         headers={"Authorization": f"Bearer {get_customer_auth_token}"},
     )
     assert response.status_code == 403
+    response = await client.get(
+        "/stats",
+        headers={"Authorization": f"Bearer {get_customer_auth_token}"},
+    )
+    assert response.status_code == 403
 
 
 @pytest.mark.asyncio
@@ -288,6 +299,18 @@ async def test_get_order_not_found(client: AsyncClient, get_manager_auth_token):
     assert response.status_code == 404
 
 
+@pytest.mark.asyncio
+async def test_malformed_ids_are_rejected_before_the_database(
+    client: AsyncClient, get_manager_auth_token
+):
+    response = await client.get(
+        "/orders/abc",
+        headers={"Authorization": f"Bearer {get_manager_auth_token}"},
+    )
+    assert response.status_code == 422
+    assert "Database error" not in response.text
+
+
 @pytest.mark.asyncio
 async def test_customer_cancels_its_order(
     client: AsyncClient, db_state_dict_postgres, get_customer_auth_token
@@ -319,6 +342,32 @@ async def test_get_all_products(
     assert response.status_code == 200
 
 
+@pytest.mark.asyncio
+async def test_listings_page_with_the_requested_size(
+    client: AsyncClient, db_state_dict_postgres, get_manager_auth_token
+):
+    for path in ("/products", "/catalog"):
+        response = await client.get(
+            path,
+            params={"page_size": 2},
+            headers={"Authorization": f"Bearer {get_manager_auth_token}"},
+        )
+        assert response.status_code == 200
+        first = response.json()
+        assert len(first["products"]) == 2
+        assert first["next_cursor"] is not None
+
+        response = await client.get(
+            path,
+            params={"page_size": 2, "cursor": first["next_cursor"]},
+            headers={"Authorization": f"Bearer {get_manager_auth_token}"},
+        )
+        second = response.json()["products"]
+        assert len(second) == 2
+        seen = {product["id"] for product in first["products"]}
+        assert seen.isdisjoint(product["id"] for product in second)
+
+
 @pytest.mark.asyncio
 async def test_create_product(
     client: AsyncClient, db_state_dict_postgres, get_manager_auth_token
@@ -340,7 +389,7 @@ async def test_create_product(
     }
     response = await client.post(
         "/products",
-        content=json.dumps(product_data),
+        json=product_data,
         headers={"Authorization": f"Bearer {get_manager_auth_token}"},
     )
     assert response.status_code == 200
@@ -449,7 +498,7 @@ async def test_create_and_authenticate_new_user(
     }
     response = await client.post(
         "/users",
-        content=json.dumps(user_data),
+        json=user_data,
     )
     assert response.status_code == 200
 
@@ -0,0 +1,99 @@
+import pytest
+from api import views
+from api.adapters import repository
+from api.domain import models
+from api.service_layer import unit_of_work
+from api.utils import pagination
+
+
+@pytest.mark.asyncio
+async def test_rebuild_matches_the_products(
+    sqlite_session_factory, db_state_dict_sqlite
+):
+    state = db_state_dict_sqlite
+    session = sqlite_session_factory()
+
+    count = await repository.SqlAlchemyCatalogRepository(session).rebuild()
+    await session.commit()
+
+    rows = await views.catalog(
+        unit_of_work.SqlAlchemyUnitOfWork(sqlite_session_factory),
+        page_size=100,
+    )
+    assert count == len(state["products"]) == len(rows)
+    for row in rows:
+        expected = [
+            v["id"] for v in state["variations"] if v["product_id"] == row["id"]
+        ]
+        assert sorted(v["id"] for v in row["variations"]) == sorted(expected)
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_refresh_keeps_rows_in_step(sqlite_session_factory):
+    uow = unit_of_work.SqlAlchemyUnitOfWork(sqlite_session_factory)
+    async with uow:
+        product = models.Product(
+            name="Flat White", description="", price=3.0
+        )
+        product.add_variation(
+            models.Variation(name="Oat", price=3.5, product_id=product.id)
+        )
+        await uow.products.add(product)
+        await uow.catalog.refresh(product)
+        await uow.commit()
+
+    rows = await views.catalog(uow, page_size=100)
+    [row] = [row for row in rows if row["id"] == product.id]
+    assert [v["name"] for v in row["variations"]] == ["Oat"]
+
+    async with uow:
+        product = await uow.products.get(product.id)
+        await uow.products.delete(product)
+        await uow.catalog.refresh(product)
+        await uow.commit()
+
+    rows = await views.catalog(uow, page_size=100)
+    assert product.id not in [row["id"] for row in rows]
+
+
+@pytest.mark.asyncio
+async def test_catalog_pages_with_cursors(sqlite_session_factory):
+    uow = unit_of_work.SqlAlchemyUnitOfWork(sqlite_session_factory)
+    expected = [row["id"] for row in await views.catalog(uow, page_size=100)]
+
+    seen, cursor = [], None
+    for _ in range(len(expected)):
+        rows = await views.catalog(uow, page_size=4, cursor=cursor)
+        seen += [row["id"] for row in rows]
+        cursor = pagination.next_cursor(
+            rows, 4, key=lambda row: (row["created_at"], row["id"])
+        )
+        if cursor is None:
+            break
+
+    assert seen == expected
+
+
+@pytest.mark.asyncio
+async def test_refreshing_an_existing_row_updates_it_in_place(
+    sqlite_session_factory,
+):
+    uow = unit_of_work.SqlAlchemyUnitOfWork(sqlite_session_factory)
+    async with uow:
+        product = models.Product(name="Mocha", description="", price=3.0)
+        await uow.products.add(product)
+        await uow.catalog.refresh(product)
+        await uow.commit()
+
+    async with uow:
+        product = await uow.products.get(product.id, for_update=True)
+        product.name = "Iced Mocha"
+        await uow.catalog.refresh(product)
+        await uow.catalog.refresh(product)
+        await uow.commit()
+
+    rows = await views.catalog(uow, page_size=100)
+    assert [row["name"] for row in rows if row["id"] == product.id] == [
+        "Iced Mocha"
+    ]
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select, update
+from api.adapters import codecs, redis_eventpublisher, repository
+from api.adapters.orm import outbox as outbox_table
+from api.entrypoints.outbox_relay import OutboxRelay, relay_batch
+
+
+@pytest.mark.asyncio
+async def test_relay_publishes_pending_messages_once(
+    sqlite_session_factory, monkeypatch
+):
+    published = []
+
+    async def fake_publish_many(messages):
+        published.extend(messages)
+
+    monkeypatch.setattr(
+        redis_eventpublisher, "publish_many", fake_publish_many
+    )
+    session = sqlite_session_factory()
+    outbox = repository.SqlAlchemyOutboxRepository(session)
+    await outbox.add(channel="orders", event="OrderCancelled", data={"a": 1})
+    await outbox.add(channel="orders", event="OrderCancelled", data={"a": 2})
+    await session.commit()
+    await session.close()
+
+    assert await relay_batch(sqlite_session_factory, batch_size=10) == 2
+    assert await relay_batch(sqlite_session_factory, batch_size=10) == 0
+    assert [codecs.decode(payload)["data"] for _, payload in published] == [
+        {"a": 1},
+        {"a": 2},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stopping_flushes_what_is_pending_in_batches(
+    sqlite_session_factory, monkeypatch
+):
+    batches = []
+
+    async def fake_publish_many(messages):
+        batches.append(messages)
+
+    monkeypatch.setattr(
+        redis_eventpublisher, "publish_many", fake_publish_many
+    )
+    session = sqlite_session_factory()
+    outbox = repository.SqlAlchemyOutboxRepository(session)
+    for i in range(3):
+        await outbox.add(channel="orders", event="OrderCancelled", data={})
+    await session.commit()
+    await session.close()
+    relay = OutboxRelay(sqlite_session_factory, batch_size=2)
+
+    relay.stop()
+    await relay.run()
+
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert relay.stats()["flushes"] == 2
+    assert relay.stats()["published"] == 3
+    assert relay.stats()["max_batch_size"] == 2
+
+
+@pytest.mark.asyncio
+async def test_relay_purges_rows_sent_before_the_retention(
+    sqlite_session_factory, monkeypatch
+):
+    async def fake_publish_many(messages):
+        pass
+
+    monkeypatch.setattr(
+        redis_eventpublisher, "publish_many", fake_publish_many
+    )
+    session = sqlite_session_factory()
+    outbox = repository.SqlAlchemyOutboxRepository(session)
+    for i in range(3):
+        await outbox.add(channel="orders", event="OrderCancelled", data={})
+    await session.commit()
+    await session.close()
+    await relay_batch(sqlite_session_factory, batch_size=2)
+    async with sqlite_session_factory() as session, session.begin():
+        await session.execute(
+            update(outbox_table).values(
+                sent_at=datetime.utcnow() - timedelta(hours=2)
+            ).where(outbox_table.c.sent_at.is_not(None))
+        )
+    relay = OutboxRelay(sqlite_session_factory, batch_size=2, retention=3600)
+
+    running = asyncio.create_task(relay.run())
+    await asyncio.sleep(0.1)
+    relay.stop()
+    await running
+
+    async with sqlite_session_factory() as session:
+        sent_at = (await session.execute(select(outbox_table.c.sent_at))).all()
+    assert len(sent_at) == 1
+    assert sent_at[0].sent_at is not None
+    assert relay.stats()["purged"] == 2
@@ -0,0 +1,221 @@
+"""EXPLAIN the hot read paths against a seeded Postgres database.
+
+The queries are captured as the repositories and views actually send
+them, then explained; a sequential scan on one of the large tables means
+an index stopped matching the query.
+"""
+import json
+from contextlib import asynccontextmanager
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from api import views
+from api.domain.enums import OrderStatus
+from api.service_layer import unit_of_work
+from api.utils import pagination
+
+LARGE_TABLES = {
+    "products",
+    "variations",
+    "orders",
+    "order_items",
+    "catalog_read_model",
+}
+KINDS = ["users", "products", "variations", "orders", "order_items"]
+
+
+def seeded_id(kind: str, n: int) -> str:
+    return f"0000000{KINDS.index(kind)}-0000-7000-8000-{n:012d}"
+
+
+def seeded_id_sql(kind: str, n: str) -> str:
+    prefix = seeded_id(kind, 0)[:-12]
+    return f"('{prefix}' || lpad(({n})::text, 12, '0'))::uuid"
+
+
+SEED = [
+    """
+    INSERT INTO users (id, email, password)
+    SELECT {user_id}, 'plan-user-' || i || '@example.com', ''
+    FROM generate_series(1, 2000) AS i
+    """,
+    """
+    INSERT INTO products (
+        id, name, description, price, is_deleted, created_at, updated_at
+    )
+    SELECT {product_id}, 'plan product ' || i, '', 1.0,
+        (i % 10 = 0)::int,
+        now() - i * interval '1 second', now()
+    FROM generate_series(1, 20000) AS i
+    """,
+    """
+    INSERT INTO variations (
+        id, name, price, is_deleted, product_id, created_at, updated_at
+    )
+    SELECT {variation_id}, 'variation ' || i, 1.0,
+        (i % 7 = 0)::int, {variation_product_id}, now(), now()
+    FROM generate_series(1, 100000) AS i
+    """,
+    """
+    INSERT INTO orders (
+        id, status, consume_location, total_cost, user_id, is_deleted,
+        created_at, updated_at
+    )
+    SELECT {order_id},
+        (ARRAY['WAITING', 'PREPARATION', 'READY', 'DELIVERED',
+            'CANCELLED'])[1 + i % 5]::orderstatus,
+        'IN_HOUSE'::consumelocation, 1.0, {order_user_id},
+        0, now() - i * interval '1 second', now()
+    FROM generate_series(1, 50000) AS i
+    """,
+    """
+    INSERT INTO order_items (
+        id, quantity, unit_price, product_id, variation_id, order_id,
+        created_at, updated_at
+    )
+    SELECT {item_id}, 1, 1.0, {item_product_id},
+        {item_variation_id}, {item_order_id},
+        now(), now()
+    FROM generate_series(1, 150000) AS i
+    """,
+    """
+    INSERT INTO catalog_read_model (
+        product_id, name, description, price, variations, created_at
+    )
+    SELECT id, name, description, price, '[]'::json, created_at
+    FROM products WHERE is_deleted = 0
+    ON CONFLICT (product_id) DO NOTHING
+    """,
+    "ANALYZE users, products, variations, orders, order_items,"
+    " catalog_read_model",
+]
+SEED_IDS = {
+    "user_id": seeded_id_sql("users", "i"),
+    "product_id": seeded_id_sql("products", "i"),
+    "variation_id": seeded_id_sql("variations", "i"),
+    "variation_product_id": seeded_id_sql("products", "1 + i % 20000"),
+    "order_id": seeded_id_sql("orders", "i"),
+    "order_user_id": seeded_id_sql("users", "1 + i % 2000"),
+    "item_id": seeded_id_sql("order_items", "i"),
+    "item_product_id": seeded_id_sql("products", "1 + i % 20000"),
+    "item_variation_id": seeded_id_sql("variations", "1 + i % 100000"),
+    "item_order_id": seeded_id_sql("orders", "1 + i % 50000"),
+}
+
+
+@pytest_asyncio.fixture(scope="module")
+async def seeded_connection(postgres_async_engine, postgres_create):
+    # Everything runs in one transaction that is rolled back at the end,
+    # so the other suites still see the small fixture data set.
+    async with postgres_async_engine.connect() as conn:
+        transaction = await conn.begin()
+        for statement in SEED:
+            await conn.execute(text(statement.format(**SEED_IDS)))
+        yield conn
+        await transaction.rollback()
+
+
+@pytest.fixture
+def uow(seeded_connection):
+    return unit_of_work.SqlAlchemyUnitOfWork(
+        lambda: AsyncSession(
+            bind=seeded_connection,
+            expire_on_commit=False,
+            join_transaction_mode="create_savepoint",
+        )
+    )
+
+
+@asynccontextmanager
+async def captured(conn):
+    """Collect the (statement, parameters) sent on ``conn``."""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(conn.sync_connection, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(conn.sync_connection, "before_cursor_execute", capture)
+
+
+def plan_nodes(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+async def assert_no_seq_scans(conn, statements):
+    assert statements
+    for statement, parameters in statements:
+        if not statement.lstrip().upper().startswith("SELECT"):
+            continue
+        result = await conn.exec_driver_sql(
+            "EXPLAIN (FORMAT JSON) " + statement, parameters
+        )
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scanned = {
+            node["Relation Name"]
+            for node in plan_nodes(plan[0]["Plan"])
+            if node["Node Type"] == "Seq Scan"
+        }
+        assert not scanned & LARGE_TABLES, (statement, plan)
+
+
+@pytest.mark.asyncio
+async def test_product_pages_use_indexes(seeded_connection, uow):
+    async with uow, captured(seeded_connection) as statements:
+        first = await uow.products.get_all(page=1, page_size=10)
+        await uow.products.get_all(
+            page_size=10, cursor=pagination.next_cursor(first, 10)
+        )
+    await assert_no_seq_scans(seeded_connection, statements)
+
+
+@pytest.mark.asyncio
+async def test_customer_orders_use_indexes(seeded_connection, uow):
+    async with uow, captured(seeded_connection) as statements:
+        first = await uow.orders.get_all(
+            1, 10, filters={"user_id": seeded_id("users", 42)}
+        )
+        await uow.orders.get_all(
+            page_size=10,
+            filters={"user_id": seeded_id("users", 42)},
+            cursor=pagination.next_cursor(first, 10),
+        )
+    await assert_no_seq_scans(seeded_connection, statements)
+
+
+@pytest.mark.asyncio
+async def test_manager_orders_by_status_use_indexes(seeded_connection, uow):
+    async with uow, captured(seeded_connection) as statements:
+        await uow.orders.get_all(1, 10)
+        await uow.orders.get_all(
+            1, 10, filters={"status": OrderStatus.READY}
+        )
+    await assert_no_seq_scans(seeded_connection, statements)
+
+
+@pytest.mark.asyncio
+async def test_order_lookup_uses_indexes(seeded_connection, uow):
+    async with uow, captured(seeded_connection) as statements:
+        await uow.orders.get(seeded_id("orders", 42))
+    await assert_no_seq_scans(seeded_connection, statements)
+
+
+@pytest.mark.asyncio
+async def test_catalog_uses_indexes(seeded_connection, uow):
+    async with captured(seeded_connection) as statements:
+        first = await views.catalog(uow, page=1)
+        await views.catalog(
+            uow,
+            cursor=pagination.next_cursor(
+                first, 10, key=lambda row: (row["created_at"], row["id"])
+            ),
+        )
+    await assert_no_seq_scans(seeded_connection, statements)
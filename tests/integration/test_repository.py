@@ -1,21 +1,26 @@
+from datetime import datetime
 import pytest
+from sqlalchemy import text
 from api.adapters import repository
-from api.domain import models
+from api.domain import commands, models
+from api.service_layer import handlers, unit_of_work
+from api.utils import pagination
+from api.utils.ids import uuid7
 
 
 @pytest.mark.asyncio
 async def test_get_order_by_id(sqlite_session_factory):
     session = sqlite_session_factory()
-    order_id = "123"
+    order_id = uuid7()
     order = models.Order(
         id=order_id,
         consume_location=models.ConsumeLocation.IN_HOUSE,
-        user_id="123",
+        user_id=uuid7(),
         order_items=[
             models.OrderItem(
-                order_id="123",
-                product_id="123",
-                variation_id="123",
+                order_id=order_id,
+                product_id=uuid7(),
+                variation_id=uuid7(),
                 quantity=2,
                 unit_price=10.0,
             )
@@ -28,3 +33,146 @@ async def test_get_order_by_id(sqlite_session_factory):
     result = await repo.get(order_id)
     assert result == order
     await session.close()
+
+
+@pytest.mark.asyncio
+async def test_get_many_products_and_variations(
+    sqlite_session_factory, db_state_dict_sqlite
+):
+    state = db_state_dict_sqlite
+    session = sqlite_session_factory()
+    product_ids = [p["id"] for p in state["products"][:3]]
+    variation_ids = [v["id"] for v in state["variations"][:2]]
+
+    products = await repository.SqlAlchemyProductRepository(
+        session
+    ).get_many(product_ids + [uuid7()])
+    variations = await repository.SqlAlchemyVariationRepository(
+        session
+    ).get_many(variation_ids)
+
+    assert sorted(p.id for p in products) == sorted(product_ids)
+    assert sorted(v.id for v in variations) == sorted(variation_ids)
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_walks_all_orders(sqlite_session_factory):
+    session = sqlite_session_factory()
+    repo = repository.SqlAlchemyOrderRepository(session)
+    user_id = uuid7()
+    for _ in range(5):
+        await repo.add(
+            models.Order(
+                consume_location=models.ConsumeLocation.IN_HOUSE,
+                user_id=user_id,
+                order_items=[],
+                total_cost=0.0,
+                # Same timestamp for all, so the id has to break ties.
+                created_at=datetime(2024, 1, 1),
+            )
+        )
+    await session.commit()
+    filters = {"user_id": user_id}
+    expected = [order.id for order in await repo.get_all(1, 100, filters)]
+
+    seen, cursor = [], None
+    for _ in range(len(expected)):
+        page = await repo.get_all(page_size=2, filters=filters, cursor=cursor)
+        seen += [order.id for order in page]
+        cursor = pagination.next_cursor(page, 2)
+        if cursor is None:
+            break
+
+    assert len(expected) == 5
+    assert seen == expected
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_get_all_products_returns_full_pages(sqlite_session_factory):
+    session = sqlite_session_factory()
+    repo = repository.SqlAlchemyProductRepository(session)
+    await session.execute(text("UPDATE products SET is_deleted = 1"))
+    for i in range(3):
+        product = models.Product(
+            name=f"product {i}",
+            description="",
+            price=1.0,
+            created_at=datetime(2024, 1, 1, 0, i),
+        )
+        # The first product has no variations at all, the others many.
+        if i:
+            product.variations = [
+                models.Variation(
+                    name=f"variation {j}",
+                    price=1.0,
+                    product_id=product.id,
+                    is_deleted=int(j == 0),
+                )
+                for j in range(20)
+            ]
+        await repo.add(product)
+    await session.commit()
+    session.expunge_all()
+
+    page = await repo.get_all(page=1, page_size=2)
+
+    assert [p.name for p in page] == ["product 0", "product 1"]
+    assert page[0].variations == []
+    assert len(page[1].variations) == 19
+    assert all(v.is_deleted == 0 for v in page[1].variations)
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_product_listing_uses_the_requested_page_size(
+    sqlite_session_factory, db_state_dict_sqlite
+):
+    uow = unit_of_work.SqlAlchemyUnitOfWork(sqlite_session_factory)
+    cmd = commands.GetAllProducts(page=1, page_size=2)
+
+    products = await handlers.get_all_products_handler(cmd, uow)
+
+    assert len(products) == 2 < len(db_state_dict_sqlite["products"])
+    assert pagination.next_cursor(products, cmd.page_size) is not None
+
+
+@pytest.mark.asyncio
+async def test_get_product_version(sqlite_session_factory, db_state_dict_sqlite):
+    session = sqlite_session_factory()
+    repo = repository.SqlAlchemyProductRepository(session)
+    product_id = db_state_dict_sqlite["products"][0]["id"]
+
+    product = await repo.get(product_id)
+    await repo.bump_version(product)
+    await repo.update(product)
+    await session.commit()
+
+    assert product.version == 2
+    assert await repo.get_version(product_id) == 2
+    assert await repo.get_version(uuid7()) is None
+    await session.close()
+
+
+@pytest.mark.asyncio
+async def test_version_bumps_of_stale_products_are_not_lost(
+    sqlite_session_factory, db_state_dict_sqlite
+):
+    product_id = db_state_dict_sqlite["products"][0]["id"]
+    first, second = sqlite_session_factory(), sqlite_session_factory()
+    first_repo = repository.SqlAlchemyProductRepository(first)
+    second_repo = repository.SqlAlchemyProductRepository(second)
+    # Both load version 1 before either writes.
+    first_product = await first_repo.get(product_id)
+    second_product = await second_repo.get(product_id)
+
+    await first_repo.bump_version(first_product)
+    await first.commit()
+    await second_repo.bump_version(second_product)
+    await second.commit()
+
+    assert second_product.version == 3
+    assert await first_repo.get_version(product_id) == 3
+    await first.close()
+    await second.close()
@@ -0,0 +1,199 @@
+import asyncio
+import pytest
+from api.adapters.catalog_cache import (
+    INVALIDATION_CHANNEL,
+    VERSION_KEY,
+    TieredCatalogCache,
+)
+from api.utils.exceptions import CatalogNotInvalidated
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.published = []
+        self.gets = 0
+
+    async def get(self, key):
+        self.gets += 1
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if not (nx and key in self.data):
+            self.data[key] = value
+
+    async def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+
+def loader(pages):
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return pages[len(calls) - 1]
+
+    return load, calls
+
+
+@pytest.mark.asyncio
+async def test_pages_are_served_from_l1_then_l2():
+    client = FakeRedis()
+    load, calls = loader([b"page"])
+    cache = TieredCatalogCache(client)
+    other_worker = TieredCatalogCache(client)
+
+    assert await cache.get_or_load("1:None", load) == b"page"
+    assert await cache.get_or_load("1:None", load) == b"page"
+    assert await other_worker.get_or_load("1:None", load) == b"page"
+
+    assert len(calls) == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["l1_hits"] == 1
+    assert other_worker.stats()["l2_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidate_bumps_the_version_for_every_worker():
+    client = FakeRedis()
+    load, calls = loader([b"old", b"new"])
+    cache = TieredCatalogCache(client)
+    other_worker = TieredCatalogCache(client, l1_ttl=0)
+    await cache.get_or_load("1:None", load)
+    version = cache.version
+
+    await cache.invalidate()
+
+    assert client.published == [(INVALIDATION_CHANNEL, version + 1)]
+    assert await other_worker.get_or_load("1:None", load) == b"new"
+    assert await cache.get_or_load("1:None", load) == b"new"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_new_version_is_not_served_old_pages_before_the_announcement():
+    client = FakeRedis()
+    load, calls = loader([b"old", b"new"])
+    cache = TieredCatalogCache(client)
+    await cache.get_or_load("1:None", load)
+
+    # Another worker invalidates, the pub/sub message hasn't arrived.
+    await TieredCatalogCache(client).invalidate()
+    await cache.get_or_load("2:None", loader([b"other"])[0])
+
+    assert await cache.get_or_load("1:None", load) == b"new"
+    assert cache.version == int(client.data[VERSION_KEY])
+
+
+@pytest.mark.asyncio
+async def test_page_loaded_across_an_invalidation_is_not_cached():
+    client = FakeRedis()
+    cache = TieredCatalogCache(client)
+
+    async def load():
+        await cache.invalidate()
+        return b"maybe stale"
+
+    await cache.get_or_load("1:None", load)
+
+    assert cache.stats()["l1_size"] == 0
+    assert not [key for key in client.data if key.endswith(":1:None")]
+
+
+@pytest.mark.asyncio
+async def test_version_starts_from_the_clock():
+    # so a flushed redis doesn't hand out versions clients still hold
+    client = FakeRedis()
+    cache = TieredCatalogCache(client)
+
+    version = await cache.current_version()
+
+    assert version > 1
+    assert await TieredCatalogCache(client).current_version() == version
+
+
+@pytest.mark.asyncio
+async def test_version_is_served_from_the_worker():
+    client = FakeRedis()
+    cache = TieredCatalogCache(client)
+    version = await cache.current_version()
+    gets = client.gets
+
+    assert await cache.current_version() == version
+    assert client.gets == gets
+
+
+@pytest.mark.asyncio
+async def test_version_is_checked_again_after_the_l1_ttl():
+    client = FakeRedis()
+    cache = TieredCatalogCache(client, l1_ttl=0)
+    await cache.current_version()
+
+    # Another worker invalidates and the announcement is lost.
+    await TieredCatalogCache(client).invalidate()
+
+    assert await cache.current_version() == int(client.data[VERSION_KEY])
+
+
+class DownRedis(FakeRedis):
+    async def incr(self, key):
+        raise ConnectionError("redis is down")
+
+
+@pytest.mark.asyncio
+async def test_failed_invalidation_surfaces_and_drops_the_version():
+    cache = TieredCatalogCache(DownRedis())
+    await cache.current_version()
+
+    with pytest.raises(CatalogNotInvalidated):
+        await cache.invalidate()
+
+    assert cache.version is None
+    assert cache.stats()["errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_l1_is_bounded():
+    cache = TieredCatalogCache(FakeRedis(), l1_size=2)
+    for page in range(3):
+        load, _ = loader([b"page"])
+        await cache.get_or_load(f"{page}:None", load)
+
+    assert cache.stats()["l1_size"] == 2
+
+
+class StubbornPubSub:
+    """Swallows the first cancellation, as redis-py can mid-connect."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def subscribe(self, channel):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            pass
+
+    async def listen(self):
+        await asyncio.sleep(10)
+        yield {}
+
+
+@pytest.mark.asyncio
+async def test_close_stops_a_listener_that_swallowed_a_cancel():
+    client = FakeRedis()
+    client.pubsub = StubbornPubSub
+    cache = TieredCatalogCache(client)
+    await cache.start()
+    await asyncio.sleep(0)
+
+    await asyncio.wait_for(cache.close(), 1)
+
+    assert cache._listener.done()
@@ -0,0 +1,59 @@
+import json
+from datetime import datetime
+import pytest
+from api.adapters import codecs
+from api.domain import events
+from api.domain.enums import OrderStatus
+
+
+def order_status_changed():
+    return events.OrderStatusChanged(
+        order_id="1",
+        user_id="2",
+        total_cost=10.0,
+        status=OrderStatus.READY,
+        consume_location="In-House",
+        order_items=[{"name": "Latte with Vanilla", "quantity": 1}],
+        updated_at=datetime(2023, 6, 25, 14, 34, 11),
+    )
+
+
+@pytest.mark.parametrize(
+    "version",
+    [
+        codecs.JSON,
+        pytest.param(
+            codecs.MSGPACK,
+            marks=pytest.mark.skipif(
+                codecs.msgpack is None, reason="msgpack is not installed"
+            ),
+        ),
+    ],
+)
+def test_event_round_trip(version):
+    payload = codecs.encode_event(order_status_changed(), version)
+
+    assert payload[0] == version
+    event = codecs.decode_event(payload)
+    assert isinstance(event, events.OrderStatusChanged)
+    assert event.status == "Ready"
+    assert event.updated_at == "2023-06-25T14:34:11"
+    assert event.order_items == [{"name": "Latte with Vanilla", "quantity": 1}]
+
+
+def test_legacy_json_payloads_are_decoded():
+    payload = json.dumps({"event": "ProductDiscount", "data": {}})
+
+    assert codecs.decode(payload) == {"event": "ProductDiscount", "data": {}}
+
+
+def test_private_dataclass_fields_are_not_encoded():
+    event = order_status_changed()
+    event._events = ["internal"]
+
+    assert "_events" not in codecs.decode(codecs.encode("Order", event))["data"]
+
+
+def test_unknown_codec_version_is_rejected():
+    with pytest.raises(ValueError):
+        codecs.decode(b"\x09{}")
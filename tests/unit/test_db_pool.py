@@ -0,0 +1,67 @@
+import asyncio
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from api import config
+from api.adapters.db_pool import TimedQueuePool
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=TimedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.2,
+    )
+
+
+@pytest.mark.asyncio
+async def test_checkout_waits_are_recorded(engine):
+    async def hold(seconds):
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            await asyncio.sleep(seconds)
+
+    await asyncio.gather(hold(0.05), hold(0))
+
+    stats = engine.pool.stats()
+    assert stats["checkouts"] == 2
+    assert stats["wait_max_ms"] >= 40
+    assert stats["timeouts"] == 0
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_checkout_timeouts_are_counted(engine):
+    async with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            async with engine.connect():
+                pass
+
+    assert engine.pool.stats()["timeouts"] == 1
+    await engine.dispose()
+
+
+def test_prod_pools_split_the_connections_between_workers(monkeypatch):
+    monkeypatch.setenv("DB_PROFILE", "prod")
+    monkeypatch.setenv("DB_MAX_CONNECTIONS", "80")
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+
+    settings = config.get_engine_settings()
+
+    assert settings["pool_size"] + settings["max_overflow"] == 20
+    assert settings["echo"] is False
+
+
+def test_settings_can_be_overridden(monkeypatch):
+    monkeypatch.setenv("DB_PROFILE", "benchmark")
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_ECHO", "true")
+
+    settings = config.get_engine_settings()
+
+    assert settings["pool_size"] == 3
+    assert settings["echo"] is True
+    assert settings["pool_pre_ping"] is False
@@ -0,0 +1,20 @@
+from api.utils import etags
+
+
+def test_etag_changes_with_the_version():
+    assert etags.make_etag("product", "id", 1) == etags.make_etag(
+        "product", "id", 1
+    )
+    assert etags.make_etag("product", "id", 1) != etags.make_etag(
+        "product", "id", 2
+    )
+
+
+def test_if_none_match():
+    etag = etags.make_etag("catalog", 1, 1, None)
+
+    assert etags.matches(etag, etag)
+    assert etags.matches(f'"other", W/{etag}', etag)
+    assert etags.matches("*", etag)
+    assert not etags.matches('"other"', etag)
+    assert not etags.matches(None, etag)
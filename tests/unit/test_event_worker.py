@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from api.domain import commands, events
+from api.domain.enums import UserRole
+from api.domain.models import User
+from api.service_layer import messagebus
+from api.service_layer.event_worker import BackgroundEventWorker
+from tests.unit.test_handler import FakeUnitOfWork
+
+
+def make_bus(event_handler):
+    async def health_check(cmd, uow):
+        user = User(
+            email="worker@example.com", password="", role=UserRole.CUSTOMER
+        )
+        user.append_event(events.OrderSale())
+        await uow.users.add(user)
+        return True
+
+    return messagebus.MessageBus(
+        uow_factory=FakeUnitOfWork,
+        event_handlers={events.OrderSale: [event_handler]},
+        command_handlers={commands.HealthCheck: health_check},
+    )
+
+
+@pytest.mark.asyncio
+async def test_command_returns_before_events_are_handled():
+    release = asyncio.Event()
+    handled = []
+
+    async def slow_handler(event, uow):
+        await release.wait()
+        handled.append(event)
+
+    bus = make_bus(slow_handler)
+    worker = BackgroundEventWorker(bus, maxsize=10, workers=1)
+    bus.event_dispatcher = worker.submit
+    worker.start()
+
+    assert await bus.handle(commands.HealthCheck()) is True
+    assert handled == []
+
+    release.set()
+    await worker.stop()
+
+    assert len(handled) == 1
+    assert worker.stats()["processed"] == 1
+    assert worker.stats()["queue_depth"] == 0
+
+
+@pytest.mark.asyncio
+async def test_submit_waits_while_the_queue_is_full():
+    async def handler(event, uow):
+        pass
+
+    worker = BackgroundEventWorker(make_bus(handler), maxsize=1, workers=1)
+    await worker.submit(events.OrderSale())
+
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(worker.submit(events.OrderSale()), 0.05)
+    assert worker.stats()["queue_depth"] == 1
+
+    worker.start()
+    await worker.stop()
+    assert worker.stats()["processed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failing_handlers_are_counted():
+    async def failing_handler(event, uow):
+        raise RuntimeError("boom")
+
+    worker = BackgroundEventWorker(make_bus(failing_handler), workers=1)
+    worker.start()
+    await worker.submit(events.OrderSale())
+    await worker.stop()
+
+    assert worker.stats()["failed"] == 1
+    assert worker.stats()["processed"] == 0
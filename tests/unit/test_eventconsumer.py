@@ -0,0 +1,108 @@
+import asyncio
+import json
+import pytest
+from api.entrypoints import eventconsumer
+
+
+class FakeStreamClient:
+    def __init__(self, pending=()):
+        self.acked = []
+        self.pending = list(pending)
+        self.claimed = []
+
+    async def xack(self, stream, group, message_id):
+        self.acked.append(message_id)
+
+    async def xpending_range(self, stream, group, **kwargs):
+        return self.pending
+
+    async def xclaim(self, stream, group, name, min_idle_time, ids):
+        self.claimed.extend(ids)
+        payload = json.dumps({"event": "Unknown", "data": {}})
+        return [(message_id, {b"payload": payload}) for message_id in ids]
+
+
+def make_consumer(client, pool=None):
+    return eventconsumer.StreamConsumer(
+        client, ["products"], bus=None, name="test", pool=pool
+    )
+
+
+@pytest.mark.asyncio
+async def test_handled_messages_are_acked():
+    client = FakeStreamClient()
+    payload = json.dumps({"event": "Unknown", "data": {}})
+
+    await make_consumer(client).dispatch(
+        "products", b"1-0", {b"payload": payload}
+    )
+
+    assert client.acked == [b"1-0"]
+
+
+@pytest.mark.asyncio
+async def test_failed_messages_stay_pending(monkeypatch):
+    async def failing_handler(event, bus):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(eventconsumer, "handle_message", failing_handler)
+    client = FakeStreamClient()
+    payload = json.dumps({"event": "Unknown", "data": {}})
+
+    await make_consumer(client).dispatch(
+        "products", b"1-0", {b"payload": payload}
+    )
+
+    assert client.acked == []
+
+
+@pytest.mark.asyncio
+async def test_undecodable_messages_are_dropped():
+    client = FakeStreamClient()
+
+    await make_consumer(client).dispatch("products", b"1-0", {b"payload": "{"})
+
+    assert client.acked == [b"1-0"]
+
+
+@pytest.mark.asyncio
+async def test_reclaim_retries_and_drops_poison_messages():
+    client = FakeStreamClient(
+        pending=[
+            {"message_id": b"1-0", "times_delivered": 1},
+            {"message_id": b"2-0", "times_delivered": 99},
+        ]
+    )
+
+    await make_consumer(client).reclaim("products")
+
+    assert client.claimed == [b"1-0"]
+    assert sorted(client.acked) == [b"1-0", b"2-0"]
+
+
+@pytest.mark.asyncio
+async def test_pool_keeps_order_per_key_and_runs_keys_concurrently():
+    pool = eventconsumer.KeyedWorkerPool(workers=4)
+    pool.start()
+    calls = []
+    running = 0
+    peak = 0
+
+    async def job(key, i):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        calls.append((key, i))
+        running -= 1
+
+    for i in range(5):
+        for key in ("order-a", "order-b", "order-c"):
+            await pool.submit(key, lambda key=key, i=i: job(key, i))
+    await pool.drain()
+
+    for key in ("order-a", "order-b", "order-c"):
+        assert [i for k, i in calls if k == key] == list(range(5))
+    assert peak > 1
+    assert pool.stats()["processed"] == 15
+    assert pool.stats()["backlog"] == 0
@@ -1,6 +1,9 @@
 from unittest import mock
 from api.domain import commands
-from api.adapters.notifications import AbstractNotifications
+from api.adapters.notifications import (
+    AbstractNotifications,
+    EmailLocalNotifications,
+)
 from api.bootstrap import bootstrap
 from api.utils.exceptions import Unauthorized, ProductNotFound
 from api.domain.enums import ConsumeLocation, OrderStatus
@@ -9,6 +12,7 @@ from api.adapters import repository
 from api.domain.models import Order, OrderItem, Product, Variation, User
 from api.domain.enums import UserRole
 from api.utils.hashoor import hash_password
+import asyncio
 import pytest
 import uuid
 
@@ -78,12 +82,22 @@ class FakeProductRepository(repository.AbstractProductRepository):
     async def _add(self, product):
         self.products.append(product)
 
-    async def _get(self, id):
+    async def _get(self, id, for_update=False):
         for product in self.products:
             if product.id == id:
                 return product
         return None
 
+    async def _get_many(self, ids):
+        return [product for product in self.products if product.id in ids]
+
+    async def _get_version(self, id):
+        product = await self._get(id)
+        return product.version if product else None
+
+    async def _bump_version(self, product):
+        product.version += 1
+
     async def _get_all(self):
         return self.products
 
@@ -116,6 +130,9 @@ class FakeVariationRepository(repository.AbstractVariationRepository):
                 return variation
         return None
 
+    async def _get_many(self, ids):
+        return [v for v in self.variations if v.id in ids]
+
     async def _get_all(self):
         return self.variations
 
@@ -178,12 +195,36 @@ class FakeUsersRepository(repository.AbstractUserRepository):
         return False
 
 
+class FakeOutboxRepository(repository.AbstractOutboxRepository):
+    def __init__(self, messages):
+        self.messages = messages
+
+    async def _add(self, channel, event, payload):
+        self.messages.append((channel, event, payload))
+
+
+class FakeCatalogRepository(repository.AbstractCatalogRepository):
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def _save(self, row):
+        self.rows[row["product_id"]] = row
+
+    async def _remove(self, product_id):
+        self.rows.pop(product_id, None)
+
+    async def _rebuild(self):
+        return len(self.rows)
+
+
 class FakeUnitOfWork(unit_of_work.AbstractUnitOfWork):
     def __init__(self):
         self.orders = FakeOrderRepository([])
         self.products = FakeProductRepository([])
         self.variations = FakeVariationRepository([])
         self.users = FakeUsersRepository([])
+        self.outbox = FakeOutboxRepository([])
+        self.catalog = FakeCatalogRepository({})
         self.committed = False
 
     async def __aenter__(self):
@@ -213,32 +254,34 @@ class FakeNotifications(AbstractNotifications):
         self.sent[destination].append(message)
 
 
-def bootstrap_test_app():
+def bootstrap_test_app(uow=None, catalog_cache=None):
     return bootstrap(
         start_orm=False,
-        uow=FakeUnitOfWork(),
+        uow=uow or FakeUnitOfWork(),
         notifications=mock.MagicMock(),
         publish=lambda *args: None,
+        catalog_cache=catalog_cache,
     )
 
 
 class TestOrders:
     @pytest.mark.asyncio
     async def test_create_order_handler(self):
-        bus = bootstrap_test_app()
+        uow = FakeUnitOfWork()
+        bus = bootstrap_test_app(uow)
         # Add variations
         # Add product and variations
         user_id = str(uuid.uuid4())
         product_id = str(uuid.uuid4())
         variation_id = str(uuid.uuid4())
-        bus.uow.users.users.append(
+        uow.users.users.append(
             User(
                 id=user_id,
                 email="createorder@example.com",
                 password=hash_password("test"),
                 role=UserRole.CUSTOMER.value,
             ))
-        bus.uow.products.products.append(
+        uow.products.products.append(
             Product(
                 id=product_id,
                 description="Test Product",
@@ -247,7 +290,7 @@ class TestOrders:
                 variations=[]
             )
         )
-        bus.uow.variations.variations.append(
+        uow.variations.variations.append(
             Variation(
                 id=variation_id,
                 name="Test Variation",
@@ -328,11 +371,12 @@ class TestOrders:
 
     @pytest.mark.asyncio
     async def test_mark_order_as_cancelled_handler(self):
-        bus = bootstrap_test_app()
+        uow = FakeUnitOfWork()
+        bus = bootstrap_test_app(uow)
         product_id = str(uuid.uuid4())
         variation_id = str(uuid.uuid4())
         user_id = str(uuid.uuid4())
-        bus.uow.products.products.append(
+        uow.products.products.append(
             Product(
                 id=product_id,
                 description="Test Product",
@@ -342,7 +386,7 @@ class TestOrders:
                 ]
             )
         )
-        bus.uow.variations.variations.append(
+        uow.variations.variations.append(
             Variation(
                 id=variation_id,
                 name="Test Variation",
@@ -372,14 +416,82 @@ class TestOrders:
         result = await bus.handle(cmd)
         assert result[0] is True
         assert result[1] == "Order cancelled successfully"
+        channel, event, _ = uow.outbox.messages[-1]
+        assert (channel, event) == ("orders", "OrderCancelled")
+
+    @pytest.mark.asyncio
+    async def test_update_order_status_uses_name_snapshots(self):
+        uow = FakeUnitOfWork()
+        bus = bootstrap_test_app(uow)
+        product_id = str(uuid.uuid4())
+        uow.products.products.append(
+            Product(
+                id=product_id,
+                description="Tea",
+                name="Tea",
+                price=5.0,
+                variations=[]
+            )
+        )
+        order = await bus.handle(
+            commands.CreateOrder(
+                consume_location=ConsumeLocation.IN_HOUSE,
+                user_id=str(uuid.uuid4()),
+                order_items=[{"product_id": product_id, "quantity": 1}],
+            )
+        )
+        # Names are kept even if the catalog changes afterwards.
+        uow.products.products.clear()
+
+        result = await bus.handle(
+            commands.UpdateOrderStatus(
+                id=order.id, status=OrderStatus.PREPARATION
+            )
+        )
+
+        assert result.status == OrderStatus.PREPARATION
+        assert result.order_items[0].display_name == "Tea"
+
+    @pytest.mark.asyncio
+    async def test_order_emails_show_the_item_names(self):
+        order_id = str(uuid.uuid4())
+        order = Order(
+            id=order_id,
+            consume_location=ConsumeLocation.IN_HOUSE,
+            total_cost=5.0,
+            user_id=str(uuid.uuid4()),
+            order_items=[
+                OrderItem(
+                    **order_item_data(order_id),
+                    product_name="Tea",
+                    variation_name="Large",
+                )
+            ],
+        )
+        await FakeUnitOfWork().orders.add(order)
+        order.change_status(OrderStatus.PREPARATION, order.order_items)
+        notifications = EmailLocalNotifications()
+        notifications.smtp = mock.AsyncMock()
+
+        for event in order.pop_events():
+            await notifications.publish("customer@example.com", event)
+
+        emails = [
+            call.args[0] for call in notifications.smtp.send.call_args_list
+        ]
+        assert len(emails) == 2
+        for email in emails:
+            html = email.get_payload(decode=True).decode()
+            assert "Tea with Large" in html
 
     @pytest.mark.asyncio
     async def test_user_can_only_cancel_their_order(self):
-        bus = bootstrap_test_app()
+        uow = FakeUnitOfWork()
+        bus = bootstrap_test_app(uow)
         product_id = str(uuid.uuid4())
         variation_id = str(uuid.uuid4())
         user_id = str(uuid.uuid4())
-        bus.uow.products.products.append(
+        uow.products.products.append(
             Product(
                 id=product_id,
                 description="Test Product",
@@ -388,7 +500,7 @@ class TestOrders:
                 variations=[]
             )
         )
-        bus.uow.variations.variations.append(
+        uow.variations.variations.append(
             Variation(
                 id=variation_id,
                 name="Test Variation",
@@ -421,9 +533,10 @@ class TestOrders:
 
 @pytest.mark.asyncio
 async def test_delete_product_handler():
-    bus = bootstrap_test_app()
+    uow = FakeUnitOfWork()
+    bus = bootstrap_test_app(uow)
     product_id = str(uuid.uuid4())
-    bus.uow.products.products.append(
+    uow.products.products.append(
         Product(
             id=product_id,
             description="Test Product",
@@ -452,11 +565,12 @@ async def test_delete_non_existent_product_handler():
 
 @pytest.mark.asyncio
 async def test_update_product_handler():
-    bus = bootstrap_test_app()
+    uow = FakeUnitOfWork()
+    bus = bootstrap_test_app(uow)
 
     # Add a product
     product_id = str(uuid.uuid4())
-    bus.uow.products.products.append(
+    uow.products.products.append(
         Product(
             id=product_id,
             description="Test Product",
@@ -478,6 +592,84 @@ async def test_update_product_handler():
     assert result.description == "Updated Product"
 
 
+@pytest.mark.asyncio
+async def test_product_changes_invalidate_the_catalog_cache():
+    uow = FakeUnitOfWork()
+    catalog_cache = mock.AsyncMock()
+    bus = bootstrap_test_app(uow, catalog_cache=catalog_cache)
+    product_id = str(uuid.uuid4())
+    uow.products.products.append(
+        Product(
+            id=product_id,
+            description="Test Product",
+            name="Test Product",
+            price=10.0,
+            variations=[]
+        )
+    )
+
+    await bus.handle(
+        commands.UpdateProduct(
+            id=product_id, name=None, price=20.0, description=None
+        )
+    )
+
+    catalog_cache.invalidate.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_variation_changes_bump_the_product_version():
+    uow = FakeUnitOfWork()
+    bus = bootstrap_test_app(uow)
+    product_id = str(uuid.uuid4())
+    uow.products.products.append(
+        Product(
+            id=product_id,
+            description="Test Product",
+            name="Test Product",
+            price=10.0,
+            variations=[]
+        )
+    )
+    version = await bus.handle(commands.GetProductVersion(id=product_id))
+
+    await bus.handle(
+        commands.CreateVariation(
+            product_id=product_id, name="Large", price=12.0
+        )
+    )
+
+    assert await bus.handle(
+        commands.GetProductVersion(id=product_id)
+    ) == version + 1
+
+
+@pytest.mark.asyncio
+async def test_variation_changes_refresh_the_catalog_row():
+    uow = FakeUnitOfWork()
+    bus = bootstrap_test_app(uow)
+    product_id = str(uuid.uuid4())
+    uow.products.products.append(
+        Product(
+            id=product_id,
+            description="Test Product",
+            name="Test Product",
+            price=10.0,
+            variations=[]
+        )
+    )
+
+    variation = await bus.handle(
+        commands.CreateVariation(
+            product_id=product_id, name="Large", price=12.0
+        )
+    )
+
+    assert uow.catalog.rows[product_id]["variations"] == [
+        {"id": variation.id, "name": "Large", "price": 12.0}
+    ]
+
+
 @pytest.mark.asyncio
 async def test_update_non_existent_product_handler():
     bus = bootstrap_test_app()
@@ -491,3 +683,27 @@ async def test_update_non_existent_product_handler():
 
     with pytest.raises(ProductNotFound):
         await bus.handle(cmd)
+
+
+@pytest.mark.asyncio
+async def test_bus_gives_each_call_its_own_unit_of_work():
+    created = []
+
+    def uow_factory():
+        uow = FakeUnitOfWork()
+        created.append(uow)
+        return uow
+
+    bus = bootstrap(
+        start_orm=False,
+        uow_factory=uow_factory,
+        notifications=mock.MagicMock(),
+        publish=lambda *args: None,
+    )
+
+    results = await asyncio.gather(
+        *(bus.handle(commands.HealthCheck()) for _ in range(10))
+    )
+
+    assert results == [True] * 10
+    assert len(set(map(id, created))) == 10
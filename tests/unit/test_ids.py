@@ -0,0 +1,17 @@
+import uuid
+from api.utils.ids import uuid7
+
+
+def test_uuid7_is_a_version_7_uuid():
+    value = uuid.UUID(uuid7())
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+
+
+def test_uuid7_sorts_by_creation_time():
+    ids = [uuid7() for _ in range(1000)]
+    # Ids from the same tick only share the time prefix, order among them
+    # is random, so compare the timestamp part.
+    prefixes = [id[:13] for id in ids]
+    assert prefixes == sorted(prefixes)
+    assert len(set(ids)) == len(ids)
@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+from api.domain import commands, events
+from api.domain.enums import UserRole
+from api.domain.models import User
+from api.service_layer import messagebus
+from tests.unit.test_handler import FakeUnitOfWork
+
+
+def make_bus(event_handlers, max_concurrency=1, ordered_events=()):
+    async def health_check(cmd, uow):
+        user = User(
+            email="bus@example.com", password="", role=UserRole.CUSTOMER
+        )
+        user.append_event(events.OrderSale())
+        await uow.users.add(user)
+        return True
+
+    return messagebus.MessageBus(
+        uow_factory=FakeUnitOfWork,
+        event_handlers={events.OrderSale: event_handlers},
+        command_handlers={commands.HealthCheck: health_check},
+        max_concurrency=max_concurrency,
+        ordered_events=ordered_events,
+    )
+
+
+def slow_handler(calls, name, delay=0.05):
+    async def handler(event, uow):
+        calls.append(("start", name))
+        await asyncio.sleep(delay)
+        calls.append(("end", name))
+
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_event_handlers_run_sequentially_by_default():
+    calls = []
+    bus = make_bus([slow_handler(calls, "a"), slow_handler(calls, "b")])
+
+    assert await bus.handle(commands.HealthCheck()) is True
+    assert calls == [
+        ("start", "a"),
+        ("end", "a"),
+        ("start", "b"),
+        ("end", "b"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_event_handlers_run_concurrently_when_enabled():
+    calls = []
+    bus = make_bus(
+        [slow_handler(calls, "a"), slow_handler(calls, "b")],
+        max_concurrency=4,
+    )
+
+    await bus.handle(commands.HealthCheck())
+
+    assert calls[:2] == [("start", "a"), ("start", "b")]
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped():
+    calls = []
+    running = 0
+    peak = 0
+
+    async def handler(event, uow):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        calls.append(event)
+
+    bus = make_bus([handler] * 6, max_concurrency=2)
+
+    await bus.handle(commands.HealthCheck())
+
+    assert len(calls) == 6
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_ordered_events_keep_sequential_dispatch():
+    calls = []
+    bus = make_bus(
+        [slow_handler(calls, "a"), slow_handler(calls, "b")],
+        max_concurrency=4,
+        ordered_events={events.OrderSale},
+    )
+
+    await bus.handle(commands.HealthCheck())
+
+    assert calls[1] == ("end", "a")
+
+
+@pytest.mark.asyncio
+async def test_failing_handler_does_not_stop_the_others():
+    calls = []
+
+    async def failing_handler(event, uow):
+        raise RuntimeError("boom")
+
+    bus = make_bus(
+        [failing_handler, slow_handler(calls, "b")], max_concurrency=4
+    )
+
+    await bus.handle(commands.HealthCheck())
+
+    assert ("end", "b") in calls
+
+
+@pytest.mark.asyncio
+async def test_failures_of_a_handled_event_are_raised_after_the_others():
+    calls = []
+
+    async def failing_handler(event, uow):
+        raise RuntimeError("boom")
+
+    bus = make_bus([failing_handler, slow_handler(calls, "b")])
+
+    with pytest.raises(messagebus.EventHandlerFailed) as exc:
+        await bus.handle(events.OrderSale())
+
+    assert ("end", "b") in calls
+    assert [str(error) for error in exc.value.errors] == ["boom"]
+
+
+class LazyUnitOfWork(FakeUnitOfWork):
+    """Like the SQLAlchemy unit of work, no repositories until entered."""
+
+    def __init__(self):
+        pass
+
+    async def __aenter__(self):
+        super().__init__()
+        return self
+
+
+@pytest.mark.asyncio
+async def test_handlers_that_never_enter_their_uow_are_fine(caplog):
+    calls = []
+    bus = make_bus(
+        [slow_handler(calls, "a"), slow_handler(calls, "b")],
+        max_concurrency=4,
+    )
+    bus.uow_factory = LazyUnitOfWork
+
+    await bus.handle(events.OrderSale())
+
+    assert ("end", "a") in calls and ("end", "b") in calls
+    assert "Exception handling event" not in caplog.text
@@ -0,0 +1,117 @@
+import asyncio
+from datetime import date
+import pytest
+from api import bootstrap
+from api.adapters.notifications import (
+    AbstractNotifications,
+    DebouncedNotifications,
+)
+from api.domain import events
+from api.domain.enums import OrderStatus
+
+
+class RecordingNotifications(AbstractNotifications):
+    def __init__(self):
+        self.published = []
+        self.closed = False
+
+    async def publish(self, destination, message):
+        self.published.append((destination, message))
+
+    async def publish_many(self, destinations, message):
+        self.published.append((list(destinations), message))
+
+    async def render_template(self, template, **kwargs):
+        return ""
+
+    async def close(self):
+        self.closed = True
+
+
+def status_changed(order_id, status):
+    return events.OrderStatusChanged(
+        order_id=order_id,
+        user_id="user",
+        total_cost=1.0,
+        status=status,
+        consume_location="IN_HOUSE",
+        order_items=[],
+        updated_at=date.today(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_rapid_changes_of_an_order_send_the_latest_status_once():
+    inner = RecordingNotifications()
+    notifications = DebouncedNotifications(inner, window=0.05)
+
+    for status in (
+        OrderStatus.WAITING,
+        OrderStatus.PREPARATION,
+        OrderStatus.READY,
+    ):
+        await notifications.publish(
+            "a@example.com", status_changed("1", status)
+        )
+    await notifications.publish(
+        "b@example.com", status_changed("2", OrderStatus.READY)
+    )
+    assert inner.published == []
+    await asyncio.sleep(0.1)
+
+    assert [(d, m.order_id, m.status) for d, m in inner.published] == [
+        ("a@example.com", "1", OrderStatus.READY),
+        ("b@example.com", "2", OrderStatus.READY),
+    ]
+    assert notifications.stats()["debounce"]["coalesced"] == 2
+
+
+@pytest.mark.asyncio
+async def test_other_messages_are_not_delayed():
+    inner = RecordingNotifications()
+    notifications = DebouncedNotifications(inner, window=60)
+
+    await notifications.publish("a@example.com", events.OrderSale())
+
+    assert len(inner.published) == 1
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending_messages():
+    inner = RecordingNotifications()
+    notifications = DebouncedNotifications(inner, window=60)
+    await notifications.publish(
+        "a@example.com", status_changed("1", OrderStatus.READY)
+    )
+
+    await asyncio.wait_for(notifications.close(), 1)
+
+    assert len(inner.published) == 1
+    assert inner.closed
+
+
+@pytest.mark.asyncio
+async def test_fan_outs_use_the_wrapped_bulk_path():
+    inner = RecordingNotifications()
+    notifications = DebouncedNotifications(inner, window=60)
+
+    await notifications.publish_many(
+        ["a@example.com", "b@example.com"], events.OrderSale()
+    )
+
+    assert [d for d, _ in inner.published] == [
+        ["a@example.com", "b@example.com"]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_debouncing_is_off_unless_a_window_is_set(monkeypatch):
+    monkeypatch.delenv("NOTIFICATION_DEBOUNCE_WINDOW", raising=False)
+    notifications = bootstrap.build_notifications()
+    assert not isinstance(notifications, DebouncedNotifications)
+    await notifications.close()
+
+    monkeypatch.setenv("NOTIFICATION_DEBOUNCE_WINDOW", "3")
+    notifications = bootstrap.build_notifications()
+    assert isinstance(notifications, DebouncedNotifications)
+    await notifications.close()
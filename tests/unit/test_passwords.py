@@ -0,0 +1,56 @@
+import asyncio
+import threading
+import pytest
+from api.utils.exceptions import ServiceBusy
+from api.utils.hashoor import PasswordHasher
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_round_trip():
+    passwords = PasswordHasher(workers=1)
+
+    hashed = await passwords.hash("secret")
+
+    assert await passwords.verify("secret", hashed)
+    assert not await passwords.verify("wrong", hashed)
+    assert passwords.stats()["completed"] == 3
+    passwords.close()
+
+
+@pytest.mark.asyncio
+async def test_calls_past_the_queue_limit_are_rejected():
+    passwords = PasswordHasher(workers=1, max_pending=1)
+    release = threading.Event()
+    running = [
+        asyncio.create_task(passwords._run(release.wait))
+        for _ in range(2)
+    ]
+    await asyncio.sleep(0)
+
+    with pytest.raises(ServiceBusy):
+        await passwords.hash("secret")
+
+    release.set()
+    await asyncio.gather(*running)
+    assert passwords.stats()["rejected"] == 1
+    assert passwords.stats()["pending"] == 0
+    passwords.close()
+
+
+@pytest.mark.asyncio
+async def test_the_event_loop_keeps_running_while_hashing():
+    passwords = PasswordHasher(workers=1)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.001)
+
+    task = asyncio.create_task(ticker())
+    await passwords.hash("secret")
+    task.cancel()
+
+    assert ticks > 10
+    passwords.close()
@@ -0,0 +1,46 @@
+import pytest
+from api.adapters import codecs, redis_eventpublisher
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.messages = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def publish(self, channel, payload):
+        self.messages.append((channel, payload))
+
+    async def execute(self):
+        self.client.batches.append(self.messages)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.batches = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+@pytest.mark.asyncio
+async def test_publish_many_sends_one_pipeline():
+    client = FakeRedis()
+    messages = [
+        ("orders", codecs.encode("OrderCancelled", {"i": i}))
+        for i in range(3)
+    ]
+
+    await redis_eventpublisher.publish_many(messages, client)
+
+    assert len(client.batches) == 1
+    assert [codecs.decode(p)["data"]["i"] for _, p in client.batches[0]] == [
+        0,
+        1,
+        2,
+    ]
@@ -0,0 +1,143 @@
+import time
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from api.adapters.revocations import TokenRevocations
+from api.domain.enums import UserRole
+from api.entrypoints.auth_router import Principal, get_current_user
+from api.utils.hashoor import create_access_token
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.gets = 0
+
+    async def get(self, key):
+        self.gets += 1
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        self.data[key] = value
+
+
+class BrokenRedis:
+    async def get(self, key):
+        raise ConnectionError("redis is down")
+
+
+class FakeBus:
+    def __init__(self, user=None):
+        self.user = user
+        self.handled = []
+
+    async def handle(self, message):
+        self.handled.append(message)
+        return self.user
+
+
+def token(issued_at=None, **claims):
+    data = {
+        "sub": "manager@example.com",
+        "uid": "0190a1b2-c3d4-7e5f-8a6b-7c8d9e0f1a2b",
+        "role": UserRole.MANAGER.value,
+        "iat": issued_at or datetime.utcnow(),
+        **claims,
+    }
+    return create_access_token(data, timedelta(minutes=5))
+
+
+@pytest.mark.asyncio
+async def test_lookups_are_cached():
+    client = FakeRedis()
+    revocations = TokenRevocations(client)
+
+    assert not await revocations.is_revoked("user", time.time())
+    assert not await revocations.is_revoked("user", time.time())
+
+    assert client.gets == 1
+
+
+@pytest.mark.asyncio
+async def test_revoke_covers_tokens_issued_before():
+    client = FakeRedis()
+    issued_at = time.time() - 60
+    await TokenRevocations(client).revoke("user")
+    other_worker = TokenRevocations(client)
+
+    assert await other_worker.is_revoked("user", issued_at)
+    assert not await other_worker.is_revoked("user", time.time() + 60)
+
+
+@pytest.mark.asyncio
+async def test_logging_in_again_right_after_logout_works(monkeypatch):
+    monkeypatch.setenv("AUTH_MODE", "claims")
+    revocations = TokenRevocations(FakeRedis())
+    await revocations.revoke("0190a1b2-c3d4-7e5f-8a6b-7c8d9e0f1a2b")
+
+    user = await get_current_user(token(), FakeBus(), revocations)
+
+    assert user.email == "manager@example.com"
+
+
+@pytest.mark.asyncio
+async def test_claims_mode_skips_the_database(monkeypatch):
+    monkeypatch.setenv("AUTH_MODE", "claims")
+    bus = FakeBus()
+
+    user = await get_current_user(token(), bus, TokenRevocations(FakeRedis()))
+
+    assert user == Principal(
+        id="0190a1b2-c3d4-7e5f-8a6b-7c8d9e0f1a2b",
+        email="manager@example.com",
+        role=UserRole.MANAGER,
+    )
+    assert bus.handled == []
+
+
+@pytest.mark.asyncio
+async def test_revoked_tokens_are_rejected(monkeypatch):
+    monkeypatch.setenv("AUTH_MODE", "claims")
+    revocations = TokenRevocations(FakeRedis())
+    issued = token(issued_at=datetime.utcnow() - timedelta(minutes=1))
+    await revocations.revoke("0190a1b2-c3d4-7e5f-8a6b-7c8d9e0f1a2b")
+
+    with pytest.raises(HTTPException) as exc:
+        await get_current_user(issued, FakeBus(), revocations)
+
+    assert exc.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_the_database_without_redis(monkeypatch):
+    monkeypatch.setenv("AUTH_MODE", "claims")
+    bus = FakeBus(user="user from the database")
+
+    user = await get_current_user(token(), bus, TokenRevocations(BrokenRedis()))
+
+    assert user == "user from the database"
+    assert len(bus.handled) == 1
+
+
+@pytest.mark.asyncio
+async def test_database_mode_does_not_read_revocations(monkeypatch):
+    monkeypatch.setenv("AUTH_MODE", "database")
+    client = FakeRedis()
+    bus = FakeBus(user="user from the database")
+
+    user = await get_current_user(token(), bus, TokenRevocations(client))
+
+    assert user == "user from the database"
+    assert client.gets == 0
+
+
+@pytest.mark.asyncio
+async def test_a_redis_outage_is_logged_once(monkeypatch, caplog):
+    monkeypatch.setenv("AUTH_MODE", "claims")
+    revocations = TokenRevocations(BrokenRedis())
+
+    for _ in range(3):
+        await get_current_user(token(), FakeBus(user="user"), revocations)
+
+    failures = [r for r in caplog.records if r.levelname == "ERROR"]
+    assert len(failures) == 1
@@ -0,0 +1,155 @@
+import json
+import threading
+import boto3
+import pytest
+from botocore.stub import ANY, Stubber
+from api.adapters.notifications import EmailAWSNotifications
+from api.domain import events
+
+
+@pytest.fixture
+def ses():
+    client = boto3.client(
+        "ses",
+        region_name="us-west-1",
+        aws_access_key_id="test",
+        aws_secret_access_key="test",
+    )
+    with Stubber(client) as stubber:
+        yield client, stubber
+        stubber.assert_no_pending_responses()
+
+
+def bulk_status(count):
+    return {"Status": [{"Status": "Success", "MessageId": "id"}] * count}
+
+
+@pytest.mark.asyncio
+async def test_sends_run_off_the_event_loop(ses):
+    client, stubber = ses
+    stubber.add_response(
+        "send_email",
+        {"MessageId": "id"},
+        {
+            "Destination": {"ToAddresses": ["customer@example.com"]},
+            "Message": ANY,
+            "Source": ANY,
+        },
+    )
+    threads = []
+    client.meta.events.register(
+        "before-parameter-build.ses.SendEmail",
+        lambda **kwargs: threads.append(threading.current_thread()),
+    )
+    notifications = EmailAWSNotifications(client=client)
+
+    await notifications._send_html(
+        "customer@example.com", "subject", "<p>hi</p>"
+    )
+
+    assert threads and threads[0] is not threading.main_thread()
+    await notifications.close()
+
+
+@pytest.mark.asyncio
+async def test_fan_out_uses_bulk_templated_sends(ses):
+    client, stubber = ses
+    customers = [f"customer{i}@example.com" for i in range(120)]
+    for count in (50, 50, 20):
+        stubber.add_response(
+            "send_bulk_templated_email",
+            bulk_status(count),
+            {
+                "Source": ANY,
+                "Template": "order_sale",
+                "DefaultTemplateData": ANY,
+                "Destinations": ANY,
+            },
+        )
+    notifications = EmailAWSNotifications(client=client)
+
+    sent = await notifications.send_bulk_templated(
+        "order_sale", dict.fromkeys(customers), {"price": 10}
+    )
+
+    assert sent == 120
+    await notifications.close()
+
+
+@pytest.mark.asyncio
+async def test_order_sale_fan_out_sends_the_sale_template(ses):
+    client, stubber = ses
+    sale = events.OrderSale()
+    stubber.add_response(
+        "send_bulk_templated_email",
+        bulk_status(2),
+        {
+            "Source": ANY,
+            "Template": "order_sale",
+            "DefaultTemplateData": json.dumps(
+                {
+                    "product_id": sale.product_id,
+                    "url": sale.url,
+                    "price": sale.price,
+                    "sale_price": sale.sale_price,
+                }
+            ),
+            "Destinations": [
+                {
+                    "Destination": {"ToAddresses": [address]},
+                    "ReplacementTemplateData": "{}",
+                }
+                for address in ["a@example.com", "b@example.com"]
+            ],
+        },
+    )
+    notifications = EmailAWSNotifications(client=client)
+
+    await notifications.publish_many(["a@example.com", "b@example.com"], sale)
+
+    await notifications.close()
+
+
+@pytest.mark.asyncio
+async def test_order_sale_falls_back_to_one_email_each_without_template(ses):
+    client, stubber = ses
+    stubber.add_client_error(
+        "send_bulk_templated_email",
+        "TemplateDoesNotExist",
+        "Template order_sale does not exist.",
+    )
+    for _ in range(2):
+        stubber.add_response(
+            "send_email",
+            {"MessageId": "id"},
+            {"Destination": ANY, "Message": ANY, "Source": ANY},
+        )
+    # the sends run concurrently, so collect who they went to
+    sent_to = []
+    client.meta.events.register(
+        "before-parameter-build.ses.SendEmail",
+        lambda params, **kwargs: sent_to.extend(
+            params["Destination"]["ToAddresses"]
+        ),
+    )
+    notifications = EmailAWSNotifications(client=client)
+
+    await notifications.publish_many(
+        ["a@example.com", "b@example.com"], events.OrderSale()
+    )
+
+    assert sorted(sent_to) == ["a@example.com", "b@example.com"]
+    await notifications.close()
+
+
+@pytest.mark.asyncio
+async def test_ses_errors_are_logged_not_raised(ses):
+    client, stubber = ses
+    stubber.add_client_error(
+        "send_email", "MessageRejected", "Email address is not verified."
+    )
+    notifications = EmailAWSNotifications(client=client)
+
+    await notifications._send_html("customer@example.com", "subject", "")
+
+    await notifications.close()
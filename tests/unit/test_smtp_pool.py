@@ -0,0 +1,139 @@
+import asyncio
+from email.mime.text import MIMEText
+import aiosmtplib
+import pytest
+import pytest_asyncio
+from api.adapters.smtp_pool import SMTPPool
+
+
+class SMTPSink:
+    """A local SMTP server that accepts and counts every message."""
+
+    def __init__(self):
+        self.connections = 0
+        self.messages = 0
+        self.noops = 0
+        self._writers = []
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.drop_connections()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def drop_connections(self):
+        for writer in self._writers:
+            writer.close()
+        self._writers = []
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self._writers.append(writer)
+        writer.write(b"220 sink\r\n")
+        try:
+            while line := await reader.readline():
+                command = line.decode().strip().upper()
+                if command.startswith("DATA"):
+                    writer.write(b"354 go ahead\r\n")
+                    while await reader.readline() != b".\r\n":
+                        pass
+                    self.messages += 1
+                    writer.write(b"250 queued\r\n")
+                elif command.startswith("QUIT"):
+                    writer.write(b"221 bye\r\n")
+                    break
+                else:
+                    if command.startswith("NOOP"):
+                        self.noops += 1
+                    writer.write(b"250 ok\r\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def message(n: int):
+    msg = MIMEText(f"message {n}", "plain", "utf-8")
+    msg["Subject"] = f"message {n}"
+    msg["From"] = "test@example.com"
+    msg["To"] = "customer@example.com"
+    return msg
+
+
+@pytest_asyncio.fixture
+async def sink():
+    sink = SMTPSink()
+    await sink.start()
+    yield sink
+    await sink.stop()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_sends_share_the_pooled_sessions(sink):
+    pool = SMTPPool("127.0.0.1", sink.port, size=2)
+
+    await asyncio.gather(*(pool.send(message(n)) for n in range(20)))
+
+    assert sink.messages == 20
+    assert pool.stats()["connects"] <= 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_send_many_uses_one_session(sink):
+    pool = SMTPPool("127.0.0.1", sink.port)
+
+    sent = await pool.send_many(message(n) for n in range(10))
+
+    assert sent == 10
+    assert sink.messages == 10
+    assert sink.connections == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_are_checked_before_reuse(sink):
+    pool = SMTPPool("127.0.0.1", sink.port, keepalive=0)
+    await pool.send(message(1))
+
+    await pool.send(message(2))
+
+    assert sink.noops == 1
+    assert sink.connections == 1
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_reconnects_when_the_server_drops_the_session(sink):
+    pool = SMTPPool("127.0.0.1", sink.port)
+    await pool.send(message(1))
+    sink.drop_connections()
+    await asyncio.sleep(0.01)
+
+    await pool.send(message(2))
+
+    assert sink.messages == 2
+    assert pool.stats()["connects"] == 2
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pooled_sessions_replace_a_connection_per_message(sink):
+    messages = 20
+    for n in range(messages):
+        client = aiosmtplib.SMTP(hostname="127.0.0.1", port=sink.port)
+        await client.connect()
+        await client.send_message(message(n))
+        await client.quit()
+    assert sink.connections == messages
+
+    pool = SMTPPool("127.0.0.1", sink.port, size=2)
+    await asyncio.gather(*(pool.send(message(n)) for n in range(messages)))
+    await pool.close()
+
+    assert sink.messages == 2 * messages
+    assert sink.connections <= messages + 2
@@ -0,0 +1,122 @@
+import os
+import threading
+import pytest
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from api.adapters.templates import (
+    TEMPLATES_DIR,
+    TemplateRenderer,
+    bytecode_cache_path,
+    get_renderer,
+)
+
+ORDER = {
+    "status": "WAITING",
+    "total_cost": 12.5,
+    "consume_location": "IN_HOUSE",
+    "created_at": None,
+    "updated_at": None,
+    "order_items": [
+        {
+            "display_name": "Coffee (Large)",
+            "product_id": "p1",
+            "variation_id": "v1",
+            "quantity": 2,
+            "unit_price": 6.25,
+        }
+    ],
+}
+
+
+@pytest.mark.asyncio
+async def test_renders_the_order_templates():
+    renderer = TemplateRenderer()
+    renderer.precompile()
+
+    html = await renderer.render("order_created.html", **ORDER)
+
+    assert "Coffee (Large)" in html
+    assert "12.5" in html
+
+
+@pytest.mark.asyncio
+async def test_default_renderer_renders_the_order_templates(monkeypatch):
+    monkeypatch.delenv("TEMPLATES_BYTECODE_CACHE", raising=False)
+    get_renderer.cache_clear()
+    try:
+        renderer = get_renderer()
+        html = await renderer.render("order_created.html", **ORDER)
+    finally:
+        get_renderer.cache_clear()
+
+    assert "Coffee (Large)" in html
+    assert renderer.env.bytecode_cache is None
+
+
+@pytest.mark.asyncio
+async def test_bytecode_from_another_environment_config_is_not_loaded(
+    tmp_path,
+):
+    # e.g. an async mode environment sharing the same cache directory
+    for directory in (str(tmp_path), None):
+        env = Environment(
+            loader=FileSystemLoader(str(TEMPLATES_DIR)), enable_async=True
+        )
+        env.bytecode_cache = FileSystemBytecodeCache(
+            directory or bytecode_cache_path(str(tmp_path), env)
+        )
+        env.get_template("order_created.html")
+
+    renderer = TemplateRenderer(bytecode_cache_dir=str(tmp_path))
+
+    assert "Coffee (Large)" in await renderer.render(
+        "order_created.html", **ORDER
+    )
+
+
+def test_templates_are_compiled_once():
+    renderer = TemplateRenderer()
+    renderer.precompile()
+
+    assert renderer.env.get_template(
+        "order_created.html"
+    ) is renderer.env.get_template("order_created.html")
+
+
+def test_compiled_templates_are_written_to_the_bytecode_cache(tmp_path):
+    renderer = TemplateRenderer(bytecode_cache_dir=str(tmp_path))
+    renderer.precompile()
+
+    cache_dir = bytecode_cache_path(str(tmp_path), renderer.env)
+    assert os.listdir(cache_dir)
+
+
+@pytest.mark.asyncio
+async def test_auto_reload_picks_up_edits(tmp_path):
+    template = tmp_path / "hello.html"
+    template.write_text("hello {{ name }}")
+    renderer = TemplateRenderer(tmp_path, auto_reload=True)
+    assert await renderer.render("hello.html", name="a") == "hello a"
+
+    template.write_text("bye {{ name }}")
+    # mtime resolution can be coarse, make sure it moved
+    stat = template.stat()
+    os.utime(template, (stat.st_atime, stat.st_mtime + 10))
+
+    assert await renderer.render("hello.html", name="a") == "bye a"
+
+
+@pytest.mark.asyncio
+async def test_large_renders_run_off_the_event_loop(tmp_path):
+    (tmp_path / "thread.html").write_text("{{ thread() }}")
+    renderer = TemplateRenderer(tmp_path, offload_items=2)
+
+    def thread():
+        return threading.current_thread().name
+
+    small = await renderer.render("thread.html", thread=thread, items=[1])
+    large = await renderer.render(
+        "thread.html", thread=thread, items=[1, 2, 3]
+    )
+
+    assert small == threading.main_thread().name
+    assert large != threading.main_thread().name